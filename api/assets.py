@@ -0,0 +1,179 @@
+"""
+Fingerprinted, precompressed static assets
+`python -m api.assets` minifies the CSS and JavaScript under static/, writes
+each file to static/dist/ under a content-hashed name with gzip (and, when
+the brotli package is installed, brotli) variants next to it, and records
+the mapping in static/dist/manifest.json. At runtime url_for('static', ...)
+resolves to the hashed name, which is served with an immutable cache
+lifetime in whichever precompressed encoding the client accepts, so no
+request spends CPU on compression.
+
+Files missing from the manifest, or edited since the last build, fall back
+to their plain /static/ URL.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are built
+    brotli = None
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+MINIFIED_TYPES = (".css", ".js")
+COMPRESSED_TYPES = (".css", ".js", ".svg", ".json", ".html", ".txt")
+# (Content-Encoding, file suffix) in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_SPACE_RE = re.compile(r"\s+")
+_CSS_PUNCT_RE = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(source: str) -> str:
+    """Drop comments and collapse whitespace; ':' and operators are left alone
+    because the space in "a :hover" or "calc(1px + 2px)" is significant"""
+    css = _CSS_COMMENT_RE.sub("", source)
+    css = _CSS_SPACE_RE.sub(" ", css)
+    css = _CSS_PUNCT_RE.sub(r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def minify_js(source: str) -> str:
+    """Strip indentation, blank lines and whole-line comments
+
+    Line breaks are kept so automatic semicolon insertion is unaffected, and
+    lines inside template literals are copied untouched.
+    """
+    lines = []
+    in_template = False
+    in_comment = False
+    for line in source.splitlines():
+        if in_template:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if in_comment:
+                in_comment = "*/" not in stripped
+                continue
+            if not stripped or stripped.startswith("//"):
+                continue
+            if stripped.startswith("/*"):
+                in_comment = "*/" not in stripped
+                continue
+            lines.append(stripped)
+        # An odd number of unescaped backticks opens or closes a template literal
+        if (line.count("`") - line.count("\\`")) % 2:
+            in_template = not in_template
+    return "\n".join(lines) + "\n"
+
+
+def fingerprinted_name(path: str, data: bytes) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def build(static_dir: str = "static") -> Dict:
+    """Minify, fingerprint and precompress every file under static_dir; returns the manifest"""
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    files: Dict[str, str] = {}
+    for root, dirs, names in os.walk(static_dir):
+        if os.path.abspath(root) == os.path.abspath(static_dir):
+            dirs[:] = [d for d in dirs if d != DIST_DIR]
+        for name in sorted(names):
+            source_path = os.path.join(root, name)
+            path = os.path.relpath(source_path, static_dir).replace(os.sep, "/")
+            with open(source_path, "rb") as f:
+                data = f.read()
+            ext = os.path.splitext(name)[1].lower()
+            if ext in MINIFIED_TYPES:
+                text = data.decode("utf-8")
+                data = (minify_css(text) if ext == ".css" else minify_js(text)).encode("utf-8")
+
+            target = fingerprinted_name(path, data)
+            target_path = os.path.join(dist_dir, target)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            _write(target_path, data)
+            if ext in COMPRESSED_TYPES:
+                _write(target_path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    _write(target_path + ".br", brotli.compress(data, quality=11))
+            files[path] = target
+
+    manifest = {"built_at": time.time(), "files": files}
+    _write(os.path.join(dist_dir, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+def _write(path: str, data: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class AssetManifest:
+    """Maps static paths to their fingerprinted builds and serves those builds"""
+
+    def __init__(self, static_dir: str):
+        self.static_dir = static_dir
+        self.dist_dir = os.path.join(static_dir, DIST_DIR)
+        self.files: Dict[str, str] = {}
+        self.built: Dict[str, str] = {}
+        self.load()
+
+    def load(self):
+        """Read the manifest, skipping sources edited since it was built"""
+        try:
+            with open(os.path.join(self.dist_dir, MANIFEST_NAME)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            self.files, self.built = {}, {}
+            return
+        files = {}
+        for path, target in manifest.get("files", {}).items():
+            try:
+                fresh = os.path.getmtime(os.path.join(self.static_dir, path)) <= manifest.get("built_at", 0)
+            except OSError:
+                fresh = False
+            if fresh and os.path.exists(os.path.join(self.dist_dir, target)):
+                files[path] = target
+            else:
+                print(f"Static asset {path} changed since the last build; serving it unfingerprinted")
+        self.files = files
+        self.built = {f"{DIST_DIR}/{target}": path for path, target in files.items()}
+
+    def url_filename(self, filename: str) -> str:
+        """Filename to put in a /static/ URL for a source path"""
+        target = self.files.get(filename)
+        return f"{DIST_DIR}/{target}" if target else filename
+
+    def resolve(self, filename: str, accept_encoding) -> Optional[Tuple[str, str, Optional[str]]]:
+        """(file path, mimetype, content encoding) for a fingerprinted request path, else None"""
+        source = self.built.get(filename)
+        if source is None:
+            return None
+        path = os.path.join(self.static_dir, filename)
+        mimetype = mimetypes.guess_type(source)[0] or "application/octet-stream"
+        for encoding, suffix in ENCODINGS:
+            if accept_encoding[encoding] and os.path.exists(path + suffix):
+                return path + suffix, mimetype, encoding
+        return path, mimetype, None
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    static_dir = sys.argv[1] if len(sys.argv) > 1 else "static"
+    built = build(static_dir)["files"]
+    print(f"Built {len(built)} assets into {os.path.join(static_dir, DIST_DIR)} in "
+          f"{time.perf_counter() - started:.2f}s (brotli {'on' if brotli else 'off: pip install brotli'})")
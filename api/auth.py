@@ -1,3 +1,4 @@
+import hmac
 import jwt
 import bcrypt
 from datetime import datetime, timedelta
@@ -5,16 +6,20 @@ from functools import wraps
 from flask import request, jsonify, current_app
 import os
 
+from .metrics import metrics
+
 # JWT configuration
 JWT_SECRET = os.getenv('JWT_SECRET')
 if not JWT_SECRET:
     raise ValueError("JWT_SECRET environment variable is required")
 
+@metrics.timed('auth.bcrypt')
 def hash_password(password):
     """Hash a password using bcrypt"""
     salt = bcrypt.gensalt(rounds=12)
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
+@metrics.timed('auth.bcrypt')
 def verify_password(password, hashed):
     """Verify a password against its hash"""
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
@@ -61,7 +66,8 @@ def jwt_required(f):
             return jsonify({'error': 'Token is missing'}), 401
         
         try:
-            payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+            with metrics.span('auth.jwt'):
+                payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
             current_user_id = payload['user_id']
             current_user_email = payload['email']
         except jwt.ExpiredSignatureError:
@@ -77,6 +83,22 @@ def jwt_required(f):
     
     return decorated_function
 
+def admin_required(f):
+    """Decorator for operator endpoints: requires the ADMIN_TOKEN value in an X-Admin-Token header
+
+    The endpoints are disabled while ADMIN_TOKEN is unset.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        admin_token = os.getenv('ADMIN_TOKEN')
+        if not admin_token:
+            return jsonify({'error': 'Admin endpoints are disabled'}), 404
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+            return jsonify({'error': 'Admin token is missing or invalid'}), 403
+        return f(*args, **kwargs)
+    
+    return decorated_function
+
 def get_current_user_id():
     """Get the current user ID from the request context"""
     return getattr(request, 'current_user_id', None)
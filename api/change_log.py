@@ -0,0 +1,86 @@
+"""
+Append-only change log for indexed tables
+Every worker process keeps its own ordered indexes over the journal tables.
+Rather than rebuilding them from the whole table whenever another worker
+writes, writers append what changed (inserted records, updated fields) to
+the table's log, and readers apply the entries after the position they last
+saw. Full rewrites (deletes) start a new log file, which tells readers to
+rebuild instead. Appends and catch-up reads happen under the table's lock,
+so a reader never sees a partial entry.
+"""
+
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+# (id written in the log's header line, byte offset): a point in one log's history.
+# Inode numbers are reused after rotation, so each log carries a random id instead.
+LogPosition = Tuple[str, int]
+
+# Logs are rotated past this size; every other process rebuilds its index once
+MAX_LOG_BYTES = 32 * 1024 * 1024
+
+
+class ChangeLog:
+    """One table's log; every method must be called with that table's lock held"""
+
+    def __init__(self, path: str, max_bytes: int = MAX_LOG_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def position(self) -> LogPosition:
+        """The current end of the log, creating it if needed"""
+        try:
+            with open(self.path, "r") as f:
+                log_id = self._read_id(f)
+                f.seek(0, os.SEEK_END)
+                end = f.tell()
+        except FileNotFoundError:
+            return self.rotate()
+        if log_id is None:
+            return self.rotate()
+        return (log_id, end)
+
+    def append(self, entries: List[Dict]) -> LogPosition:
+        """Append entries and return the new end of the log"""
+        log_id, _ = self.position()
+        data = "".join(json.dumps(entry, default=str) + "\n" for entry in entries)
+        with open(self.path, "a") as f:
+            f.write(data)
+            end = f.tell()
+        if end > self.max_bytes:
+            return self.rotate()
+        return (log_id, end)
+
+    def read_from(self, position: LogPosition) -> Optional[Tuple[List[Dict], LogPosition]]:
+        """Entries after position and the new end, or None if the log was rotated since"""
+        log_id, offset = position
+        try:
+            f = open(self.path, "r")
+        except FileNotFoundError:
+            return None
+        with f:
+            if self._read_id(f) != log_id:
+                return None
+            f.seek(offset)
+            raw = f.read()
+            end = f.tell()
+        return [json.loads(line) for line in raw.splitlines() if line], (log_id, end)
+
+    def rotate(self) -> LogPosition:
+        """Start a new, empty log with a fresh id, invalidating every older position"""
+        log_id = os.urandom(8).hex()
+        header = json.dumps({"log": log_id}) + "\n"
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(header)
+        os.replace(tmp_path, self.path)
+        return (log_id, len(header))
+
+    @staticmethod
+    def _read_id(f) -> Optional[str]:
+        try:
+            return json.loads(f.readline()).get("log")
+        except (ValueError, AttributeError):
+            return None
@@ -0,0 +1,322 @@
+"""
+Server-side chat sessions
+Clients send only the new message and the session id they were given; the
+server keeps each session's most recent turns in a ring buffer, which is all
+the prompt and the crisis and conversation-ending checks look at. User turns
+that fall out of the buffer are folded into a short rolling summary (their
+opening sentence and the feelings they mention) so the model keeps the gist
+of older context without it being resent or requoted.
+
+Each session is also written to a small file under the data directory after
+every turn, so any worker (or a restarted server) can pick it up; a worker
+reloads its cached copy when the file has changed since it last read it.
+Cached sessions are dropped after a period of idleness or when the cache
+passes its memory cap; a sweeper thread in each process removes session
+files that have been idle for the same period.
+A session id that is unknown or expired simply starts a new session.
+"""
+
+import json
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .emotion_analysis import EMOTIONS, detect_emotions
+from .metrics import metrics
+
+# Turns kept verbatim; crisis detection reads the last 5 messages, the prompt quotes the last 3
+RECENT_TURNS = 6
+# Older user statements remembered in the rolling summary, and how much of each
+SUMMARY_POINTS = 6
+SUMMARY_POINT_CHARS = 120
+# Longest message kept verbatim; the prompt quotes far less of each turn
+MAX_TURN_CHARS = 4000
+# Rough per-turn bookkeeping overhead counted against the memory cap
+TURN_OVERHEAD_BYTES = 200
+# Seconds between sweeps for expired session files
+SWEEP_INTERVAL = 60
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def summary_point(content: str) -> str:
+    """Opening sentence of a message, cut to SUMMARY_POINT_CHARS"""
+    sentence = _SENTENCE_END_RE.split(content.strip(), 1)[0]
+    if len(sentence) > SUMMARY_POINT_CHARS:
+        sentence = sentence[:SUMMARY_POINT_CHARS].rsplit(" ", 1)[0] + "..."
+    return sentence
+
+
+class ChatSession:
+    __slots__ = ("id", "user_id", "turns", "points", "emotions", "last_active", "size", "lock", "stamp")
+
+    def __init__(self, session_id: str, user_id: str):
+        self.id = session_id
+        self.user_id = user_id
+        self.turns: Deque[Dict] = deque()
+        self.points: Deque[str] = deque(maxlen=SUMMARY_POINTS)
+        self.emotions = set()
+        self.last_active = time.monotonic()
+        self.size = 0
+        self.lock = threading.Lock()
+        # (mtime_ns, size) of the session file this copy matches, None if never saved
+        self.stamp: Optional[Tuple[int, int]] = None
+
+    def history(self) -> List[Dict]:
+        """Recent turns, oldest first, in the shape the chat helpers expect"""
+        with self.lock:
+            return list(self.turns)
+
+    def measure(self) -> int:
+        """Approximate memory held by the turns and summary; call with the lock held"""
+        return (sum(len(turn['content']) + TURN_OVERHEAD_BYTES for turn in self.turns)
+                + sum(len(point) for point in self.points))
+
+    def summary(self, quoted_turns: int = 0) -> str:
+        """Rolling summary of user turns older than the `quoted_turns` newest ones"""
+        with self.lock:
+            points = list(self.points)
+            emotions = set(self.emotions)
+            unquoted = list(self.turns)[:-quoted_turns] if quoted_turns else list(self.turns)
+        for turn in unquoted:
+            if turn["isUser"]:
+                points.append(summary_point(turn["content"]))
+                emotions.update(detect_emotions(turn["content"]))
+        if not points:
+            return ""
+        text = "The user said: " + " / ".join(f'"{point}"' for point in points[-SUMMARY_POINTS:])
+        if emotions:
+            text += f" (feelings mentioned: {', '.join(e for e in EMOTIONS if e in emotions)})"
+        return text
+
+
+class ChatSessionStore:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, idle_seconds: float = 1800,
+                 recent_turns: int = RECENT_TURNS, root_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.recent_turns = recent_turns
+        # Where sessions are saved for other processes; None keeps them in memory only
+        self.root_dir = root_dir
+        # Process running the file sweeper; threads don't survive fork, so each worker starts its own
+        self._sweeper_pid: Optional[int] = None
+        # Least recently active first
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def resume(self, user_id: str, session_id: Optional[str] = None,
+               chat_history: Optional[List[Dict]] = None) -> ChatSession:
+        """The caller's session, or a new one if the id is unknown or belongs to someone else
+
+        chat_history from clients that still send it seeds a new session.
+        """
+        if not isinstance(session_id, str) or not re.fullmatch(r"[\w-]+", session_id):
+            session_id = None
+        with self._lock:
+            self._expire(time.monotonic())
+            session = self._sessions.get(session_id) if session_id else None
+            if self.root_dir and session_id:
+                session = self._refresh(session_id, session)
+            if session is not None and session.user_id == user_id:
+                session.last_active = time.monotonic()
+                self._sessions.move_to_end(session.id)
+                return session
+            session = ChatSession(secrets.token_urlsafe(16), user_id)
+            self._sessions[session.id] = session
+            self.created += 1
+        for msg in (chat_history or [])[-self.recent_turns:]:
+            if isinstance(msg, dict) and isinstance(msg.get('content'), str):
+                self._append(session, msg['content'], bool(msg.get('isUser')))
+        return session
+
+    def record_turn(self, session: ChatSession, message: str, reply: str):
+        """Add a user message and the reply to a session"""
+        self._append(session, message, True)
+        self._append(session, reply or "", False)
+        self._save(session)
+        with self._lock:
+            session.last_active = time.monotonic()
+            if session.id in self._sessions:
+                self._sessions.move_to_end(session.id)
+            self._evict_to_cap()
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.root_dir, f"{session_id}.json")
+
+    def _save(self, session: ChatSession):
+        """Write a session's file so other processes see its latest turns"""
+        if not self.root_dir:
+            return
+        if session.stamp is not None and not os.path.exists(self._path(session.id)):
+            # Removed since it was last saved (account deletion, expiry): don't bring it back
+            return
+        self._ensure_sweeper()
+        with session.lock:
+            record = {"user_id": session.user_id, "turns": list(session.turns),
+                      "points": list(session.points), "emotions": sorted(session.emotions)}
+        os.makedirs(self.root_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self._path(session.id))
+        stat = os.stat(self._path(session.id))
+        with session.lock:
+            session.stamp = (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self, session_id: str, session: Optional[ChatSession]) -> Optional[ChatSession]:
+        """The cached session, reloaded from its file if another process has saved it since
+
+        Call with the store lock held. Returns None for an unknown or expired id.
+        """
+        try:
+            stat = os.stat(self._path(session_id))
+        except FileNotFoundError:
+            if session is not None and session.stamp is None:
+                # Not saved yet
+                return session
+            stat = None
+        if stat is None or time.time() - stat.st_mtime > self.idle_seconds:
+            # Removed by another process (account deletion, expiry) or expired
+            if session is not None:
+                self._drop(session)
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if session is not None and session.stamp == stamp:
+            return session
+        try:
+            with open(self._path(session_id)) as f:
+                record = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return session
+        if session is None:
+            session = ChatSession(session_id, record["user_id"])
+            self._sessions[session_id] = session
+        with session.lock:
+            session.turns = deque(record["turns"][-self.recent_turns:])
+            session.points = deque(record["points"], maxlen=SUMMARY_POINTS)
+            session.emotions = set(record["emotions"])
+            session.stamp = stamp
+            size = session.measure()
+        self.bytes += size - session.size
+        session.size = size
+        return session
+
+    def _ensure_sweeper(self):
+        if self._sweeper_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sweeper_pid == os.getpid():
+                return
+            self._sweeper_pid = os.getpid()
+            threading.Thread(target=self._sweep_loop, name="chat-session-sweeper", daemon=True).start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(SWEEP_INTERVAL)
+            try:
+                self._sweep()
+            except Exception as e:
+                print(f"Error sweeping chat sessions: {e}")
+
+    def _sweep(self):
+        """Remove session files nobody has written to for idle_seconds"""
+        now = time.time()
+        try:
+            entries = list(os.scandir(self.root_dir))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            try:
+                if entry.stat().st_mtime < now - self.idle_seconds:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def delete_user(self, user_id: str):
+        """Drop a user's sessions from memory and disk (account deletion)"""
+        with self._lock:
+            for session in [cached for cached in self._sessions.values() if cached.user_id == user_id]:
+                self._drop(session)
+        if not self.root_dir:
+            return
+        try:
+            entries = [entry for entry in os.scandir(self.root_dir) if entry.name.endswith(".json")]
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            try:
+                with open(entry.path) as f:
+                    owner = json.load(f).get("user_id")
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            if owner == user_id:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def _append(self, session: ChatSession, content: str, is_user: bool):
+        with self._lock, session.lock:
+            session.turns.append({'content': content[:MAX_TURN_CHARS], 'isUser': is_user})
+            while len(session.turns) > self.recent_turns:
+                old = session.turns.popleft()
+                if old['isUser']:
+                    session.points.append(summary_point(old['content']))
+                    session.emotions.update(detect_emotions(old['content']))
+            size = session.measure()
+            if session.id in self._sessions:
+                self.bytes += size - session.size
+            session.size = size
+
+    def _drop(self, session: ChatSession):
+        del self._sessions[session.id]
+        self.bytes -= session.size
+
+    def _expire(self, now: float):
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_active < self.idle_seconds:
+                break
+            self._drop(session)
+            self.expired += 1
+
+    def _evict_to_cap(self):
+        while self.bytes > self.max_bytes and len(self._sessions) > 1:
+            self._drop(next(iter(self._sessions.values())))
+            self.evicted += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            return {"sessions": len(self._sessions), "bytes": self.bytes, "created": self.created,
+                    "expired": self.expired, "evicted": self.evicted}
+
+    def metric_families(self):
+        """Session counts and memory as metric families for /api/metrics"""
+        stats = self.stats()
+        return [
+            ("soupie_chat_sessions", "gauge", "Chat sessions held in memory", [({}, stats["sessions"])]),
+            ("soupie_chat_session_bytes", "gauge", "Approximate memory held by chat sessions",
+             [({}, stats["bytes"])]),
+            ("soupie_chat_sessions_created_total", "counter", "Chat sessions started", [({}, stats["created"])]),
+            ("soupie_chat_sessions_expired_total", "counter", "Chat sessions dropped after going idle",
+             [({}, stats["expired"])]),
+            ("soupie_chat_sessions_evicted_total", "counter", "Chat sessions dropped to stay under the memory cap",
+             [({}, stats["evicted"])])
+        ]
+
+
+# Global chat session store
+chat_sessions = ChatSessionStore(max_bytes=int(float(os.getenv("CHAT_SESSION_MAX_MB", "64")) * 1024 * 1024),
+                                 idle_seconds=float(os.getenv("CHAT_SESSION_IDLE_MINUTES", "30")) * 60,
+                                 root_dir=os.path.join(os.getenv("SOUPIE_DATA_DIR", "data"), "chat_sessions"))
+metrics.register_collector(chat_sessions.metric_families)
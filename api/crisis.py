@@ -0,0 +1,211 @@
+"""
+Crisis fast path for chat
+Incoming chat messages are checked against a narrow matcher for explicit
+suicide and self-harm statements before any storage or model work; the broader
+indicator list ("hopeless", "give up", ...) only puts the model's reply in
+emergency mode. On a match the endpoint answers at once with helpline
+resources (the ones /api/emergency returns) and a short supportive message,
+and the model's reply is generated afterwards: streamed after a `crisis`
+event on /api/chat/stream, or picked up from /api/chat/followup/<id> by
+clients of the buffered endpoint.
+
+Follow-ups run on the process that answered, but their state is kept in
+small files under the data directory so that any worker of a prefork
+server can answer the fetch.
+"""
+
+import json
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Optional, Tuple
+
+from .metrics import metrics
+
+CRISIS_INDICATORS = (
+    "suicide", "suicidal", "kill myself", "end it all", "not worth living",
+    "hopeless", "no point", "give up", "can't go on",
+    "self harm", "hurt myself", "cut myself"
+)
+
+# Explicit statements that skip the model and get helpline resources at once
+ACUTE_CRISIS_PHRASES = (
+    "suicidal", "commit suicide", "kill myself", "killing myself",
+    "end my life", "ending my life", "take my own life", "taking my own life",
+    "want to die", "better off dead",
+    "self harm", "self harming", "hurt myself", "hurting myself", "cut myself", "cutting myself"
+)
+
+HELPLINE_RESOURCES = {
+    "crisis_hotline": "988",
+    "crisis_text": "Text HOME to 741741",
+    "emergency_services": "911",
+    "immediate_support": "You are not alone. Help is available 24/7."
+}
+
+CRISIS_REPLY = ("I hear how much pain you're in, and I'm really glad you told me. You don't have to go "
+                "through this alone. If you might act on these thoughts, please call or text 988 now, text "
+                "HOME to 741741, or call 911. I'm still here with you.")
+
+
+def _phrase_matcher(phrases) -> re.Pattern:
+    """Whole phrases, across any run of whitespace or hyphens, with curly
+    apostrophes and "self-harm" spellings folded in"""
+    return re.compile(r"\b(?:%s)\b" % "|".join(
+        re.escape(phrase).replace(r"\ ", r"[\s-]+").replace("'", "['’]?")
+        for phrase in phrases), re.IGNORECASE)
+
+
+_ACUTE_CRISIS_RE = _phrase_matcher(ACUTE_CRISIS_PHRASES)
+_CRISIS_INDICATOR_RE = _phrase_matcher(CRISIS_INDICATORS + ACUTE_CRISIS_PHRASES)
+
+
+def is_crisis_message(text: Optional[str]) -> bool:
+    """Whether a message explicitly mentions suicide or self-harm and takes the fast path"""
+    return bool(text) and _ACUTE_CRISIS_RE.search(text) is not None
+
+
+def has_crisis_indicator(text: Optional[str]) -> bool:
+    """Whether a message mentions any crisis indicator, including the broader distress phrases"""
+    return bool(text) and _CRISIS_INDICATOR_RE.search(text) is not None
+
+
+def crisis_reply(session_id: Optional[str] = None, followup_id: Optional[str] = None) -> Dict:
+    """Immediate chat response for a message that matched the crisis matcher"""
+    reply = {
+        "crisis": True,
+        "response": CRISIS_REPLY,
+        "resources": HELPLINE_RESOURCES,
+        "suggested_features": []
+    }
+    if session_id:
+        reply["session_id"] = session_id
+    if followup_id:
+        reply["followup_id"] = followup_id
+    return reply
+
+
+class FollowupStore:
+    """Model replies still being generated after an immediate crisis response"""
+
+    def __init__(self, root_dir: str, max_workers: int = 4, ttl_seconds: float = 600, poll_interval: float = 0.1):
+        self.root_dir = root_dir
+        self.max_workers = max_workers
+        self.ttl_seconds = ttl_seconds
+        self.poll_interval = poll_interval
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Follow-ups started by this process, so fetches landing here can wait on them directly
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.failed = 0
+
+    def _path(self, followup_id: str) -> str:
+        return os.path.join(self.root_dir, f"{followup_id}.json")
+
+    def _write(self, followup_id: str, record: Dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self._path(followup_id))
+
+    def _read(self, followup_id: str) -> Optional[Dict]:
+        try:
+            with open(self._path(followup_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        for entry in os.scandir(self.root_dir):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def _run(self, followup_id: str, user_id: str, fn: Callable, args):
+        try:
+            body = fn(*args)
+            # Only if the pending record is still there: it is removed on account deletion or expiry
+            if os.path.exists(self._path(followup_id)):
+                self._write(followup_id, {"user_id": user_id, "status": "ready", "body": body})
+        except Exception as e:
+            print(f"Crisis follow-up failed: {e}")
+            with self._lock:
+                self.failed += 1
+            self._remove(followup_id)
+        finally:
+            with self._lock:
+                self._futures.pop(followup_id, None)
+
+    def _remove(self, followup_id: str):
+        try:
+            os.remove(self._path(followup_id))
+        except FileNotFoundError:
+            pass
+
+    def start(self, user_id: str, fn: Callable, *args) -> str:
+        """Run fn(*args) in the background; returns an id the user can fetch its result with"""
+        followup_id = secrets.token_urlsafe(12)
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._expire()
+        self._write(followup_id, {"user_id": user_id, "status": "pending"})
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="crisis-followup")
+            self._futures[followup_id] = self._executor.submit(self._run, followup_id, user_id, fn, args)
+        return followup_id
+
+    def result(self, followup_id: str, user_id: str, wait: float = 0) -> Tuple[str, Optional[Dict]]:
+        """("ready", body), ("pending", None) or ("unknown", None), waiting up to `wait` seconds"""
+        if not re.fullmatch(r"[\w-]+", followup_id):
+            return "unknown", None
+        deadline = time.monotonic() + wait
+        with self._lock:
+            future = self._futures.get(followup_id)
+        if future is not None:
+            try:
+                future.result(timeout=wait)
+            except FutureTimeout:
+                pass
+        while True:
+            record = self._read(followup_id)
+            if record is None or record.get("user_id") != user_id:
+                return "unknown", None
+            if record["status"] == "ready":
+                self._remove(followup_id)
+                return "ready", record["body"]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return "pending", None
+            time.sleep(min(self.poll_interval, remaining))
+
+    def delete_user(self, user_id: str):
+        """Remove a user's follow-ups, pending or ready (account deletion)"""
+        try:
+            entries = [entry for entry in os.scandir(self.root_dir) if entry.name.endswith(".json")]
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            record = self._read(entry.name[:-5])
+            if record is not None and record.get("user_id") == user_id:
+                self._remove(entry.name[:-5])
+
+    def metric_families(self):
+        with self._lock:
+            pending = sum(not future.done() for future in self._futures.values())
+            failed = self.failed
+        return [("soupie_crisis_followups_pending", "gauge",
+                 "Crisis follow-up replies this process is still generating", [({}, pending)]),
+                ("soupie_crisis_followups_failed_total", "counter", "Crisis follow-up replies that failed",
+                 [({}, failed)])]
+
+
+# Global store for crisis follow-up replies
+crisis_followups = FollowupStore(os.path.join(os.getenv("SOUPIE_DATA_DIR", "data"), "crisis_followups"))
+metrics.register_collector(crisis_followups.metric_families)
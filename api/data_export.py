@@ -0,0 +1,123 @@
+"""
+Streaming user data export
+Yields the export document incrementally from per-table generators so memory
+stays flat regardless of how much history a user has
+"""
+
+import json
+import zipfile
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List
+
+from .json_db import JSONDatabase
+
+# (export section, table name) in output order
+EXPORT_SECTIONS = [
+    ("private_journals", "private_journal"),
+    ("open_journals", "open_journal"),
+    ("question_answers", "question_answer"),
+    ("mood_records", "mood_records"),
+    ("onboarding_records", "onboarding_records")
+]
+
+EXPORT_FORMATS = {
+    "json": ("application/json", "soupie-data-export.json"),
+    "ndjson": ("application/x-ndjson", "soupie-data-export.ndjson"),
+    "zip": ("application/zip", "soupie-data-export.zip")
+}
+
+
+def export_user_info(user: Dict) -> Dict:
+    """Fields of the user record included in an export"""
+    return {
+        "first_name": user.get("first_name"),
+        "last_name": user.get("last_name"),
+        "email": user.get("email"),
+        "created_at": user.get("created_at")
+    }
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=str)
+
+
+def iter_json_export(database: JSONDatabase, user_id: str, user: Dict) -> Iterator[str]:
+    """Single JSON document, written section by section"""
+    yield '{"export_date": ' + _dumps(datetime.now().isoformat())
+    yield ', "user_info": ' + _dumps(export_user_info(user))
+    for section, table in EXPORT_SECTIONS:
+        yield f', "{section}": ['
+        separator = ""
+        for record in database.iter_user_records(table, user_id):
+            yield separator + _dumps(record)
+            separator = ", "
+        yield "]"
+    yield "}\n"
+
+
+def iter_ndjson_export(database: JSONDatabase, user_id: str, user: Dict) -> Iterator[str]:
+    """One {"type", "data"} line per record"""
+    yield _dumps({"type": "export_date", "data": datetime.now().isoformat()}) + "\n"
+    yield _dumps({"type": "user_info", "data": export_user_info(user)}) + "\n"
+    for section, table in EXPORT_SECTIONS:
+        for record in database.iter_user_records(table, user_id):
+            yield _dumps({"type": section, "data": record}) + "\n"
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object that collects bytes for a generator to drain"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self.chunks = self.chunks, []
+        return iter(chunks)
+
+
+def iter_zip_export(database: JSONDatabase, user_id: str, user: Dict) -> Iterator[bytes]:
+    """ZIP archive with one NDJSON file per section, streamed as it is compressed"""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open("user_info.json", "w") as entry:
+            entry.write(_dumps({
+                "export_date": datetime.now().isoformat(),
+                "user_info": export_user_info(user)
+            }).encode("utf-8"))
+        yield from sink.drain()
+
+        for section, table in EXPORT_SECTIONS:
+            # Sizes are unknown up front, so allow ZIP64 for large sections
+            with archive.open(f"{section}.ndjson", "w", force_zip64=True) as entry:
+                for record in database.iter_user_records(table, user_id):
+                    entry.write((_dumps(record) + "\n").encode("utf-8"))
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
+
+
+def gzip_stream(chunks: Iterable, level: int = 6) -> Iterator[bytes]:
+    """Gzip-compress a stream of str/bytes chunks on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(database: JSONDatabase, user_id: str, user: Dict, export_format: str = "json") -> Iterator:
+    """Dispatch to the generator for an export format"""
+    if export_format == "ndjson":
+        return iter_ndjson_export(database, user_id, user)
+    if export_format == "zip":
+        return iter_zip_export(database, user_id, user)
+    return iter_json_export(database, user_id, user)
@@ -0,0 +1,116 @@
+"""
+Keyword emotion analysis for journal entries
+Entries are analyzed once when they are written and the result is stored on
+the record as a compact bitmask (one bit per emotion) plus an energy level
+and reflective depth, so trends can be aggregated without re-reading text.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+# Bit order is stored on records: only ever append new emotions
+EMOTION_KEYWORDS: List[Tuple[str, List[str]]] = [
+    ('sadness', ['sad', 'depressed', 'down', 'upset', 'hurt', 'crying', 'tears', 'empty', 'numb']),
+    ('anxiety', ['anxious', 'worried', 'stressed', 'nervous', 'panic', 'overwhelmed', 'scared']),
+    ('anger', ['angry', 'mad', 'frustrated', 'irritated', 'annoyed', 'rage']),
+    ('joy', ['happy', 'excited', 'good', 'great', 'wonderful', 'amazing', 'grateful', 'blessed']),
+    ('fear', ['scared', 'afraid', 'terrified', 'fearful', 'worried']),
+    ('loneliness', ['lonely', 'alone', 'isolated', 'disconnected', 'empty']),
+    ('confusion', ['confused', 'lost', 'unclear', 'unsure', 'mixed up'])
+]
+EMOTIONS = [emotion for emotion, _ in EMOTION_KEYWORDS]
+
+HIGH_ENERGY_WORDS = ['excited', 'energetic', 'motivated', 'pumped', 'thrilled']
+LOW_ENERGY_WORDS = ['tired', 'exhausted', 'drained', 'lethargic', 'sluggish']
+DEEP_REFLECTION_WORDS = ['understand', 'realize', 'aware', 'insight', 'pattern', 'meaning']
+SURFACE_WORDS = ['fine', 'okay', 'good', 'bad', 'tired']
+
+# Emotion names for every possible mask, so decoding is a list lookup
+_MASK_EMOTIONS = [[emotion for bit, emotion in enumerate(EMOTIONS) if mask >> bit & 1]
+                  for mask in range(1 << len(EMOTIONS))]
+
+
+def detect_emotions(text: str) -> List[str]:
+    """Emotions whose keywords appear in the text, in bit order"""
+    text_lower = (text or "").lower()
+    return [emotion for emotion, keywords in EMOTION_KEYWORDS
+            if any(keyword in text_lower for keyword in keywords)]
+
+
+def emotion_mask(text: str) -> int:
+    text_lower = (text or "").lower()
+    mask = 0
+    for bit, (_, keywords) in enumerate(EMOTION_KEYWORDS):
+        if any(keyword in text_lower for keyword in keywords):
+            mask |= 1 << bit
+    return mask
+
+
+def mask_emotions(mask: int) -> List[str]:
+    return _MASK_EMOTIONS[mask & (len(_MASK_EMOTIONS) - 1)]
+
+
+def energy_level(text: str) -> int:
+    """1 for high-energy language, -1 for low-energy language, else 0"""
+    text_lower = (text or "").lower()
+    if any(word in text_lower for word in HIGH_ENERGY_WORDS):
+        return 1
+    if any(word in text_lower for word in LOW_ENERGY_WORDS):
+        return -1
+    return 0
+
+
+def reflective_depth(text: str) -> str:
+    text_lower = (text or "").lower()
+    if any(word in text_lower for word in DEEP_REFLECTION_WORDS):
+        return 'deep'
+    if any(word in text_lower for word in SURFACE_WORDS):
+        return 'light'
+    return 'balanced'
+
+
+def analyze_entry(text: str) -> Dict:
+    """Fields stored on a journal record at write time"""
+    return {
+        "emotion_mask": emotion_mask(text),
+        "energy": energy_level(text),
+        "depth": reflective_depth(text)
+    }
+
+
+def record_analysis(record: Dict) -> Dict:
+    """A record's stored analysis, computed from its text for entries written before ingest analysis"""
+    if "emotion_mask" in record:
+        return record
+    return analyze_entry(record.get("content"))
+
+
+def emotion_trend(records: Iterable[Dict], start: date, end: date, bucket: str = "day") -> List[Dict]:
+    """Per-day (or per-week, keyed by Monday) entry counts, emotion counts and mean energy
+
+    Records are expected newest first, as feed indexes return them; iteration
+    stops at the first record older than start.
+    """
+    low, high = start.isoformat(), (end + timedelta(days=1)).isoformat()
+    buckets: Dict[str, Dict] = {}
+    for record in records:
+        created_at = record.get("created_at") or ""
+        if created_at >= high:
+            continue
+        if created_at < low:
+            break
+        day = date.fromisoformat(created_at[:10])
+        if bucket == "week":
+            day -= timedelta(days=day.weekday())
+        summary = buckets.setdefault(day.isoformat(), {"entries": 0, "emotions": {}, "energy": 0})
+        analysis = record_analysis(record)
+        summary["entries"] += 1
+        summary["energy"] += analysis.get("energy", 0)
+        for emotion in mask_emotions(analysis.get("emotion_mask", 0)):
+            summary["emotions"][emotion] = summary["emotions"].get(emotion, 0) + 1
+    return [{
+        "date": day,
+        "entries": summary["entries"],
+        "emotions": summary["emotions"],
+        "mean_energy": round(summary["energy"] / summary["entries"], 3)
+    } for day, summary in sorted(buckets.items())]
@@ -0,0 +1,187 @@
+"""
+Application factory shared by every Soupie entry point
+simple_app.py builds its Flask app here, and api/app.py (Vercel, local runs)
+and asgi.py serve that same app, so tables, static assets and request
+instrumentation are set up once per process however the server is started.
+Environment variables must be loaded before api modules are imported; the
+entry points do that before importing this module.
+
+preload_app() warms a built app in a master process that is about to fork
+workers (prefork.py), so they start with the work already done and share it.
+"""
+
+import gc
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+
+from flask import Flask, Response, g, jsonify, request, send_file
+from flask_cors import CORS
+
+from .assets import AssetManifest, IMMUTABLE
+from .auth import admin_required
+from .json_db import db
+from .metrics import metrics, current_route, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .process_memory import format_usage, memory_usage
+from .profiler import profiler, ProfilerBusy, collapsed, parse_capture_args
+from .scoring_engine import scoring_engine
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Exercises every scoring stage without touching user data
+PRELOAD_ONBOARDING = {
+    "sleep_quality": "okay",
+    "energy_level": "moderate",
+    "coping_skills": ["journaling"],
+    "suicidal_thoughts": "no"
+}
+
+
+def create_app(database=None, import_name: str = "simple_app") -> Flask:
+    """Build the Flask app with Soupie's shared setup; routes are registered by simple_app"""
+    app = Flask(import_name, root_path=str(PROJECT_ROOT), template_folder="templates", static_folder="static")
+    CORS(app)
+
+    # Initialize database tables
+    (database or db).init_tables()
+
+    init_static_assets(app)
+    init_request_metrics(app)
+    init_unit_of_work(app)
+    init_operator_routes(app)
+    return app
+
+
+def preload_app(app: Flask, database=None) -> Dict[str, float]:
+    """Load what workers would otherwise build lazily, then freeze it for copy-on-write sharing
+
+    Builds the ordered journal indexes, runs the onboarding scorer once and
+    compiles every template. gc.freeze() then moves all live objects out of the
+    collector's generations: a forked child's collections never touch them, so
+    the pages holding them stay shared instead of being copied on the first GC.
+    Starts no threads (they would not survive the fork) and makes no Gemini calls.
+    Returns the time spent per stage in milliseconds.
+    """
+    database = database or db
+    timings = {}
+
+    def timed(stage, work):
+        started = time.perf_counter()
+        work()
+        timings[stage] = round((time.perf_counter() - started) * 1000, 2)
+
+    timed("indexes", lambda: [database.get_index(table) for table in database.INDEXED_TABLES])
+    timed("scoring_engine", lambda: scoring_engine.score_onboarding_data(PRELOAD_ONBOARDING))
+    timed("templates", lambda: [app.jinja_env.get_template(name) for name in app.jinja_env.list_templates()])
+    timed("gc_freeze", lambda: (gc.collect(), gc.freeze()))
+
+    if threading.active_count() > 1:
+        print(f"Warning: {threading.active_count() - 1} threads running before fork; workers will not inherit them")
+    print(f"Preloaded app in {sum(timings.values()):.0f}ms {timings} ({format_usage(memory_usage())})")
+    return timings
+
+
+def init_static_assets(app: Flask):
+    """Point url_for('static', ...) at fingerprinted builds from `python -m api.assets` and serve them"""
+    asset_manifest = AssetManifest(app.static_folder)
+    app.extensions["soupie_assets"] = asset_manifest
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == "static" and "filename" in values:
+            values["filename"] = asset_manifest.url_filename(values["filename"])
+
+    def serve_static(filename):
+        """Serve built assets precompressed with an immutable lifetime, anything else as Flask would"""
+        found = asset_manifest.resolve(filename, request.accept_encodings)
+        if found is None:
+            return app.send_static_file(filename)
+        path, mimetype, encoding = found
+        response = send_file(path, mimetype=mimetype, conditional=True)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Cache-Control"] = IMMUTABLE
+        response.vary.add("Accept-Encoding")
+        return response
+
+    app.view_functions["static"] = serve_static
+
+
+def init_request_metrics(app: Flask):
+    """Per-route request timing; spans recorded while handling inherit the route label"""
+
+    @app.before_request
+    def start_request_metrics():
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        request.metrics_started = time.perf_counter()
+        request.metrics_token = current_route.set(route)
+        profiler.tag_thread(route)
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = getattr(request, "metrics_started", None)
+        if started is not None:
+            metrics.record_request(current_route.get(), request.method, response.status_code,
+                                   time.perf_counter() - started)
+        return response
+
+    @app.teardown_request
+    def reset_request_metrics(exc):
+        token = getattr(request, "metrics_token", None)
+        if token is not None:
+            current_route.reset(token)
+        profiler.untag_thread()
+
+
+def init_unit_of_work(app: Flask):
+    """Write each request's batched user updates once it has been handled"""
+
+    # Registered after the metrics hooks, so it runs before the request timing is recorded
+    @app.after_request
+    def flush_unit_of_work(response):
+        unit = g.get("unit_of_work")
+        if unit is not None:
+            unit.flush()
+        return response
+
+    # Streamed responses can still update users after after_request has run
+    @app.teardown_appcontext
+    def close_unit_of_work(exc):
+        unit = g.pop("unit_of_work", None)
+        if unit is not None:
+            try:
+                unit.flush()
+            except Exception as e:
+                print(f"Error writing user updates: {e}")
+
+
+def init_operator_routes(app: Flask):
+    """Metrics scrape and profiling endpoints"""
+
+    # Prometheus scrape endpoint (set METRICS_TOKEN to require "Authorization: Bearer <token>")
+    @app.route("/api/metrics")
+    def prometheus_metrics():
+        token = os.getenv("METRICS_TOKEN")
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            return jsonify({"error": "Unauthorized"}), 401
+        return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+    # Sample worker stacks for ?seconds=N (default 10) and return collapsed stacks for a flamegraph.
+    # ?threads=all also samples idle and background threads, ?by_route=0 roots stacks at thread names
+    @app.route("/api/admin/profile", methods=["POST"])
+    @admin_required
+    def capture_profile():
+        try:
+            result = profiler.capture(**parse_capture_args(request.args))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except ProfilerBusy as e:
+            return jsonify({"error": str(e)}), 409
+
+        response = Response(collapsed(result["stacks"]), mimetype="text/plain")
+        response.headers["X-Profile-Samples"] = str(result["samples"])
+        response.headers["X-Profile-Duration"] = str(result["duration_s"])
+        response.headers["X-Profile-Interval-Ms"] = str(result["interval_ms"])
+        return response
@@ -0,0 +1,259 @@
+"""
+Ordered in-memory indexes for journal feeds
+Keeps (created_at, id) keys sorted so feed pages can be served without
+re-sorting the whole table on every request
+"""
+
+import base64
+import heapq
+import json
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+FeedKey = Tuple[str, str]
+
+
+def record_key(record: Dict) -> FeedKey:
+    """Build the sort key for a journal record"""
+    return (record.get("created_at") or "", record.get("id") or "")
+
+
+def encode_cursor(key: FeedKey) -> str:
+    """Encode a feed key as an opaque, URL-safe cursor"""
+    raw = json.dumps(list(key), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> FeedKey:
+    """Decode a cursor produced by encode_cursor, raising ValueError if invalid"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(created_at, str) or not isinstance(record_id, str):
+        raise ValueError("Invalid cursor")
+    return (created_at, record_id)
+
+
+class OrderedIndex:
+    """Sorted array of feed keys (oldest first) with the records they point to
+
+    Feeds are read without the database's index lock, so writers never
+    change the key list in place: they store the record first and then swap
+    in an updated copy of the keys, and readers work from the list they
+    picked up. A key removed meanwhile is skipped rather than raising.
+    """
+
+    def __init__(self):
+        self._keys: List[FeedKey] = []
+        self._records: Dict[FeedKey, Dict] = {}
+        self._ids: Dict[str, FeedKey] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def build(self, records: Iterable[Dict]):
+        """Replace the index contents with the given records"""
+        self._records = {record_key(r): r for r in records}
+        self._keys = sorted(self._records)
+        self._ids = {key[1]: key for key in self._keys}
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        """Look up a record by id"""
+        key = self._ids.get(record_id)
+        return self._records.get(key) if key else None
+
+    def insert(self, record: Dict):
+        """Add a record, keeping keys sorted"""
+        key = record_key(record)
+        is_new = key not in self._records
+        self._records[key] = record
+        self._ids[key[1]] = key
+        if is_new:
+            keys = list(self._keys)
+            insort(keys, key)
+            self._keys = keys
+
+    def remove(self, record: Dict):
+        """Remove a record if present"""
+        key = record_key(record)
+        if key not in self._records:
+            return
+        pos = bisect_left(self._keys, key)
+        if pos < len(self._keys) and self._keys[pos] == key:
+            self._keys = self._keys[:pos] + self._keys[pos + 1:]
+        self._ids.pop(key[1], None)
+        self._records.pop(key, None)
+
+    def _lookup(self, keys: Iterable[FeedKey]) -> List[Dict]:
+        records = self._records
+        return [record for record in map(records.get, keys) if record is not None]
+
+    def newest(self, offset: int = 0, limit: int = 20) -> List[Dict]:
+        """Page through records newest first using an offset"""
+        keys = self._keys
+        end = len(keys) - max(offset, 0)
+        start = max(end - limit, 0)
+        if end <= 0:
+            return []
+        return self._lookup(reversed(keys[start:end]))
+
+    def older_than(self, key: FeedKey, limit: int = 20) -> List[Dict]:
+        """Records that come after the cursor key in newest-first order"""
+        keys = self._keys
+        end = bisect_left(keys, key)
+        start = max(end - limit, 0)
+        return self._lookup(reversed(keys[start:end]))
+
+    def newer_than(self, key: FeedKey, limit: int = 20) -> List[Dict]:
+        """Records that come before the cursor key in newest-first order"""
+        keys = self._keys
+        start = bisect_right(keys, key)
+        end = min(start + limit, len(keys))
+        return self._lookup(reversed(keys[start:end]))
+
+    def has_older(self, key: FeedKey) -> bool:
+        return bisect_left(self._keys, key) > 0
+
+    def has_newer(self, key: FeedKey) -> bool:
+        return bisect_right(self._keys, key) < len(self._keys)
+
+    def iter_older(self, key: Optional[FeedKey] = None) -> Iterator[Tuple[FeedKey, Dict]]:
+        """Lazily walk (key, record) pairs newest first, starting below key (or at the newest)"""
+        keys = self._keys
+        end = len(keys) if key is None else bisect_left(keys, key)
+        for pos in range(end - 1, -1, -1):
+            k = keys[pos]
+            record = self._records.get(k)
+            if record is not None:
+                yield k, record
+
+    def iter_newer(self, key: FeedKey) -> Iterator[Tuple[FeedKey, Dict]]:
+        """Lazily walk (key, record) pairs oldest first, starting above key"""
+        keys = self._keys
+        for pos in range(bisect_right(keys, key), len(keys)):
+            k = keys[pos]
+            record = self._records.get(k)
+            if record is not None:
+                yield k, record
+
+
+class MergedIndex:
+    """Read-only union of disjoint ordered indexes, paged without copying them
+
+    Serves the same newest-first reads as OrderedIndex by merging each
+    index's keys lazily, so a page costs O(page size * indexes) comparisons.
+    """
+
+    def __init__(self, indexes: Iterable[OrderedIndex]):
+        self.indexes = [index for index in indexes if len(index)]
+
+    def __len__(self) -> int:
+        return sum(len(index) for index in self.indexes)
+
+    def iter_older(self, key: Optional[FeedKey] = None) -> Iterator[Tuple[FeedKey, Dict]]:
+        """Lazily walk (key, record) pairs newest first across all indexes"""
+        return heapq.merge(*(index.iter_older(key) for index in self.indexes),
+                           key=lambda item: item[0], reverse=True)
+
+    def newest(self, offset: int = 0, limit: int = 20) -> List[Dict]:
+        start = max(offset, 0)
+        return [record for _, record in islice(self.iter_older(), start, start + limit)]
+
+    def older_than(self, key: FeedKey, limit: int = 20) -> List[Dict]:
+        return [record for _, record in islice(self.iter_older(key), limit)]
+
+    def newer_than(self, key: FeedKey, limit: int = 20) -> List[Dict]:
+        merged = heapq.merge(*(index.iter_newer(key) for index in self.indexes), key=lambda item: item[0])
+        return [record for _, record in reversed(list(islice(merged, limit)))]
+
+    def has_older(self, key: FeedKey) -> bool:
+        return any(index.has_older(key) for index in self.indexes)
+
+    def has_newer(self, key: FeedKey) -> bool:
+        return any(index.has_newer(key) for index in self.indexes)
+
+
+class TableIndex:
+    """Global ordered index for a table plus one ordered index per partition value
+
+    Only string values are partitioned; records with any other value for a
+    field appear in the global index alone.
+    """
+
+    def __init__(self, partition_fields: Tuple[str, ...] = ()):
+        self.partition_fields = partition_fields
+        self.all = OrderedIndex()
+        self.partitions: Dict[str, Dict[str, OrderedIndex]] = {f: {} for f in partition_fields}
+
+    def build(self, records: List[Dict]):
+        """Rebuild the index from a full table read"""
+        self.all.build(records)
+        for field in self.partition_fields:
+            grouped: Dict[str, List[Dict]] = {}
+            for record in records:
+                value = record.get(field)
+                if isinstance(value, str):
+                    grouped.setdefault(value, []).append(record)
+            self.partitions[field] = {}
+            for value, group in grouped.items():
+                index = OrderedIndex()
+                index.build(group)
+                self.partitions[field][value] = index
+
+    def insert(self, record: Dict):
+        self.all.insert(record)
+        for field in self.partition_fields:
+            value = record.get(field)
+            if isinstance(value, str):
+                self.partitions[field].setdefault(value, OrderedIndex()).insert(record)
+
+    def remove(self, record: Dict):
+        self.all.remove(record)
+        for field in self.partition_fields:
+            value = record.get(field)
+            index = self.partitions[field].get(value) if isinstance(value, str) else None
+            if index is not None:
+                index.remove(record)
+
+    def partition(self, field: str, value: str) -> OrderedIndex:
+        """Get the ordered index for one partition value (empty if unknown)"""
+        return self.partitions[field].get(value) or OrderedIndex()
+
+    def partitions_union(self, field: str, values: Iterable[str]) -> MergedIndex:
+        """Newest-first view over several partition values of one field"""
+        return MergedIndex(self.partition(field, value) for value in dict.fromkeys(values))
+
+    def facet_counts(self, field: str) -> Dict[str, int]:
+        """Live record count per partition value, one len() per value"""
+        return {value: len(index) for value, index in self.partitions[field].items() if len(index)}
+
+
+def paginate(index, page: int = 1, per_page: int = 20,
+             after: Optional[str] = None, before: Optional[str] = None) -> Dict:
+    """Serve one newest-first feed page by cursor or, for old clients, by page number"""
+    if after:
+        records = index.older_than(decode_cursor(after), per_page)
+    elif before:
+        records = index.newer_than(decode_cursor(before), per_page)
+    else:
+        records = index.newest((page - 1) * per_page, per_page)
+
+    next_cursor = None
+    prev_cursor = None
+    if records:
+        last_key = record_key(records[-1])
+        first_key = record_key(records[0])
+        if index.has_older(last_key):
+            next_cursor = encode_cursor(last_key)
+        if index.has_newer(first_key):
+            prev_cursor = encode_cursor(first_key)
+
+    return {
+        "records": records,
+        "total": len(index),
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor
+    }
@@ -0,0 +1,371 @@
+"""
+Gemini API client shared by the Flask and async serving modes
+Keeps pooled connections for both blocking and asyncio callers and maps
+failures to the "AI service error" strings the fallbacks look for. Calls go
+through a circuit breaker, a p95-based adaptive timeout and the priority
+scheduler that caps in-flight requests to the provider quota. Identical
+concurrent generate calls are coalesced into one (api/single_flight.py).
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+import requests
+
+from .metrics import metrics
+from .outbound_scheduler import OutboundScheduler, OutboundShed
+from .resilience import CLOSED, HALF_OPEN, OPEN, AdaptiveTimeout, CircuitBreaker, Permit
+from .single_flight import SingleFlight, flight_key
+
+try:
+    import httpx
+except ImportError:  # async serving mode is optional
+    httpx = None
+
+DEFAULT_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+NOT_CONFIGURED_MESSAGE = "AI service not configured. Please set GEMINI_API_KEY in your environment."
+CIRCUIT_OPEN_MESSAGE = "AI service error: Service temporarily unavailable (circuit open). Using fallback."
+SHED_MESSAGE = "AI service error: Too many requests queued for the AI service. Using fallback."
+SERVICE_ERROR_PREFIXES = ("AI service error", "AI service not configured")
+
+
+def is_service_error(text: Optional[str]) -> bool:
+    """Whether a generate() result is a failure message rather than model output"""
+    return not text or text.startswith(SERVICE_ERROR_PREFIXES)
+
+
+class GeminiStreamError(Exception):
+    """A streamed call failed; str() is the usual "AI service ..." message"""
+
+
+class GeminiClient:
+    def __init__(self, api_base: str = None, model: str = None, timeout: float = None):
+        self.api_base = (api_base or os.getenv("GEMINI_API_BASE") or DEFAULT_API_BASE).rstrip("/")
+        self.model = model or os.getenv("GEMINI_MODEL") or DEFAULT_MODEL
+        self.timeout = timeout or float(os.getenv("GEMINI_TIMEOUT", "10"))
+        self.breaker = CircuitBreaker()
+        self.timeouts = AdaptiveTimeout(ceiling=self.timeout)
+        self.scheduler = OutboundScheduler(max_in_flight=int(os.getenv("GEMINI_MAX_IN_FLIGHT", "32")),
+                                           rate_per_minute=float(os.getenv("GEMINI_RPM", "1000")),
+                                           burst=int(os.getenv("GEMINI_BURST", "50")))
+        self.coalesce = os.getenv("GEMINI_SINGLE_FLIGHT", "1") != "0"
+        self.single_flight = SingleFlight(shared_dir=os.getenv("GEMINI_SINGLE_FLIGHT_DIR") or None,
+                                          share_result=lambda text: not is_service_error(text))
+        self._session = requests.Session()
+        self._async_clients: Dict[int, "httpx.AsyncClient"] = {}
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return os.getenv("GEMINI_API_KEY")
+
+    def _url(self, method: str = "generateContent") -> str:
+        return f"{self.api_base}/models/{self.model}:{method}"
+
+    def _headers(self) -> Dict[str, str]:
+        # The key goes in a header so it never appears in URLs quoted by errors or logs
+        return {"x-goog-api-key": self.api_key or ""}
+
+    @staticmethod
+    def _payload(prompt: str) -> Dict:
+        return {"contents": [{"parts": [{"text": prompt}]}]}
+
+    @staticmethod
+    def _extract_text(data: Dict) -> str:
+        return data["candidates"][0]["content"]["parts"][0]["text"]
+
+    @staticmethod
+    def _stream_chunk_text(line: str) -> str:
+        """Text carried by one `data:` line of a streamGenerateContent SSE response"""
+        if not line.startswith("data:"):
+            return ""
+        data = json.loads(line[5:])
+        parts = (data.get("candidates") or [{}])[0].get("content", {}).get("parts", [])
+        return "".join(part.get("text", "") for part in parts)
+
+    @staticmethod
+    def _http_error_message(status_code: int, text: str) -> str:
+        if status_code == 404:
+            return "AI service error: Invalid API key or model not available. Please check your GEMINI_API_KEY."
+        elif status_code == 403:
+            return "AI service error: API key does not have permission. Please check your GEMINI_API_KEY."
+        elif status_code == 503:
+            return "AI service error: HTTP 503 - Service temporarily overloaded. Please try again later."
+        else:
+            return f"AI service error: HTTP {status_code} - {text}"
+
+    def _record_response(self, status_code: int, started: float, permit: Permit):
+        """Feed one completed HTTP exchange to the breaker and timeout tracker"""
+        if status_code == 429 or status_code >= 500:
+            self.breaker.record_failure(f"HTTP {status_code}", permit)
+            return
+        # Other statuses (including 4xx configuration errors) mean the service is answering
+        self.breaker.record_success(permit)
+        if status_code < 400:
+            self.timeouts.observe(time.monotonic() - started)
+
+    def health(self) -> Dict:
+        """Breaker, timeout and scheduler state for /api/health"""
+        return {
+            "configured": bool(self.api_key),
+            "circuit": self.breaker.snapshot(),
+            "timeout": self.timeouts.snapshot(),
+            "scheduler": self.scheduler.snapshot(),
+            "single_flight": self.single_flight.snapshot()
+        }
+
+    def metric_families(self):
+        """Breaker, timeout and scheduler state as metric families for /api/metrics"""
+        circuit = self.breaker.snapshot()
+        scheduler = self.scheduler.snapshot()
+        classes = scheduler["classes"]
+        single_flight = self.single_flight.snapshot()
+        return [
+            ("soupie_gemini_circuit_state", "gauge", "1 for the circuit breaker's current state",
+             [({"state": state}, int(circuit["state"] == state)) for state in (CLOSED, OPEN, HALF_OPEN)]),
+            ("soupie_gemini_rejected_total", "counter", "Calls refused while the circuit was open",
+             [({}, circuit["rejected_calls"])]),
+            ("soupie_gemini_timeout_seconds", "gauge", "Current adaptive request timeout",
+             [({}, self.timeouts.current)]),
+            ("soupie_gemini_in_flight", "gauge", "Gemini requests holding a scheduler slot",
+             [({}, scheduler["in_flight"])]),
+            ("soupie_gemini_queued", "gauge", "Requests waiting for a scheduler slot",
+             [({"class": klass}, stats["queued"]) for klass, stats in classes.items()]),
+            ("soupie_gemini_admitted_total", "counter", "Requests admitted by the scheduler",
+             [({"class": klass}, stats["admitted"]) for klass, stats in classes.items()]),
+            ("soupie_gemini_shed_total", "counter", "Requests shed after their class deadline",
+             [({"class": klass}, stats["shed"]) for klass, stats in classes.items()]),
+            ("soupie_gemini_single_flight_leaders_total", "counter",
+             "Generate calls that made their own request", [({}, single_flight["leaders"])]),
+            ("soupie_gemini_coalesced_total", "counter",
+             "Generate calls answered by an identical call already in flight",
+             [({"scope": "process"}, single_flight["coalesced"]),
+              ({"scope": "cross_process"}, single_flight["coalesced_across_processes"])])
+        ]
+
+    def generate(self, prompt: str, priority: str = "chat") -> str:
+        """Call generateContent, blocking the calling thread
+
+        `priority` is the scheduler class: "chat", "summary" or "onboarding".
+        Callers asking for the same prompt at the same time share one call.
+        """
+        if not self.coalesce:
+            return self._scheduled_generate(prompt, priority)
+        return self.single_flight.do(flight_key(self.model, prompt), self._scheduled_generate, prompt, priority)
+
+    def _scheduled_generate(self, prompt: str, priority: str) -> str:
+        if not self.api_key:
+            return NOT_CONFIGURED_MESSAGE
+        permit = self.breaker.allow()
+        if permit is None:
+            return CIRCUIT_OPEN_MESSAGE
+        try:
+            with metrics.span("gemini.queue"):
+                waiter = self.scheduler.acquire(priority)
+        except OutboundShed:
+            self.breaker.release(permit)
+            return SHED_MESSAGE
+
+        try:
+            with metrics.span("gemini.generate"):
+                return self._generate(prompt, permit)
+        finally:
+            self.scheduler.release(waiter)
+
+    def _generate(self, prompt: str, permit: Permit) -> str:
+        started = time.monotonic()
+        try:
+            response = self._session.post(self._url(), json=self._payload(prompt), headers=self._headers(),
+                                          timeout=self.timeouts.current)
+        except Exception as e:
+            self.breaker.record_failure(type(e).__name__, permit)
+            return f"AI service error: {str(e)}"
+
+        self._record_response(response.status_code, started, permit)
+        if response.status_code >= 400:
+            return self._http_error_message(response.status_code, response.text)
+        try:
+            return self._extract_text(response.json())
+        except Exception as e:
+            return f"AI service error: {str(e)}"
+
+    def stream(self, prompt: str, priority: str = "chat") -> Iterator[str]:
+        """Call streamGenerateContent and yield text chunks as they arrive
+
+        Raises GeminiStreamError on failure; chunks already yielded stay valid.
+        The scheduler slot is held until the stream ends.
+        """
+        if not self.api_key:
+            raise GeminiStreamError(NOT_CONFIGURED_MESSAGE)
+        permit = self.breaker.allow()
+        if permit is None:
+            raise GeminiStreamError(CIRCUIT_OPEN_MESSAGE)
+        try:
+            with metrics.span("gemini.queue"):
+                waiter = self.scheduler.acquire(priority)
+        except OutboundShed:
+            self.breaker.release(permit)
+            raise GeminiStreamError(SHED_MESSAGE)
+
+        try:
+            with metrics.span("gemini.stream"):
+                yield from self._stream(prompt, permit)
+        finally:
+            self.scheduler.release(waiter)
+
+    def _stream(self, prompt: str, permit: Permit) -> Iterator[str]:
+        started = time.monotonic()
+        recorded = False
+        try:
+            with self._session.post(self._url("streamGenerateContent") + "?alt=sse", json=self._payload(prompt),
+                                    headers=self._headers(), timeout=self.timeouts.current, stream=True) as response:
+                if response.status_code >= 400:
+                    recorded = True
+                    self._record_response(response.status_code, started, permit)
+                    raise GeminiStreamError(self._http_error_message(response.status_code, response.text))
+                for line in response.iter_lines(decode_unicode=True):
+                    text = self._stream_chunk_text(line or "")
+                    if text:
+                        yield text
+            recorded = True
+            self.breaker.record_success(permit)
+        except GeminiStreamError:
+            raise
+        except Exception as e:
+            recorded = True
+            self.breaker.record_failure(type(e).__name__, permit)
+            raise GeminiStreamError(f"AI service error: {str(e)}") from e
+        finally:
+            if not recorded:
+                # Reader went away mid-stream; the service was answering, so release a half-open probe
+                self.breaker.record_success(permit)
+
+    def _async_client(self) -> "httpx.AsyncClient":
+        """Shared connection pool for the running event loop"""
+        loop_id = id(asyncio.get_running_loop())
+        client = self._async_clients.get(loop_id)
+        if client is None:
+            limits = httpx.Limits(max_connections=int(os.getenv("GEMINI_MAX_CONNECTIONS", "200")),
+                                  max_keepalive_connections=50)
+            client = httpx.AsyncClient(timeout=self.timeout, limits=limits)
+            self._async_clients[loop_id] = client
+        return client
+
+    async def agenerate(self, prompt: str, priority: str = "chat") -> str:
+        """Call generateContent without blocking the event loop"""
+        if httpx is None:
+            return await asyncio.get_running_loop().run_in_executor(None, self.generate, prompt, priority)
+        if not self.coalesce:
+            return await self._ascheduled_generate(prompt, priority)
+        return await self.single_flight.ado(flight_key(self.model, prompt), self._ascheduled_generate,
+                                            prompt, priority)
+
+    async def _ascheduled_generate(self, prompt: str, priority: str) -> str:
+        if not self.api_key:
+            return NOT_CONFIGURED_MESSAGE
+        permit = self.breaker.allow()
+        if permit is None:
+            return CIRCUIT_OPEN_MESSAGE
+        try:
+            with metrics.span("gemini.queue"):
+                waiter = await self.scheduler.aacquire(priority)
+        except OutboundShed:
+            self.breaker.release(permit)
+            return SHED_MESSAGE
+        except asyncio.CancelledError:
+            self.breaker.release(permit)
+            raise
+
+        try:
+            with metrics.span("gemini.generate"):
+                return await self._agenerate(prompt, permit)
+        finally:
+            self.scheduler.release(waiter)
+
+    async def _agenerate(self, prompt: str, permit: Permit) -> str:
+        started = time.monotonic()
+        try:
+            response = await self._async_client().post(self._url(), json=self._payload(prompt), headers=self._headers(),
+                                                       timeout=self.timeouts.current)
+        except Exception as e:
+            self.breaker.record_failure(type(e).__name__, permit)
+            return f"AI service error: {str(e)}"
+
+        self._record_response(response.status_code, started, permit)
+        if response.status_code >= 400:
+            return self._http_error_message(response.status_code, response.text)
+        try:
+            return self._extract_text(response.json())
+        except Exception as e:
+            return f"AI service error: {str(e)}"
+
+    async def astream(self, prompt: str, priority: str = "chat") -> AsyncIterator[str]:
+        """Async counterpart of stream()"""
+        if httpx is None:
+            raise GeminiStreamError("AI service error: httpx is required for async streaming")
+        if not self.api_key:
+            raise GeminiStreamError(NOT_CONFIGURED_MESSAGE)
+        permit = self.breaker.allow()
+        if permit is None:
+            raise GeminiStreamError(CIRCUIT_OPEN_MESSAGE)
+        try:
+            with metrics.span("gemini.queue"):
+                waiter = await self.scheduler.aacquire(priority)
+        except OutboundShed:
+            self.breaker.release(permit)
+            raise GeminiStreamError(SHED_MESSAGE)
+        except asyncio.CancelledError:
+            self.breaker.release(permit)
+            raise
+
+        try:
+            with metrics.span("gemini.stream"):
+                async for text in self._astream(prompt, permit):
+                    yield text
+        finally:
+            self.scheduler.release(waiter)
+
+    async def _astream(self, prompt: str, permit: Permit) -> AsyncIterator[str]:
+        started = time.monotonic()
+        recorded = False
+        try:
+            async with self._async_client().stream("POST", self._url("streamGenerateContent") + "?alt=sse",
+                                                   json=self._payload(prompt), headers=self._headers(),
+                                                   timeout=self.timeouts.current) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    recorded = True
+                    self._record_response(response.status_code, started, permit)
+                    raise GeminiStreamError(self._http_error_message(response.status_code, response.text))
+                async for line in response.aiter_lines():
+                    text = self._stream_chunk_text(line)
+                    if text:
+                        yield text
+            recorded = True
+            self.breaker.record_success(permit)
+        except GeminiStreamError:
+            raise
+        except Exception as e:
+            recorded = True
+            self.breaker.record_failure(type(e).__name__, permit)
+            raise GeminiStreamError(f"AI service error: {str(e)}") from e
+        finally:
+            if not recorded:
+                self.breaker.record_success(permit)
+
+    async def aclose(self):
+        """Close the connection pool owned by the running event loop"""
+        client = self._async_clients.pop(id(asyncio.get_running_loop()), None)
+        if client is not None:
+            await client.aclose()
+
+
+# Global Gemini client instance
+gemini_client = GeminiClient()
+metrics.register_collector(gemini_client.metric_families)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=gemini_client.single_flight.reset)
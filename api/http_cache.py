@@ -0,0 +1,88 @@
+"""
+Conditional GET support for read-heavy endpoints
+Derives ETags from the table files' versions, without reading them, so
+unchanged resources are answered with 304 before any table is read. Every
+worker of a multi-process server computes the same ETag for the same data.
+Open journal responses also carry reaction counts that are not flushed yet,
+so their ETag includes a digest of those.
+"""
+
+import hashlib
+import time
+from datetime import date, datetime, timezone
+from functools import wraps
+from typing import Tuple
+
+from flask import make_response, request
+
+from .auth import get_current_user_id
+from .json_db import db
+from .reaction_counter import reaction_counter
+
+
+def compute_validators(tables: Tuple[str, ...], user_id: str = None):
+    """Build (etag, last_modified) for the current request from the tables' versions"""
+    parts = [request.full_path, user_id or "", date.today().isoformat()]
+    last_modified = 0.0
+    for table in tables:
+        version, modified = db.table_version(table)
+        parts.append(f"{table}:{version}")
+        last_modified = max(last_modified, modified)
+    if "open_journal" in tables:
+        pending = reaction_counter.pending_digest()
+        if pending:
+            # Counted but not yet written: the file's mtime doesn't reflect them
+            parts.append(f"reactions:{pending}")
+            last_modified = time.time()
+    etag = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:32]
+    return etag, last_modified
+
+
+def http_date(timestamp: float) -> datetime:
+    """Truncate a timestamp to the whole-second precision HTTP dates carry"""
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+
+
+def is_not_modified(etag: str, last_modified: float) -> bool:
+    """Check If-None-Match (preferred) or If-Modified-Since against the validators"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since:
+        return http_date(last_modified) <= request.if_modified_since
+    return False
+
+
+def conditional(*tables: str, per_user: bool = True):
+    """Decorator adding ETag/Last-Modified validation to a GET endpoint.
+
+    Must sit below jwt_required when per_user is set. Only 200 responses
+    get validators; errors are passed through untouched.
+    """
+    cache_control = "private, no-cache" if per_user else "public, no-cache"
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user_id = get_current_user_id() if per_user else None
+            etag, last_modified = compute_validators(tables, user_id)
+
+            if is_not_modified(etag, last_modified):
+                response = make_response("", 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            # A second write within the same second would share this date, so only
+            # advertise it once that second has passed
+            if int(last_modified) < int(time.time()):
+                response.last_modified = http_date(last_modified)
+            response.headers["Cache-Control"] = cache_control
+            if per_user:
+                response.headers["Vary"] = "Cookie, Authorization"
+            return response
+
+        return decorated_function
+
+    return decorator
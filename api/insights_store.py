@@ -0,0 +1,211 @@
+"""
+Append-only store for per-turn chat session insights
+Chat turns enqueue records into a bounded in-memory queue and return; a
+background writer appends them in batches to one JSON-lines file per day.
+When the writer falls behind, the oldest queued records are dropped and
+counted rather than blocking requests. Range queries read only the day
+partitions they cover, plus whatever is still queued.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Deque, Dict, Iterator, List, Optional
+
+from .metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within this process
+    fcntl = None
+
+
+class InsightsStore:
+    def __init__(self, root_dir: str, queue_size: int = 10000, flush_interval: float = 1.0):
+        self.root_dir = root_dir
+        self.flush_interval = flush_interval
+        self._queue: Deque[Dict] = deque(maxlen=queue_size)
+        self._queue_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._queue_lock:
+            if self._writer is not None:
+                return
+            os.makedirs(self.root_dir, exist_ok=True)
+            self._writer = threading.Thread(target=self._write_loop, name="insights-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+
+    def append(self, user_id: str, insights: Dict):
+        """Queue one turn's insights; never blocks on disk"""
+        self._ensure_writer()
+        record = dict(insights, user_id=user_id)
+        record.setdefault("timestamp", datetime.now().isoformat())
+        with self._queue_lock:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(record)
+
+    def _partition_path(self, day: str) -> str:
+        return os.path.join(self.root_dir, f"{day}.jsonl")
+
+    def flush(self):
+        """Append everything queued, one write per day partition"""
+        with self._write_lock:
+            with self._queue_lock:
+                batch = list(self._queue)
+                self._queue.clear()
+            if not batch:
+                return
+            partitions: Dict[str, List[str]] = {}
+            for record in batch:
+                partitions.setdefault(record["timestamp"][:10], []).append(json.dumps(record, default=str))
+            for day, lines in partitions.items():
+                try:
+                    self._append_lines(self._partition_path(day), lines)
+                    self.written += len(lines)
+                except OSError as e:
+                    self.write_errors += 1
+                    print(f"Error writing session insights: {e}")
+
+    def _append_lines(self, path: str, lines: List[str]):
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+
+    def _write_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing session insights: {e}")
+
+    def close(self):
+        """Stop the writer and write out anything still queued"""
+        self._stop.set()
+        self.flush()
+
+    def _days(self, start: date, end: date) -> Iterator[str]:
+        """Partition names between start and end (inclusive) that exist on disk"""
+        try:
+            names = sorted(name[:-6] for name in os.listdir(self.root_dir) if name.endswith(".jsonl"))
+        except FileNotFoundError:
+            return
+        for name in names:
+            if start.isoformat() <= name <= end.isoformat():
+                yield name
+
+    def query(self, user_id: str, start: date, end: date) -> List[Dict]:
+        """A user's insights with timestamps on days start..end, oldest first"""
+        low, high = start.isoformat(), (end + timedelta(days=1)).isoformat()
+        records = []
+        for day in self._days(start, end):
+            with open(self._partition_path(day)) as f:
+                for line in f:
+                    # Cheap substring test before parsing lines that belong to other users
+                    if user_id not in line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if record.get("user_id") == user_id:
+                        records.append(record)
+        with self._queue_lock:
+            records.extend(r for r in self._queue if r["user_id"] == user_id)
+        records = [r for r in records if low <= r.get("timestamp", "") < high]
+        records.sort(key=lambda r: r["timestamp"])
+        return records
+
+    def delete_user(self, user_id: str):
+        """Remove a user's records from every partition (account deletion)"""
+        with self._queue_lock:
+            kept = [r for r in self._queue if r["user_id"] != user_id]
+            self._queue.clear()
+            self._queue.extend(kept)
+        with self._write_lock:
+            for day in self._days(date.min, date.max):
+                path = self._partition_path(day)
+                with open(path, "r+") as f:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_EX)
+                    lines = f.readlines()
+                    kept_lines = [line for line in lines if user_id not in line or
+                                  not self._owned_or_corrupt(line, user_id)]
+                    if len(kept_lines) == len(lines):
+                        continue
+                    fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, suffix=".tmp")
+                    with os.fdopen(fd, "w") as tmp:
+                        tmp.writelines(kept_lines)
+                    os.replace(tmp_path, path)
+
+    @staticmethod
+    def _owned_or_corrupt(line: str, user_id: str) -> bool:
+        """Whether a line is the user's record, or unreadable (e.g. cut short by a crash) and mentions them"""
+        try:
+            return json.loads(line).get("user_id") == user_id
+        except json.JSONDecodeError:
+            return True
+
+    def stats(self) -> Dict:
+        with self._queue_lock:
+            queued = len(self._queue)
+        return {
+            "queued": queued,
+            "queue_size": self._queue.maxlen,
+            "written": self.written,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors
+        }
+
+    def metric_families(self):
+        """Queue depth and writer counters for /api/metrics"""
+        stats = self.stats()
+        return [
+            ("soupie_insights_queued", "gauge", "Session insight records waiting for the writer",
+             [({}, stats["queued"])]),
+            ("soupie_insights_written_total", "counter", "Session insight records appended to disk",
+             [({}, stats["written"])]),
+            ("soupie_insights_dropped_total", "counter", "Oldest queued records dropped because the queue was full",
+             [({}, stats["dropped"])]),
+            ("soupie_insights_write_errors_total", "counter", "Failed partition appends",
+             [({}, stats["write_errors"])])
+        ]
+
+
+def daily_trend(records: List[Dict]) -> List[Dict]:
+    """Per-day session counts, dominant emotions and risk flags"""
+    days: Dict[str, Dict] = {}
+    for record in records:
+        day = days.setdefault(record["timestamp"][:10], {"sessions": 0, "dominant_emotions": {}, "risk_flags": 0})
+        day["sessions"] += 1
+        emotion = record.get("dominant_emotion", "neutral")
+        day["dominant_emotions"][emotion] = day["dominant_emotions"].get(emotion, 0) + 1
+        if record.get("risk_flag"):
+            day["risk_flags"] += 1
+    return [dict(date=day, **summary) for day, summary in sorted(days.items())]
+
+
+# Global insights store, kept next to the JSON tables
+insights_store = InsightsStore(os.path.join(os.getenv("SOUPIE_DATA_DIR", "data"), "session_insights"),
+                               queue_size=int(os.getenv("INSIGHTS_QUEUE_SIZE", "10000")))
+metrics.register_collector(insights_store.metric_families)
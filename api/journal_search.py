@@ -0,0 +1,350 @@
+"""
+Full-text search over each user's private journal
+Keeps one in-memory inverted index per user (lowercased word tokens and
+their counts per entry), built on first search from the user's journal partition
+and then updated in place as entries are written, under a per-index lock that
+searches also hold. Results are ranked with
+BM25; "quoted phrases" must appear verbatim and snippets mark the matches.
+Indexes are checked against the table's write generation and rebuilt when
+another process has changed the user's entries.
+"""
+
+import heapq
+import html
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r"\w+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+# BM25 parameters (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+SNIPPET_TOKENS = 30
+
+# Phrase queries with more candidate entries than this are checked lazily, with an estimated total
+PHRASE_EXACT_LIMIT = 5000
+PHRASE_SAMPLE = 500
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return [token.lower() for token in TOKEN_RE.findall(text or "")]
+
+
+def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    """(free terms, phrases) from a query string; one-word phrases count as terms"""
+    terms: List[str] = []
+    phrases: List[List[str]] = []
+    for phrase, word in QUERY_RE.findall(query or ""):
+        tokens = tokenize(phrase if phrase else word)
+        if phrase and len(tokens) > 1:
+            phrases.append(tokens)
+        else:
+            terms.extend(tokens)
+    return terms, phrases
+
+
+def _contains(pattern: "re.Pattern", text: str) -> bool:
+    """Whether pattern matches text starting at a token boundary"""
+    for match in pattern.finditer(text):
+        start = match.start()
+        if start == 0 or not (text[start - 1].isalnum() or text[start - 1] == "_"):
+            return True
+    return False
+
+
+class UserSearchIndex:
+    """Inverted index over one user's journal entries
+
+    Postings hold term frequencies only. Phrases are checked against the
+    candidate entries' text with a pattern that matches exactly what the
+    tokenizer would see as adjacent tokens, which is cheaper than keeping
+    every token position in memory. Each term's postings are also cached in
+    descending BM25 impact order so top-k queries can stop early instead of
+    scoring every matching entry (Fagin's threshold algorithm).
+    """
+
+    # Rebuild cached impact orders once the average entry length drifts this far
+    AVERAGE_DRIFT = 0.05
+
+    def __init__(self):
+        # Held by searches (which also fill the impact-order cache) and by updates
+        self.lock = threading.Lock()
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.docs: Dict[str, Dict] = {}
+        self.total_length = 0
+        self._ranked: Dict[str, List[Tuple[float, str]]] = {}
+        self._ranked_average = 0.0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def build(self, records: List[Dict]):
+        for record in records:
+            self.add(record)
+
+    def add(self, record: Dict):
+        """Index a record, replacing any earlier version of it"""
+        doc_id = record["id"]
+        if doc_id in self.docs:
+            self.remove(doc_id)
+        tokens = tokenize(record.get("content"))
+        postings, ranked = self.postings, self._ranked
+        for token, tf in Counter(tokens).items():
+            docs = postings.get(token)
+            if docs is None:
+                docs = postings[token] = {}
+            docs[doc_id] = tf
+            if ranked:
+                ranked.pop(token, None)
+        self.docs[doc_id] = record
+        self.lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id: str):
+        record = self.docs.pop(doc_id, None)
+        if record is None:
+            return
+        for token in set(tokenize(record.get("content"))):
+            docs = self.postings.get(token)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[token]
+            self._ranked.pop(token, None)
+        self.total_length -= self.lengths.pop(doc_id)
+
+    def _phrase_candidates(self, phrases: List[List[str]]) -> Set[str]:
+        """Entries containing every token of every phrase, in any order"""
+        lists = sorted((self.postings.get(token) or {} for phrase in phrases for token in phrase), key=len)
+        return set(lists[0]).intersection(*lists[1:])
+
+    def _phrase_matcher(self, phrases: List[List[str]]) -> Callable[[str], bool]:
+        """Checks that an entry contains each phrase verbatim, memoizing the answers"""
+        # Tokens are maximal \w+ runs, so adjacent tokens are separated by exactly one \W+ run.
+        # A literal first token keeps the regex engine's fast prefix scan.
+        patterns = [re.compile(r"\W+".join(map(re.escape, phrase)) + r"(?!\w)") for phrase in phrases]
+        docs = self.docs
+        checked: Dict[str, bool] = {}
+
+        def matches(doc_id: str) -> bool:
+            found = checked.get(doc_id)
+            if found is None:
+                text = (docs[doc_id].get("content") or "").lower()
+                found = checked[doc_id] = all(_contains(pattern, text) for pattern in patterns)
+            return found
+        return matches
+
+    def _impact(self, tf: int, length: int, average_length: float) -> float:
+        return tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average_length))
+
+    def _ranked_postings(self, token: str) -> List[Tuple[float, str]]:
+        """The token's postings as (impact, doc_id), highest impact first"""
+        average_length = self.total_length / len(self.docs) or 1
+        if abs(average_length - self._ranked_average) > self.AVERAGE_DRIFT * self._ranked_average:
+            self._ranked.clear()
+            self._ranked_average = average_length
+        ranked = self._ranked.get(token)
+        if ranked is None:
+            lengths, impact, average = self.lengths, self._impact, self._ranked_average
+            ranked = sorted(((impact(tf, lengths[doc_id], average), doc_id)
+                             for doc_id, tf in self.postings[token].items()), reverse=True)
+            self._ranked[token] = ranked
+        return ranked
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[int, bool, List[Tuple[float, Dict]]]:
+        """(total matches, whether the total is exact, one page of (score, record)) for a query, best first
+
+        Free terms are OR-ed; every phrase must be present. When more than
+        PHRASE_EXACT_LIMIT entries hold all of a query's phrase tokens, only
+        the entries the ranking visits are checked for the phrases and the
+        total is estimated from a sample.
+        """
+        terms, phrases = parse_query(query)
+        tokens = [token for token in dict.fromkeys(terms + [t for phrase in phrases for t in phrase])
+                  if token in self.postings]
+        if not tokens or any(token not in self.postings for phrase in phrases for token in phrase):
+            return 0, True, []
+
+        n = len(self.docs)
+        weighted = []
+        for token in tokens:
+            df = len(self.postings[token])
+            weighted.append((math.log(1 + (n - df + 0.5) / (df + 0.5)), self._ranked_postings(token), token))
+
+        candidates: Optional[Set[str]] = None
+        accept: Optional[Callable[[str], bool]] = None
+        exact = True
+        if phrases:
+            candidates = self._phrase_candidates(phrases)
+            matches = self._phrase_matcher(phrases)
+            if len(candidates) <= PHRASE_EXACT_LIMIT:
+                candidates = {doc_id for doc_id in candidates if matches(doc_id)}
+                total = len(candidates)
+            else:
+                accept = matches
+                sample = list(islice(candidates, PHRASE_SAMPLE))
+                total = round(len(candidates) * sum(map(matches, sample)) / len(sample))
+                exact = False
+            if not total and exact:
+                return 0, True, []
+        elif len(weighted) == 1:
+            total = len(weighted[0][1])
+        else:
+            total = len(set().union(*(self.postings[token] for _, _, token in weighted)))
+
+        top = self._top(weighted, offset + limit, candidates, accept)
+        if not exact and len(top) < offset + limit:
+            # The ranking ran out of entries, so it has checked every candidate
+            total, exact = len(top), True
+        return total, exact, [(score, self.docs[doc_id]) for score, doc_id in top[offset:]]
+
+    def _top(self, weighted: List[Tuple[float, List[Tuple[float, str]], str]], k: int,
+             candidates: Optional[Set[str]], accept: Optional[Callable[[str], bool]]) -> List[Tuple[float, str]]:
+        """The k best (score, doc_id), walking the impact orders until no unseen entry can beat them"""
+        if k <= 0:
+            return []
+        lengths, average, postings = self.lengths, self._ranked_average, self.postings
+
+        def score(doc_id):
+            total = 0.0
+            for idf, _, token in weighted:
+                tf = postings[token].get(doc_id)
+                if tf:
+                    total += idf * self._impact(tf, lengths[doc_id], average)
+            return total
+
+        if candidates is not None and accept is None and len(candidates) <= k * 4:
+            return heapq.nlargest(k, ((score(doc_id), doc_id) for doc_id in candidates))
+
+        heap: List[Tuple[float, str]] = []
+        seen: Set[str] = set()
+        depth = 0
+        longest = max(len(ranked) for _, ranked, _ in weighted)
+        while depth < longest:
+            threshold = 0.0
+            for idf, ranked, _ in weighted:
+                if depth >= len(ranked):
+                    continue
+                impact, doc_id = ranked[depth]
+                threshold += idf * impact
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                if candidates is not None and doc_id not in candidates:
+                    continue
+                entry = (score(doc_id), doc_id)
+                if len(heap) == k and entry <= heap[0]:
+                    continue
+                if accept is not None and not accept(doc_id):
+                    continue
+                if len(heap) < k:
+                    heapq.heappush(heap, entry)
+                else:
+                    heapq.heapreplace(heap, entry)
+            if len(heap) == k and heap[0][0] >= threshold:
+                break
+            depth += 1
+        return sorted(heap, reverse=True)
+
+
+def snippet(content: str, query: str, window: int = SNIPPET_TOKENS) -> str:
+    """HTML-escaped excerpt around the first match with matched words wrapped in <mark>"""
+    terms, phrases = parse_query(query)
+    wanted = set(terms) | {token for phrase in phrases for token in phrase}
+    spans = [(m.start(), m.end(), m.group().lower()) for m in TOKEN_RE.finditer(content or "")]
+    if not spans:
+        return html.escape(content or "")
+
+    marked = [token in wanted for _, _, token in spans]
+    first = None
+    for phrase in phrases:
+        for i in range(len(spans) - len(phrase) + 1):
+            if all(spans[i + j][2] == phrase[j] for j in range(len(phrase))):
+                first = i if first is None else min(first, i)
+                break
+    if first is None:
+        first = next((i for i, hit in enumerate(marked) if hit), 0)
+
+    start = max(first - window // 3, 0)
+    end = min(start + window, len(spans))
+    cursor = spans[start][0] if start > 0 else 0
+    pieces = ["…" if start > 0 else ""]
+    for (begin, finish, _), hit in zip(spans[start:end], marked[start:end]):
+        pieces.append(html.escape(content[cursor:begin]))
+        word = html.escape(content[begin:finish])
+        pieces.append(f"<mark>{word}</mark>" if hit else word)
+        cursor = finish
+    pieces.append("…" if end < len(spans) else html.escape(content[cursor:]))
+    return "".join(pieces)
+
+
+class JournalSearch:
+    """Per-user search indexes for the private_journal table, least recently used evicted first"""
+
+    def __init__(self, database, max_users: int = 256):
+        self.db = database
+        self.max_users = max_users
+        self._indexes: "OrderedDict[str, Tuple[Tuple[int, ...], UserSearchIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _generation(self, user_id: str) -> Tuple[int, ...]:
+        return self.db.get_generation("private_journal", user_id)[0]
+
+    def index_for(self, user_id: str) -> UserSearchIndex:
+        """The user's index, built from their journal partition if missing or stale"""
+        generation = self._generation(user_id)
+        with self._lock:
+            cached = self._indexes.get(user_id)
+            if cached and cached[0] == generation:
+                self._indexes.move_to_end(user_id)
+                return cached[1]
+
+        partition = self.db.get_user_private_journal_index(user_id)
+        index = UserSearchIndex()
+        index.build(partition.newest(0, len(partition)))
+        with self._lock:
+            self._indexes[user_id] = (generation, index)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def index_record(self, record: Dict):
+        """Apply a created or updated entry to a loaded index (call with the table lock held)"""
+        user_id = record.get("user_id")
+        with self._lock:
+            cached = self._indexes.get(user_id)
+        if cached is None:
+            return
+        index = cached[1]
+        with index.lock:
+            index.add(record)
+        with self._lock:
+            if user_id in self._indexes and self._indexes[user_id][1] is index:
+                self._indexes[user_id] = (self._generation(user_id), index)
+
+    def drop_user(self, user_id: str):
+        with self._lock:
+            self._indexes.pop(user_id, None)
+
+    def search(self, user_id: str, query: str, limit: int = 20, offset: int = 0) -> Dict:
+        index = self.index_for(user_id)
+        with index.lock:
+            total, exact, hits = index.search(query, limit, offset)
+        return {
+            "total": total,
+            "total_exact": exact,
+            "results": [{
+                "id": record.get("id"),
+                "created_at": record.get("created_at"),
+                "score": round(score, 4),
+                "snippet": snippet(record.get("content", ""), query)
+            } for score, record in hits]
+        }
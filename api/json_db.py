@@ -5,13 +5,52 @@ Replaces SQLAlchemy with simple JSON file storage
 
 import json
 import os
+import tempfile
+import threading
+import time
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple
+
+from .change_log import ChangeLog, LogPosition
+from .emotion_analysis import analyze_entry
+from .feed_index import MergedIndex, TableIndex
+from .journal_search import JournalSearch
+from .metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: table locks only cover this process
+    fcntl = None
 
 class JSONDatabase:
+    # Tables kept in ordered (created_at, id) indexes, with their partition fields
+    INDEXED_TABLES = {
+        "open_journal": ("user_id", "emotion_tag"),
+        "private_journal": ("user_id",)
+    }
+
     def __init__(self, data_dir="data"):
         self.data_dir = data_dir
+        # table -> (file signature, index, change log position the index reflects)
+        self._indexes: Dict[str, Tuple[Optional[Tuple[int, int]], TableIndex, LogPosition]] = {}
+        self._change_logs = {table: ChangeLog(os.path.join(data_dir, f".{table}.changes"))
+                             for table in self.INDEXED_TABLES}
+        self._index_lock = threading.RLock()
+        # table -> callbacks for changes other processes logged, see add_change_listener
+        self._change_listeners: Dict[str, List[Callable[[List[Dict]], None]]] = {}
+        # Write generation counters: (table, None) counts writes not tied to a user,
+        # (table, user_id) counts a user's writes and (table, "*") counts every write
+        self._generations: Dict[Tuple[str, Optional[str]], int] = {}
+        self._modified_at: Dict[Tuple[str, Optional[str]], float] = {}
+        self._known_signatures: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._generation_lock = threading.Lock()
+        self._table_locks: Dict[str, threading.RLock] = {}
+        self._table_locks_guard = threading.Lock()
+        self._held = threading.local()
+        self._started_at = time.time()
+        self.journal_search = JournalSearch(self)
         self.ensure_data_dir()
         self.init_tables()
     
@@ -27,7 +66,9 @@ class JSONDatabase:
             "question_answer.json", 
             "private_journal.json",
             "open_journal.json",
-            "onboarding_records.json"
+            "open_journal_reactions.json",
+            "onboarding_records.json",
+            "mood_records.json"
         ]
         
         for table in tables:
@@ -40,27 +81,265 @@ class JSONDatabase:
         """Read data from a JSON table"""
         file_path = os.path.join(self.data_dir, f"{table_name}.json")
         try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
+            with metrics.span("db.read"), open(file_path, 'r') as f:
+                raw = f.read()
+            with metrics.span("db.parse"):
+                return json.loads(raw)
         except (FileNotFoundError, json.JSONDecodeError):
             return []
     
-    def _write_table(self, table_name: str, data: List[Dict]):
-        """Write data to a JSON table"""
+    def _iter_table(self, table_name: str, chunk_size: int = 65536) -> Iterator[Dict]:
+        """Stream records from a JSON table one at a time without loading the whole file"""
+        file_path = os.path.join(self.data_dir, f"{table_name}.json")
+        decoder = json.JSONDecoder()
+        try:
+            f = open(file_path, 'r')
+        except FileNotFoundError:
+            return
+        with f:
+            buffer = ""
+            pos = 0
+            started = False
+            while True:
+                # Skip whitespace and separators, refilling the buffer as needed
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,[":
+                    if buffer[pos] == "[":
+                        if started:
+                            break
+                        started = True
+                    pos += 1
+                if pos >= len(buffer):
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        return
+                    buffer, pos = buffer[pos:] + chunk, 0
+                    continue
+                if not started or buffer[pos] == "]":
+                    return
+                try:
+                    record, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        return
+                    buffer, pos = buffer[pos:] + chunk, 0
+                    continue
+                yield record
+                pos = end
+                if pos > chunk_size:
+                    buffer, pos = buffer[pos:], 0
+
+    def iter_user_records(self, table_name: str, user_id: str) -> Iterator[Dict]:
+        """Stream one user's records from a table"""
+        for record in self._iter_table(table_name):
+            if record.get("user_id") == user_id:
+                yield record
+
+    @contextmanager
+    def table_lock(self, table_name: str):
+        """Serialize read-modify-write cycles on a table across threads and processes
+
+        Re-entrant within a thread. Hold it from the _read_table that starts an
+        update until the matching _write_table, or concurrent writers lose updates.
+        """
+        with self._table_locks_guard:
+            lock = self._table_locks.setdefault(table_name, threading.RLock())
+        with lock:
+            held = self._held.__dict__.setdefault("tables", {})
+            depth = held.get(table_name, 0)
+            lock_file = None
+            if depth == 0 and fcntl is not None:
+                lock_file = open(os.path.join(self.data_dir, f".{table_name}.lock"), 'a')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            held[table_name] = depth + 1
+            try:
+                yield
+            finally:
+                held[table_name] = depth
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+
+    def _write_table(self, table_name: str, data: List[Dict], reindex: bool = True,
+                     user_id: Optional[str] = None):
+        """Write data to a JSON table
+
+        Writes a temporary file and renames it over the table, so readers see
+        either the old or the new contents and never a half-written file.
+        """
         file_path = os.path.join(self.data_dir, f"{table_name}.json")
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        with metrics.span("db.serialize"):
+            raw = json.dumps(data, indent=2, default=str)
+        with metrics.span("db.write"):
+            fd, tmp_path = tempfile.mkstemp(dir=self.data_dir, prefix=f".{table_name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(raw)
+                os.replace(tmp_path, file_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        self._bump_generation(table_name, user_id)
+        if reindex and table_name in self.INDEXED_TABLES:
+            # A full rewrite can't be described as a delta: start a new log so other processes rebuild
+            position = self._change_logs[table_name].rotate()
+            if table_name in self._indexes:
+                self._rebuild_index(table_name, data, position)
+
+    def _bump_generation(self, table_name: str, user_id: Optional[str] = None):
+        """Record a write to a table, scoped to a user when the writer knows it"""
+        now = time.time()
+        with self._generation_lock:
+            for key in ((table_name, "*"), (table_name, user_id)):
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self._modified_at[key] = now
+            self._known_signatures[table_name] = self._table_signature(table_name)
+
+    def get_generation(self, table_name: str, user_id: Optional[str] = None) -> Tuple[Tuple[int, ...], float]:
+        """Get (generation counters, last modified time) for a table or one user's view of it.
+
+        Never reads the table; a stat call detects writes made by other processes,
+        which are counted as writes not tied to a user.
+        """
+        signature = self._table_signature(table_name)
+        with self._generation_lock:
+            known = self._known_signatures.setdefault(table_name, signature)
+            if known != signature:
+                self._known_signatures[table_name] = signature
+                for key in ((table_name, "*"), (table_name, None)):
+                    self._generations[key] = self._generations.get(key, 0) + 1
+                    self._modified_at[key] = time.time()
+
+            keys = [(table_name, "*")] if user_id is None else [(table_name, None), (table_name, user_id)]
+            counters = tuple(self._generations.get(key, 0) for key in keys)
+            modified = max(self._modified_at.get(key, self._started_at) for key in keys)
+            return counters, modified
+
+    def table_version(self, table_name: str) -> Tuple[str, float]:
+        """(version token, last modified time) of a table's file, the same in every process
+
+        Every write replaces the file, so its inode, mtime and size change
+        together; the table is never read.
+        """
+        try:
+            stat = os.stat(os.path.join(self.data_dir, f"{table_name}.json"))
+        except OSError:
+            return "missing", self._started_at
+        return f"{stat.st_ino}.{stat.st_mtime_ns}.{stat.st_size}", stat.st_mtime
+
+    def _table_signature(self, table_name: str) -> Optional[Tuple[int, int]]:
+        """Cheap change detector for a table file (mtime, size)"""
+        try:
+            stat = os.stat(os.path.join(self.data_dir, f"{table_name}.json"))
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _rebuild_index(self, table_name: str, records: List[Dict],
+                       position: Optional[LogPosition] = None) -> TableIndex:
+        """Rebuild an ordered index from records that were just read or written
+
+        Call with the table lock held, so records and the log position agree.
+        """
+        with self._index_lock, metrics.span("db.index_rebuild"):
+            index = TableIndex(self.INDEXED_TABLES[table_name])
+            index.build(records)
+            position = position or self._change_logs[table_name].position()
+            self._indexes[table_name] = (self._table_signature(table_name), index, position)
+            return index
+
+    def get_index(self, table_name: str) -> TableIndex:
+        """Get the ordered index for a table, catching up on other processes' writes
+
+        Writes that were logged as inserts or field updates are replayed from the
+        table's change log; the index is only rebuilt after a full rewrite.
+        """
+        with self._index_lock:
+            cached = self._indexes.get(table_name)
+            if cached and cached[0] == self._table_signature(table_name):
+                return cached[1]
+        with self.table_lock(table_name), self._index_lock:
+            cached = self._indexes.get(table_name)
+            signature = self._table_signature(table_name)
+            if cached and cached[0] == signature:
+                return cached[1]
+            if cached:
+                caught_up = self._change_logs[table_name].read_from(cached[2])
+                if caught_up is not None:
+                    entries, position = caught_up
+                    with metrics.span("db.index_catch_up"):
+                        self._catch_up(table_name, cached[1], entries)
+                    self._indexes[table_name] = (signature, cached[1], position)
+                    return cached[1]
+            return self._rebuild_index(table_name, self._read_table(table_name))
+
+    def _log_changes(self, table_name: str, entries: List[Dict]):
+        """Record inserts/updates just written to an indexed table, for this process's index and every other's
+
+        Call with the table lock held, after writing the table.
+        """
+        log = self._change_logs[table_name]
+        with self._index_lock:
+            cached = self._indexes.get(table_name)
+            missed = log.read_from(cached[2]) if cached else None
+            position = log.append(entries)
+            if missed is None:
+                # Not loaded here, or the log was rotated under it: build lazily on next use
+                self._indexes.pop(table_name, None)
+                return
+            self._catch_up(table_name, cached[1], missed[0])
+            self._apply_changes(cached[1], entries)
+            self._indexes[table_name] = (self._table_signature(table_name), cached[1], position)
+
+    def add_change_listener(self, table_name: str, listener: Callable[[List[Dict]], None]):
+        """Call listener(entries) with the changes other processes logged to a table as this process catches up
+
+        Listeners run with the table lock held, so they must not call back into
+        the database.
+        """
+        self._change_listeners.setdefault(table_name, []).append(listener)
+
+    def _catch_up(self, table_name: str, index: TableIndex, entries: List[Dict]):
+        """Apply another process's logged changes to an index and pass them to the table's listeners"""
+        self._apply_changes(index, entries)
+        if not entries:
+            return
+        for listener in self._change_listeners.get(table_name, ()):
+            try:
+                listener(entries)
+            except Exception as e:
+                print(f"Change listener error for {table_name}: {e}")
+
+    @staticmethod
+    def _apply_changes(index: TableIndex, entries: List[Dict]):
+        for entry in entries:
+            if entry["op"] == "insert":
+                index.insert(entry["record"])
+            else:
+                record = index.all.get(entry["id"])
+                if record is not None:
+                    record.update(entry["fields"])
+
+    def _insert_record(self, table_name: str, record: Dict):
+        """Append a record to a table and maintain its index incrementally"""
+        with self.table_lock(table_name):
+            records = self._read_table(table_name)
+            records.append(record)
+            self._write_table(table_name, records, reindex=False, user_id=record.get("user_id"))
+            if table_name in self.INDEXED_TABLES:
+                self._log_changes(table_name, [{"op": "insert", "record": record}])
     
     def create_user(self, user_data: Dict) -> str:
         """Create a new user"""
-        users = self._read_table("user_registration")
         user_id = str(uuid.uuid4())
         user_data.update({
             "id": user_id,
             "created_at": datetime.utcnow().isoformat()
         })
-        users.append(user_data)
-        self._write_table("user_registration", users)
+        with self.table_lock("user_registration"):
+            users = self._read_table("user_registration")
+            users.append(user_data)
+            self._write_table("user_registration", users, user_id=user_id)
         return user_id
     
     def get_user_by_email(self, email: str) -> Optional[Dict]:
@@ -81,17 +360,24 @@ class JSONDatabase:
     
     def update_user(self, user_id: str, updates: Dict) -> bool:
         """Update user data"""
-        users = self._read_table("user_registration")
-        for i, user in enumerate(users):
-            if user.get("id") == user_id:
-                users[i].update(updates)
-                self._write_table("user_registration", users)
-                return True
-        return False
+        return bool(self.update_users({user_id: updates}))
+
+    def update_users(self, updates: Dict[str, Dict]) -> int:
+        """Apply updates to several users in one table write; returns how many users were found"""
+        with self.table_lock("user_registration"):
+            users = self._read_table("user_registration")
+            updated = []
+            for user in users:
+                user_updates = updates.get(user.get("id"))
+                if user_updates is not None:
+                    user.update(user_updates)
+                    updated.append(user["id"])
+            if updated:
+                self._write_table("user_registration", users, user_id=updated[0] if len(updated) == 1 else None)
+        return len(updated)
     
     def create_question_answer(self, user_id: str, question: str, answer: str) -> str:
         """Create a question-answer entry"""
-        qa_data = self._read_table("question_answer")
         qa_id = str(uuid.uuid4())
         qa_entry = {
             "id": qa_id,
@@ -100,8 +386,10 @@ class JSONDatabase:
             "answer": answer,
             "created_at": datetime.utcnow().isoformat()
         }
-        qa_data.append(qa_entry)
-        self._write_table("question_answer", qa_data)
+        with self.table_lock("question_answer"):
+            qa_data = self._read_table("question_answer")
+            qa_data.append(qa_entry)
+            self._write_table("question_answer", qa_data, user_id=user_id)
         return qa_id
     
     def get_user_question_answers(self, user_id: str) -> List[Dict]:
@@ -111,17 +399,18 @@ class JSONDatabase:
     
     def create_private_journal(self, user_id: str, content: str, ai_summary: str = None) -> str:
         """Create a private journal entry"""
-        journals = self._read_table("private_journal")
         journal_id = str(uuid.uuid4())
         journal_entry = {
             "id": journal_id,
             "user_id": user_id,
             "content": content,
             "ai_summary": ai_summary,
-            "created_at": datetime.utcnow().isoformat()
+            "created_at": datetime.utcnow().isoformat(),
+            **analyze_entry(content)
         }
-        journals.append(journal_entry)
-        self._write_table("private_journal", journals)
+        with self.table_lock("private_journal"):
+            self._insert_record("private_journal", journal_entry)
+            self.journal_search.index_record(journal_entry)
         return journal_id
     
     def get_user_private_journals(self, user_id: str) -> List[Dict]:
@@ -139,60 +428,130 @@ class JSONDatabase:
     
     def update_private_journal(self, journal_id: str, updates: Dict) -> bool:
         """Update a private journal entry"""
-        journals = self._read_table("private_journal")
-        for journal in journals:
-            if journal.get("id") == journal_id:
-                journal.update(updates)
-                self._write_table("private_journal", journals)
-                return True
+        if "content" in updates:
+            updates = dict(updates, **analyze_entry(updates["content"]))
+        with self.table_lock("private_journal"):
+            journals = self._read_table("private_journal")
+            for journal in journals:
+                if journal.get("id") == journal_id:
+                    journal.update(updates)
+                    self._write_table("private_journal", journals, reindex=False, user_id=journal.get("user_id"))
+                    self._log_changes("private_journal", [{"op": "update", "id": journal_id, "fields": updates}])
+                    self.journal_search.index_record(journal)
+                    return True
         return False
     
     def create_open_journal(self, user_id: str, content: str, emotion_tag: str = None) -> str:
         """Create an open journal entry"""
-        journals = self._read_table("open_journal")
         journal_id = str(uuid.uuid4())
         journal_entry = {
             "id": journal_id,
             "user_id": user_id,
             "content": content,
             "emotion_tag": emotion_tag,
-            "created_at": datetime.utcnow().isoformat()
+            "created_at": datetime.utcnow().isoformat(),
+            **analyze_entry(content)
         }
-        journals.append(journal_entry)
-        self._write_table("open_journal", journals)
+        self._insert_record("open_journal", journal_entry)
         return journal_id
     
     def get_all_open_journals(self) -> List[Dict]:
         """Get all open journal entries"""
         return self._read_table("open_journal")
     
+    def get_reaction_keys(self) -> List[Tuple[str, str, str]]:
+        """Get every recorded (journal_id, user_id, kind) reaction or flag"""
+        return [(r.get("journal_id"), r.get("user_id"), r.get("kind"))
+                for r in self._read_table("open_journal_reactions")]
+
+    def apply_reaction_counts(self, deltas: Dict[str, Dict[str, int]], keys: List[Tuple[str, str, str]]) -> int:
+        """Add buffered reaction/flag deltas to open journal records in one write
+
+        Each process only knows the reactions it has seen, so keys already
+        recorded (by another worker of a multi-process server) are dropped
+        here along with their deltas. Returns how many were dropped.
+        """
+        with self.table_lock("open_journal"), self.table_lock("open_journal_reactions"):
+            reactions = self._read_table("open_journal_reactions")
+            recorded = {(r.get("journal_id"), r.get("user_id"), r.get("kind")) for r in reactions}
+            new_keys = []
+            deltas = {journal_id: dict(counts) for journal_id, counts in deltas.items()}
+            for key in keys:
+                if key in recorded:
+                    deltas[key[0]][key[2]] -= 1
+                else:
+                    recorded.add(key)
+                    new_keys.append(key)
+            if not new_keys:
+                return len(keys)
+
+            journals = self._read_table("open_journal")
+            changes = []
+            for journal in journals:
+                counts = deltas.get(journal.get("id"))
+                if not counts or not any(counts.values()):
+                    continue
+                for kind, delta in counts.items():
+                    if kind == "flag":
+                        journal["flag_count"] = journal.get("flag_count", 0) + delta
+                    else:
+                        reactions_count = journal.setdefault("reactions", {})
+                        reactions_count[kind] = reactions_count.get(kind, 0) + delta
+                # Logged as totals rather than deltas, so replaying over a fresher index is harmless
+                changes.append({"op": "update", "id": journal["id"], "fields": {
+                    field: journal[field] for field in ("flag_count", "reactions") if field in journal}})
+            self._write_table("open_journal", journals, reindex=False)
+            self._log_changes("open_journal", changes)
+
+            now = datetime.utcnow().isoformat()
+            reactions.extend({"journal_id": journal_id, "user_id": user_id, "kind": kind, "created_at": now}
+                             for journal_id, user_id, kind in new_keys)
+            self._write_table("open_journal_reactions", reactions)
+            return len(keys) - len(new_keys)
+
     def get_user_open_journals(self, user_id: str) -> List[Dict]:
         """Get open journals for a specific user"""
         journals = self._read_table("open_journal")
         return [j for j in journals if j.get("user_id") == user_id]
+
+    def get_open_journal_index(self):
+        """Ordered index over all open journal entries"""
+        return self.get_index("open_journal").all
+
+    def get_user_open_journal_index(self, user_id: str):
+        """Ordered index over one user's open journal entries"""
+        return self.get_index("open_journal").partition("user_id", user_id)
+
+    def get_user_journal_index(self, user_id: str) -> MergedIndex:
+        """Newest-first view over a user's private and open journal entries together"""
+        return MergedIndex([self.get_user_private_journal_index(user_id), self.get_user_open_journal_index(user_id)])
+
+    def get_open_journal_tag_index(self, emotion_tags: List[str]):
+        """Newest-first view over the open journal entries carrying any of the given emotion tags"""
+        return self.get_index("open_journal").partitions_union("emotion_tag", emotion_tags)
+
+    def get_open_journal_tag_counts(self) -> Dict[str, int]:
+        """Number of open journal entries per emotion tag"""
+        return self.get_index("open_journal").facet_counts("emotion_tag")
+
+    def get_open_journal_by_id(self, journal_id: str) -> Optional[Dict]:
+        """Get a specific open journal entry by ID"""
+        return self.get_open_journal_index().get(journal_id)
+
+    def get_user_private_journal_index(self, user_id: str):
+        """Ordered index over one user's private journal entries"""
+        return self.get_index("private_journal").partition("user_id", user_id)
     
     def delete_user(self, user_id: str) -> bool:
         """Delete a user and all their data"""
         try:
-            # Delete from user_registration
-            users = self._read_table("user_registration")
-            users = [u for u in users if u.get("id") != user_id]
-            self._write_table("user_registration", users)
-            
-            # Delete from question_answer
-            qa_entries = self._read_table("question_answer")
-            qa_entries = [qa for qa in qa_entries if qa.get("user_id") != user_id]
-            self._write_table("question_answer", qa_entries)
-            
-            # Delete from private_journal
-            private_journals = self._read_table("private_journal")
-            private_journals = [pj for pj in private_journals if pj.get("user_id") != user_id]
-            self._write_table("private_journal", private_journals)
-            
-            # Delete from open_journal
-            open_journals = self._read_table("open_journal")
-            open_journals = [oj for oj in open_journals if oj.get("user_id") != user_id]
-            self._write_table("open_journal", open_journals)
+            for table_name, owner_field in (("user_registration", "id"), ("question_answer", "user_id"),
+                                            ("private_journal", "user_id"), ("open_journal", "user_id")):
+                with self.table_lock(table_name):
+                    records = self._read_table(table_name)
+                    records = [r for r in records if r.get(owner_field) != user_id]
+                    self._write_table(table_name, records, user_id=user_id)
+            self.journal_search.drop_user(user_id)
             
             return True
         except Exception:
@@ -204,12 +563,10 @@ class JSONDatabase:
             onboarding_data['id'] = str(uuid.uuid4())
             onboarding_data['created_at'] = datetime.now().isoformat()
             
-            # Read existing records
-            records = self._read_table("onboarding_records")
-            records.append(onboarding_data)
-            
-            # Write back to file
-            self._write_table("onboarding_records", records)
+            with self.table_lock("onboarding_records"):
+                records = self._read_table("onboarding_records")
+                records.append(onboarding_data)
+                self._write_table("onboarding_records", records, user_id=onboarding_data.get("user_id"))
             
             return onboarding_data['id']
         except Exception as e:
@@ -227,8 +584,8 @@ class JSONDatabase:
         except Exception:
             return None
 
-# Global database instance
-db = JSONDatabase()
+# Global database instance (SOUPIE_DATA_DIR lets tools point it at scratch data)
+db = JSONDatabase(os.getenv("SOUPIE_DATA_DIR", "data"))
 
 # Database session dependency (compatible with Flask)
 def get_db():
@@ -0,0 +1,178 @@
+"""
+In-process metrics for Soupie
+Timing spans around storage, scoring, auth and Gemini calls are aggregated
+into fixed-bucket histograms labelled with the route being served, next to
+per-route request latency, and rendered in the Prometheus text format for
+/api/metrics. A span costs two clock reads, a bisect and an uncontended
+lock, so it stays on in production; SOUPIE_METRICS=0 turns recording off.
+"""
+
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds, from cached index lookups up to slow model calls
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0)
+
+# Route template of the request being served ("-" outside a request)
+current_route: contextvars.ContextVar = contextvars.ContextVar("soupie_route", default="-")
+
+# A collector returns (name, type, help, [(labels, value), ...]) families computed at scrape time
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Span:
+    __slots__ = ("registry", "name", "started")
+
+    def __init__(self, registry: "MetricsRegistry", name: str):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.registry.observe("soupie_span_seconds", time.perf_counter() - self.started,
+                              (current_route.get(), self.name))
+
+
+class _Family:
+    def __init__(self, kind: str, help_text: str, labelnames: Tuple[str, ...], buckets: Tuple[float, ...] = None):
+        self.kind = kind
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.series: Dict[Tuple[str, ...], object] = {}
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._families: Dict[str, _Family] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self._families.setdefault(name, _Family("histogram", help_text, labelnames, buckets))
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self._families.setdefault(name, _Family("counter", help_text, labelnames))
+
+    def register_collector(self, collector: Collector):
+        self._collectors.append(collector)
+
+    def observe(self, name: str, value: float, labels: Tuple[str, ...] = ()):
+        if not self.enabled:
+            return
+        family = self._families[name]
+        with self._lock:
+            histogram = family.series.get(labels)
+            if histogram is None:
+                histogram = family.series[labels] = Histogram(family.buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, labels: Tuple[str, ...] = (), amount: float = 1):
+        if not self.enabled:
+            return
+        family = self._families[name]
+        with self._lock:
+            family.series[labels] = family.series.get(labels, 0) + amount
+
+    def span(self, name: str):
+        """Context manager timing a block as span `name` of the current route"""
+        return _Span(self, name) if self.enabled else nullcontext()
+
+    def timed(self, name: str):
+        """Decorator form of span()"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record_request(self, route: str, method: str, status: int, seconds: float):
+        self.observe("soupie_request_seconds", seconds, (route, method))
+        self.inc("soupie_requests_total", (route, method, str(status)))
+
+    def render(self) -> str:
+        """All families in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            snapshot = [(name, family, dict(family.series) if family.kind == "counter" else
+                         {labels: (list(h.counts), h.sum, h.count) for labels, h in family.series.items()})
+                        for name, family in sorted(self._families.items())]
+        for name, family, series in snapshot:
+            lines.append(f"# HELP {name} {family.help}")
+            lines.append(f"# TYPE {name} {family.kind}")
+            for labels, value in sorted(series.items()):
+                pairs = list(zip(family.labelnames, labels))
+                if family.kind == "counter":
+                    lines.append(f"{name}{_labels(pairs)} {_number(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(family.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else _number(bound)
+                    lines.append(f"{name}_bucket{_labels(pairs + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(pairs)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(pairs)} {count}")
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(list(labels.items()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _number(value: Optional[float]) -> str:
+    if value is None:
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Global registry instance
+metrics = MetricsRegistry(enabled=os.getenv("SOUPIE_METRICS", "1") != "0")
+metrics.histogram("soupie_request_seconds", "Time to produce each response, by route template",
+                  ("route", "method"))
+metrics.counter("soupie_requests_total", "Responses by route template and status", ("route", "method", "status"))
+metrics.histogram("soupie_span_seconds", "Time spent in instrumented hot-path spans, by route", ("route", "span"))
+metrics.histogram("soupie_chat_ttft_seconds", "Time to first streamed chat token")
+metrics.histogram("soupie_crisis_response_seconds", "Time from a crisis chat message to its helpline response")
@@ -0,0 +1,245 @@
+"""
+Admission control for outbound AI requests
+Caps concurrent Gemini calls, paces them with a token bucket sized to the
+provider quota and admits queued work by priority class (chat, then journal
+summaries, then onboarding enrichment). Work still queued when its class
+deadline passes is shed so callers can use their fallbacks instead.
+Serves both blocking threads and asyncio tasks from one queue.
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Deque, Dict, List, Optional
+
+# Priority classes, most urgent first
+PRIORITY_CLASSES = ("chat", "summary", "onboarding")
+
+# Longest a request of each class may wait in the queue before it is shed
+DEFAULT_DEADLINES = {"chat": 15.0, "summary": 8.0, "onboarding": 4.0}
+
+
+class OutboundShed(Exception):
+    """A queued request was dropped because its class deadline passed"""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, now: float) -> bool:
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until the next token is available"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class _Waiter:
+    __slots__ = ("rank", "seq", "klass", "enqueued", "deadline", "admitted", "cancelled", "event", "loop", "future")
+
+    def __init__(self, klass: str, seq: int, deadline: float):
+        self.rank = PRIORITY_CLASSES.index(klass)
+        self.seq = seq
+        self.klass = klass
+        self.enqueued = time.monotonic()
+        self.deadline = self.enqueued + deadline
+        self.admitted = False
+        self.cancelled = False
+        self.event: Optional[threading.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.future: Optional[asyncio.Future] = None
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.rank, self.seq) < (other.rank, other.seq)
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+    def reset(self):
+        """Re-arm the wake signal before waiting again"""
+        if self.event is not None:
+            self.event.clear()
+        elif self.future.done():
+            self.future = self.loop.create_future()
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _ClassStats:
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+        self.queue_times: Deque[float] = deque(maxlen=500)
+
+
+class OutboundScheduler:
+    def __init__(self, max_in_flight: int = 32, rate_per_minute: float = 1000, burst: int = 50,
+                 deadlines: Dict[str, float] = None):
+        self.max_in_flight = max_in_flight
+        self.rate_per_minute = rate_per_minute
+        self._bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self._lock = threading.Lock()
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        deadlines = dict(DEFAULT_DEADLINES, **(deadlines or {}))
+        self._stats = {klass: _ClassStats(deadlines[klass]) for klass in PRIORITY_CLASSES}
+
+    def _enqueue(self, klass: str) -> _Waiter:
+        if klass not in self._stats:
+            raise ValueError(f"Unknown priority class: {klass}")
+        waiter = _Waiter(klass, next(self._seq), self._stats[klass].deadline)
+        heapq.heappush(self._queue, waiter)
+        self._stats[klass].queued += 1
+        return waiter
+
+    def _dispatch(self, caller: _Waiter = None):
+        """Admit queued requests in priority order while capacity and tokens last (lock held)"""
+        now = time.monotonic()
+        while self._queue and self._in_flight < self.max_in_flight:
+            head = self._queue[0]
+            if head.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            if not self._bucket.take(now):
+                # Capacity but no token: nudge the head so it times the next refill itself
+                if head is not caller:
+                    head.wake()
+                break
+            heapq.heappop(self._queue)
+            head.admitted = True
+            self._in_flight += 1
+            stats = self._stats[head.klass]
+            stats.queued -= 1
+            stats.admitted += 1
+            stats.queue_times.append(now - head.enqueued)
+            head.wake()
+
+    def _poll(self, waiter: _Waiter) -> Optional[float]:
+        """Try to admit `waiter` (lock held); returns how long to wait before retrying, or None once admitted"""
+        if not waiter.admitted:
+            self._dispatch(waiter)
+        if waiter.admitted:
+            return None
+        waiter.reset()
+        now = time.monotonic()
+        if now >= waiter.deadline:
+            self._drop(waiter)
+            self._stats[waiter.klass].shed += 1
+            raise OutboundShed(f"{waiter.klass} request waited longer than {self._stats[waiter.klass].deadline:g}s")
+        # Admission happens on release or nudge (which wake us) or when a token refills (which we time ourselves)
+        remaining = waiter.deadline - now
+        if self._in_flight < self.max_in_flight:
+            return min(remaining, max(self._bucket.wait_time(now), 0.001))
+        return remaining
+
+    def _drop(self, waiter: _Waiter):
+        waiter.cancelled = True
+        self._stats[waiter.klass].queued -= 1
+
+    def acquire(self, klass: str) -> _Waiter:
+        """Block the calling thread until a slot is granted; raises OutboundShed"""
+        with self._lock:
+            waiter = self._enqueue(klass)
+            waiter.event = threading.Event()
+        while True:
+            with self._lock:
+                timeout = self._poll(waiter)
+            if timeout is None:
+                return waiter
+            waiter.event.wait(timeout)
+
+    async def aacquire(self, klass: str) -> _Waiter:
+        """Wait without blocking the event loop until a slot is granted; raises OutboundShed"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiter = self._enqueue(klass)
+            waiter.loop = loop
+            waiter.future = loop.create_future()
+        try:
+            while True:
+                with self._lock:
+                    timeout = self._poll(waiter)
+                if timeout is None:
+                    return waiter
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.admitted:
+                    self._release(waiter)
+                elif not waiter.cancelled:
+                    self._drop(waiter)
+            raise
+
+    def _release(self, waiter: _Waiter):
+        self._in_flight -= 1
+        self._dispatch()
+
+    def release(self, waiter: _Waiter):
+        with self._lock:
+            self._release(waiter)
+
+    @contextmanager
+    def slot(self, klass: str):
+        waiter = self.acquire(klass)
+        try:
+            yield
+        finally:
+            self.release(waiter)
+
+    @asynccontextmanager
+    async def aslot(self, klass: str):
+        waiter = await self.aacquire(klass)
+        try:
+            yield
+        finally:
+            self.release(waiter)
+
+    def snapshot(self) -> Dict:
+        """Queue depth, admissions, sheds and recent queue-time percentiles per class"""
+        with self._lock:
+            classes = {}
+            for klass, stats in self._stats.items():
+                times = sorted(stats.queue_times)
+                classes[klass] = {
+                    "queued": stats.queued,
+                    "admitted": stats.admitted,
+                    "shed": stats.shed,
+                    "deadline_s": stats.deadline,
+                    "queue_p50_ms": round(times[len(times) // 2] * 1000, 1) if times else None,
+                    "queue_p95_ms": round(times[max(int(len(times) * 0.95) - 1, 0)] * 1000, 1) if times else None
+                }
+            return {
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "rate_per_minute": self.rate_per_minute,
+                "classes": classes
+            }
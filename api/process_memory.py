@@ -0,0 +1,57 @@
+"""
+Per-process memory accounting
+RSS counts every page a process maps, including pages it shares with its
+siblings after a fork. USS (unique set size: private clean + private dirty
+pages) is what a process would free if it exited, and PSS splits each shared
+page evenly between the processes mapping it, so USS is the number to watch
+when checking that forked workers really share the master's preloaded state.
+Linux only; elsewhere the figures are reported as unavailable.
+"""
+
+import os
+from typing import Dict, Optional
+
+from .metrics import metrics
+
+SMAPS_FIELDS = {"Rss": "rss", "Pss": "pss", "Private_Clean": "private_clean", "Private_Dirty": "private_dirty"}
+
+
+def memory_usage(pid: Optional[int] = None) -> Optional[Dict[str, int]]:
+    """{rss, pss, uss} in bytes for a process (default: this one), or None if /proc is unavailable"""
+    try:
+        with open(f"/proc/{pid or os.getpid()}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    usage = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        if name in SMAPS_FIELDS:
+            usage[SMAPS_FIELDS[name]] = int(value.split()[0]) * 1024
+    return {
+        "rss": usage.get("rss", 0),
+        "pss": usage.get("pss", 0),
+        "uss": usage.get("private_clean", 0) + usage.get("private_dirty", 0)
+    }
+
+
+def format_usage(usage: Optional[Dict[str, int]]) -> str:
+    if usage is None:
+        return "unavailable"
+    return " ".join(f"{name}={usage[name] / 1048576:.1f}MiB" for name in ("uss", "pss", "rss"))
+
+
+def metric_families():
+    """This process's memory as metric families for /api/metrics"""
+    usage = memory_usage()
+    if usage is None:
+        return []
+    pid = str(os.getpid())
+    return [
+        ("soupie_process_memory_bytes", "gauge", "Memory of the worker serving the scrape (uss, pss, rss)",
+         [({"pid": pid, "kind": kind}, value) for kind, value in usage.items()])
+    ]
+
+
+# Report the scraped worker's memory in /api/metrics
+metrics.register_collector(metric_families)
@@ -0,0 +1,118 @@
+"""
+On-demand sampling profiler for live workers
+A background thread snapshots every thread's stack with sys._current_frames()
+at a fixed interval and counts identical stacks, producing the collapsed
+format flamegraph tools read ("route;file:func;file:func count"). Threads
+serving a request are tagged with its route so samples can be grouped by
+route. A signal-based sampler would only ever see the main thread, which
+never serves requests under the threaded servers Soupie runs on.
+
+Covers the threads of the process that receives the capture request only.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+MAX_SECONDS = 120
+MIN_INTERVAL = 0.001
+
+
+class ProfilerBusy(Exception):
+    """A capture is already running in this process"""
+
+
+class SamplingProfiler:
+    def __init__(self):
+        # thread ident -> route template of the request it is serving
+        self._thread_routes: Dict[int, str] = {}
+        self._capture_lock = threading.Lock()
+
+    def tag_thread(self, route: str):
+        self._thread_routes[threading.get_ident()] = route
+
+    def untag_thread(self):
+        self._thread_routes.pop(threading.get_ident(), None)
+
+    def capture(self, seconds: float, interval: float = 0.005, all_threads: bool = False,
+                by_route: bool = True) -> Dict:
+        """Sample stacks for `seconds`; raises ProfilerBusy if another capture is running
+
+        Only threads serving a request are sampled unless `all_threads` is set,
+        which also includes idle pool workers and background threads.
+        """
+        seconds = min(max(seconds, 0.0), MAX_SECONDS)
+        interval = max(interval, MIN_INTERVAL)
+        if not self._capture_lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile capture is already running")
+        try:
+            stacks: Counter = Counter()
+            # The requesting thread only sleeps here, so keep it out of its own profile
+            exclude = {threading.get_ident()}
+            sampler = threading.Thread(target=self._sample,
+                                       args=(stacks, seconds, interval, all_threads, by_route, exclude),
+                                       name="soupie-profiler", daemon=True)
+            started = time.perf_counter()
+            sampler.start()
+            sampler.join()
+            return {
+                "duration_s": round(time.perf_counter() - started, 3),
+                "interval_ms": round(interval * 1000, 3),
+                "samples": sum(stacks.values()),
+                "stacks": stacks
+            }
+        finally:
+            self._capture_lock.release()
+
+    def _sample(self, stacks: Counter, seconds: float, interval: float, all_threads: bool, by_route: bool,
+                exclude: set):
+        exclude = exclude | {threading.get_ident()}
+        names = {}
+        deadline = time.perf_counter() + seconds
+        next_tick = time.perf_counter()
+        while next_tick < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident in exclude:
+                    continue
+                route = self._thread_routes.get(ident)
+                if route is None and not all_threads:
+                    continue
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}")
+                    frame = frame.f_back
+                stack.reverse()
+                root = route if by_route and route else names.get(ident, "thread")
+                stacks[";".join([root] + stack)] += 1
+            next_tick += interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind (e.g. GIL contention); skip missed ticks instead of bursting
+                next_tick = time.perf_counter()
+
+
+def collapsed(stacks: Counter) -> str:
+    """Stacks in the folded format read by flamegraph.pl, speedscope and friends"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def parse_capture_args(args, default_seconds: float = 10.0) -> Dict:
+    """capture() keyword arguments from request query parameters"""
+    return {
+        "seconds": float(args.get("seconds", default_seconds)),
+        "interval": float(args.get("interval_ms", 5)) / 1000,
+        "all_threads": args.get("threads", "requests") == "all",
+        "by_route": args.get("by_route", "1") != "0"
+    }
+
+
+# Global profiler instance
+profiler = SamplingProfiler()
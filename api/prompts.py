@@ -0,0 +1,257 @@
+"""
+Prompt assembly for Gemini calls
+Static instruction segments are compiled once at import; per-request values
+(emotional state, emergency mode) are passed in by the caller rather than
+recomputed, and variable parts are trimmed to fit a token budget
+"""
+
+import os
+from typing import Dict, List, Optional
+
+# Rough size estimate; Gemini tokenizes English prose at about 4 characters per token
+CHARS_PER_TOKEN = 4
+
+CHAT_PROMPT_TOKEN_BUDGET = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "2000"))
+SUMMARY_PROMPT_TOKEN_BUDGET = int(os.getenv("SUMMARY_PROMPT_TOKEN_BUDGET", "3000"))
+
+# Chat turns quoted back to the model, and the most each may contribute
+CHAT_HISTORY_TURNS = 3
+CHAT_HISTORY_TURN_TOKENS = 200
+# Most the rolling summary of older turns (api/chat_sessions.py) may contribute
+CHAT_SUMMARY_TOKENS = 120
+
+TRUNCATION_MARKER = " [...] "
+
+BASE_SYSTEM_PROMPT = """You are Soupie, an emotionally intelligent AI companion designed to help users reflect on their thoughts, track their emotions, and build psychological resilience — without diagnosing or labeling.
+
+You are inspired by CBT (Cognitive Behavioral Therapy), CPT (Cognitive Processing Therapy), and empathic human conversation.
+
+You act as a guide, not a therapist. Your job is to help users feel understood, not fixed.
+
+CORE PRINCIPLES:
+- Empathy First: Always prioritize emotional validation before offering any reflection or suggestion
+- No Diagnosis: Never use clinical terms like "depression," "anxiety," or "disorder"
+- Emotion-Aware: Detect and respond to tone shifts in mood or intent
+- Human Safety: If user expresses self-harm or hopelessness, respond with empathy first, then provide helpline resources
+- CBT Micro-Coaching: Use short, thought-provoking questions that help users reframe thoughts
+- Progressive Reflection: Gradually deepen conversation based on user comfort level"""
+
+CONTEXT_GUIDANCE = {
+    "emergency": """
+EMERGENCY MODE ACTIVATED:
+- Respond immediately with compassion and safety protocol
+- Use phrases like: "I hear how heavy this feels. You don't have to go through this alone."
+- Offer helpline resources: "Would you like me to share some free and confidential helplines?"
+- Never leave them feeling alone or unsupported
+- Focus on immediate safety and connection""",
+    "new_user": """
+NEW USER GUIDANCE:
+- Welcome them warmly and explain your role as a reflection companion
+- Use light, gentle tone initially
+- Explain how journaling can help with emotional processing
+- Suggest starting with simple reflection: "Would you like to explore what's on your mind today?"
+- Be encouraging about beginning their wellness journey""",
+    "low": """
+LOW MOOD DETECTED:
+- Use extra empathy and validation
+- Focus on understanding rather than fixing
+- Ask gentle questions: "What's been weighing on you lately?"
+- Suggest light journaling: "Sometimes writing about difficult feelings can help process them"
+- Avoid pushing for positivity""",
+    "anxious": """
+ANXIOUS STATE DETECTED:
+- Use calming, grounding language
+- Help them slow down and breathe
+- Ask grounding questions: "What's one thing you can see or hear right now?"
+- Suggest gentle reflection: "Would it help to write about what's making you feel anxious?"
+- Focus on present moment awareness""",
+    "balanced": """
+BALANCED STATE:
+- Use supportive, curious tone
+- Encourage deeper reflection
+- Ask thought-provoking questions
+- Suggest journaling for growth and insight
+- Help them explore patterns and connections"""
+}
+
+RESPONSE_GUIDELINES = {
+    "emergency": """
+EMERGENCY RESPONSE GUIDELINES:
+1. Lead with empathy: "I hear how heavy this feels"
+2. Provide immediate safety: "You don't have to go through this alone"
+3. Offer resources: "Would you like me to share some helplines?"
+4. Never minimize their feelings
+5. Focus on connection and safety
+6. End with: "I'm really glad you reached out. You're not alone in this." """,
+    "low": """
+LOW MOOD RESPONSE GUIDELINES:
+1. Validate their feelings: "That sounds really hard"
+2. Use gentle, understanding tone
+3. Ask open questions: "What's been on your mind lately?"
+4. Suggest gentle reflection: "Sometimes writing about difficult feelings can help"
+5. Avoid pushing for positivity
+6. Continue the conversation naturally - only end with reflection questions when the conversation is actually concluding""",
+    "anxious": """
+ANXIOUS STATE RESPONSE GUIDELINES:
+1. Use calming, grounding language
+2. Help them slow down: "Let's take this one step at a time"
+3. Ask grounding questions: "What's one thing you can focus on right now?"
+4. Suggest gentle reflection: "Would it help to write about what's making you feel anxious?"
+5. Focus on present moment awareness
+6. Continue the conversation naturally - only end with reflection questions when the conversation is actually concluding""",
+    "balanced": """
+BALANCED STATE RESPONSE GUIDELINES:
+1. Use supportive, curious tone
+2. Ask thought-provoking questions: "What might you tell a friend feeling this way?"
+3. Encourage deeper reflection: "Has this feeling shown up before?"
+4. Only suggest journaling if user explicitly wants to process or reflect: "Would you like to explore this further in your journal?"
+5. Help identify patterns: "It seems this feeling often shows up after..."
+6. Focus on conversation and understanding, not pushing features
+7. Continue the conversation naturally - only end with reflection questions when the conversation is actually concluding"""
+}
+
+CONVERSATION_FLOW = {
+    "ending": """
+CONVERSATION ENDING DETECTED:
+- Use reflection questions like "Thanks for sharing that with me — how are you feeling now?"
+- Acknowledge the conversation and their openness
+- End on a supportive, warm note
+- Only use these ending phrases when the conversation is actually concluding""",
+    "continuing": """
+CONVERSATION CONTINUING:
+- Keep responses natural and conversational
+- Ask follow-up questions to continue the dialogue
+- Avoid ending phrases like "Thanks for sharing that with me — how are you feeling now?"
+- Focus on understanding and exploring their thoughts further
+- Only use reflection questions when the conversation is actually ending"""
+}
+
+ENDING_INDICATORS = (
+    'thanks', 'thank you', 'bye', 'goodbye', 'see you', 'talk later',
+    'that\'s all', 'nothing else', 'i\'m done', 'that\'s it',
+    'gotta go', 'have to go', 'need to go', 'time to go'
+)
+
+JOURNAL_SUMMARY_HEAD = """You are Soupie, an emotionally intelligent AI companion. Analyze this journal entry and provide your personal thoughts in this exact format:
+
+Journal entry: """
+
+JOURNAL_SUMMARY_TAIL = """
+
+Respond in this structure:
+
+**[Title: Create a descriptive, empathetic title that captures the essence of their day/experience]**
+
+[Paragraph 1: Describe their day/experience with empathy and understanding. Focus on what they accomplished, felt, or went through. Be specific about their activities, emotions, and experiences. Use "You" to address them directly.]
+
+[Paragraph 2: Offer interpretation and encouragement. Analyze their emotional state, patterns, or growth. Provide gentle insights about their behavior, feelings, or situation. Frame their experiences positively and offer supportive guidance.]
+
+**Key Insight:** [One clear, actionable principle or takeaway that they can apply to their life]
+
+Guidelines:
+- Be warm, empathetic, and supportive like a caring friend
+- Use "You" to address them directly
+- Focus on understanding and validating their experience
+- Be non-judgmental and encouraging
+- Make the title descriptive and emotionally resonant
+- Keep paragraphs substantial but readable
+- End with a clear, actionable insight they can use
+
+Example format:
+**Whirlwind of Productivity and Exploration**
+
+[Paragraph 1]
+
+[Paragraph 2]
+
+**Key Insight:** Balancing diverse interests and tasks fuels both productivity and satisfaction."""
+
+# Everything before and after the variable parts, joined once at import
+_CHAT_HEADS = {key: f"{BASE_SYSTEM_PROMPT}\n\n{guidance}" for key, guidance in CONTEXT_GUIDANCE.items()}
+_CHAT_TAILS = {
+    (response_key, flow_key): f"\n\n{guidelines}\n\n{flow}"
+    for response_key, guidelines in RESPONSE_GUIDELINES.items()
+    for flow_key, flow in CONVERSATION_FLOW.items()
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep_tail: bool = True) -> str:
+    """Cut text to about max_tokens, keeping its start (and end, when keep_tail)"""
+    max_chars = max(max_tokens, 0) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    if not keep_tail or max_chars <= 2 * len(TRUNCATION_MARKER):
+        return text[:max_chars].rstrip() + TRUNCATION_MARKER.rstrip()
+    # The opening and closing of a journal entry usually carry the most context
+    half = (max_chars - len(TRUNCATION_MARKER)) // 2
+    return text[:half].rstrip() + TRUNCATION_MARKER + text[-half:].lstrip()
+
+
+def _mood_key(emotional_state: Dict) -> str:
+    mood = emotional_state.get("mood")
+    return mood if mood in ("low", "anxious") else "balanced"
+
+
+def is_conversation_ending(chat_history: List[Dict]) -> bool:
+    recent_messages = [msg.get('content', '').lower() for msg in (chat_history or [])[-2:] if msg.get('isUser')]
+    joined = ' '.join(recent_messages)
+    return any(indicator in joined for indicator in ENDING_INDICATORS)
+
+
+def _history_block(chat_history: List[Dict], max_tokens: int) -> str:
+    """Recent turns, newest kept first when the budget runs out"""
+    if not chat_history:
+        return ""
+    lines = []
+    remaining = max_tokens
+    for msg in reversed(chat_history[-CHAT_HISTORY_TURNS:]):
+        role = "User" if msg.get('isUser') else "You"
+        content = truncate_to_tokens(msg.get('content', ''), min(CHAT_HISTORY_TURN_TOKENS, remaining), keep_tail=False)
+        line = f"{role}: {content}\n"
+        remaining -= estimate_tokens(line)
+        if remaining < 0:
+            break
+        lines.append(line)
+    if not lines:
+        return ""
+    return "\nRecent conversation context:\n" + "".join(reversed(lines))
+
+
+def _summary_block(history_summary: str, max_tokens: int) -> str:
+    if not history_summary or max_tokens <= 0:
+        return ""
+    header = "\nEarlier in this conversation: "
+    return header + truncate_to_tokens(history_summary, max_tokens - estimate_tokens(header), keep_tail=False) + "\n"
+
+
+def build_chat_prompt(message: str, user_context: Dict, chat_history: List[Dict], emotional_state: Dict,
+                      emergency_mode: bool, token_budget: Optional[int] = None, history_summary: str = "") -> str:
+    """System prompt, older-context summary, recent history and the user message for one chat turn"""
+    budget = token_budget or CHAT_PROMPT_TOKEN_BUDGET
+    if emergency_mode:
+        context_key = response_key = "emergency"
+    else:
+        response_key = _mood_key(emotional_state)
+        context_key = "new_user" if user_context.get('is_new_user') else response_key
+    head = _CHAT_HEADS[context_key]
+    tail = _CHAT_TAILS[(response_key, "ending" if is_conversation_ending(chat_history) else "continuing")]
+
+    # The instructions are fixed; the message gets what is left, then history gets the remainder
+    available = budget - estimate_tokens(head) - estimate_tokens(tail) - estimate_tokens("\n\nUser message: ")
+    message = truncate_to_tokens(message, available)
+    available -= estimate_tokens(message)
+    history = _history_block(chat_history, available)
+    summary = _summary_block(history_summary, min(CHAT_SUMMARY_TOKENS, available - estimate_tokens(history)))
+    return f"{head}{summary}{history}{tail}\n\nUser message: {message}"
+
+
+def build_journal_summary_prompt(journal_content: str, token_budget: Optional[int] = None) -> str:
+    """Build the "What Soupie thinks" prompt, cutting the journal entry to fit the budget"""
+    budget = token_budget or SUMMARY_PROMPT_TOKEN_BUDGET
+    fixed = estimate_tokens(JOURNAL_SUMMARY_HEAD) + estimate_tokens(JOURNAL_SUMMARY_TAIL) + 1
+    journal_content = truncate_to_tokens(journal_content or "", budget - fixed)
+    return f'{JOURNAL_SUMMARY_HEAD}"{journal_content}"{JOURNAL_SUMMARY_TAIL}'
@@ -0,0 +1,147 @@
+"""
+In-process publish/subscribe fan-out for live feeds
+One writer publishes into a bounded ring buffer; any number of idle readers
+block on a shared condition (or await a future, on an event loop) instead of
+polling storage. Hubs are per process;
+under prefork.py one follower thread per worker polls the table's change log
+so posts made on other workers are published here too.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, List, Optional, Tuple
+
+Event = Tuple[str, Any]
+
+
+class FanoutHub:
+    """Single-channel event hub with a ring buffer of recent events for reconnects"""
+
+    def __init__(self, capacity: int = 256):
+        # Event ids are "<epoch>-<sequence>" so ids from a previous process are recognised
+        self.epoch = os.urandom(4).hex()
+        self._events = deque(maxlen=capacity)
+        self._sequence = 0
+        self._condition = threading.Condition()
+        # (loop, future) for readers awaiting the next event on an event loop
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._follower = None
+
+    def follow(self, poll: Callable[[], Any], interval: float = 1.0):
+        """Call poll every interval seconds from a daemon thread, started once per process
+
+        Used to pick up events published by other processes, e.g. by catching up
+        on a change log whose listener publishes into this hub.
+        """
+        with self._condition:
+            if self._follower is not None:
+                return
+            self._follower = threading.Thread(target=self._follow, args=(poll, interval),
+                                              name="fanout-follower", daemon=True)
+            self._follower.start()
+
+    @staticmethod
+    def _follow(poll: Callable[[], Any], interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                poll()
+            except Exception as e:
+                print(f"Fan-out follower error: {e}")
+
+    def publish(self, data: Any) -> str:
+        """Append an event and wake every waiting reader"""
+        with self._condition:
+            self._sequence += 1
+            event_id = f"{self.epoch}-{self._sequence}"
+            self._events.append((self._sequence, event_id, data))
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        return event_id
+
+    def _parse_id(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Sequence number for an event id from this hub, or None if it is unknown"""
+        if not last_event_id:
+            return None
+        epoch, _, sequence = last_event_id.partition("-")
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def replay(self, last_event_id: Optional[str]) -> Tuple[List[Event], int, bool]:
+        """Resolve a reconnecting reader's Last-Event-ID.
+
+        Returns (missed events, sequence to continue from, gap) where gap is True
+        when the id is unknown or older than the ring buffer and the reader
+        should reload the feed instead.
+        """
+        with self._condition:
+            sequence = self._parse_id(last_event_id)
+            if sequence is None:
+                return [], self._sequence, bool(last_event_id)
+            oldest = self._events[0][0] if self._events else self._sequence + 1
+            gap = sequence < oldest - 1 or sequence > self._sequence
+            if gap:
+                return [], self._sequence, True
+            missed = [(event_id, data) for seq, event_id, data in self._events if seq > sequence]
+            return missed, self._sequence, False
+
+    def wait(self, after_sequence: int, timeout: float) -> Tuple[List[Event], int]:
+        """Block until events newer than after_sequence exist or the timeout passes"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._sequence > after_sequence, timeout)
+            return self._since(after_sequence)
+
+    async def await_events(self, after_sequence: int, timeout: float) -> Tuple[List[Event], int]:
+        """Like wait, but awaits on the running event loop instead of holding a thread"""
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if self._sequence > after_sequence:
+                return self._since(after_sequence)
+            waiter = (loop, loop.create_future())
+            self._async_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                if waiter in self._async_waiters:
+                    self._async_waiters.remove(waiter)
+        with self._condition:
+            return self._since(after_sequence)
+
+    def _since(self, after_sequence: int) -> Tuple[List[Event], int]:
+        """Events newer than after_sequence; call with the condition held"""
+        # Sequences are contiguous, so the newest events sit at the end of the buffer
+        start = max(len(self._events) - (self._sequence - after_sequence), 0)
+        events = [(event_id, data) for _, event_id, data in islice(self._events, start, None)]
+        return events, self._sequence
+
+    def reset(self):
+        """Start over with a new epoch, e.g. in a freshly forked worker"""
+        self.epoch = os.urandom(4).hex()
+        self._events = deque(maxlen=self._events.maxlen)
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._async_waiters = []
+        # Threads don't survive fork: the child starts its own follower on first use
+        self._follower = None
+
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+# Global hub for new open journal posts
+open_journal_hub = FanoutHub()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=open_journal_hub.reset)
@@ -0,0 +1,153 @@
+"""
+Reaction and flag counters for open journal posts
+Increments land in lock-striped in-memory shards and are flushed periodically
+into the open_journal records, so hot posts never serialize on one lock or
+rewrite the table on every click
+"""
+
+import atexit
+import hashlib
+import threading
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+from .json_db import JSONDatabase, db
+
+REACTION_TYPES = ("empathy", "support")
+FLAG = "flag"
+
+DedupeKey = Tuple[str, str, str]
+
+
+class _Shard:
+    """One stripe of pending counter deltas and seen (post, user, kind) keys"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending: Dict[str, Dict[str, int]] = {}
+        self.seen: Set[DedupeKey] = set()
+        self.unsaved: List[DedupeKey] = []
+
+
+class ReactionCounter:
+    def __init__(self, database: JSONDatabase, shards: int = 16, flush_interval: float = 2.0):
+        self.db = database
+        self.flush_interval = flush_interval
+        self._shards = [_Shard() for _ in range(shards)]
+        # Deltas taken from the shards but not yet written, still counted by counts()
+        self._inflight: Dict[str, Dict[str, int]] = {}
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Reactions another process had already recorded, dropped when flushing
+        self.duplicates_dropped = 0
+
+    def _shard(self, post_id: str) -> _Shard:
+        # crc32 rather than hash() so a post maps to the same stripe in every process
+        return self._shards[zlib.crc32(post_id.encode("utf-8")) % len(self._shards)]
+
+    def _ensure_loaded(self):
+        """Load persisted dedupe keys once, then start the background flusher"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            for key in self.db.get_reaction_keys():
+                self._shard(key[0]).seen.add(key)
+            self._flusher = threading.Thread(target=self._flush_loop, name="reaction-flusher", daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
+            self._loaded = True
+
+    def add(self, post_id: str, user_id: str, kind: str) -> bool:
+        """Count one reaction or flag; returns False if this user already did so"""
+        self._ensure_loaded()
+        shard = self._shard(post_id)
+        key = (post_id, user_id, kind)
+        with shard.lock:
+            if key in shard.seen:
+                return False
+            shard.seen.add(key)
+            shard.unsaved.append(key)
+            counts = shard.pending.setdefault(post_id, {})
+            counts[kind] = counts.get(kind, 0) + 1
+            return True
+
+    def counts(self, record: Dict) -> Dict[str, int]:
+        """Reaction counts for a record: persisted totals plus unflushed deltas"""
+        totals = {kind: 0 for kind in REACTION_TYPES}
+        totals.update(record.get("reactions") or {})
+        post_id = record.get("id", "")
+        for pending in (self._inflight.get(post_id), self._shard(post_id).pending.get(post_id)):
+            for kind, delta in (pending or {}).items():
+                if kind != FLAG:
+                    totals[kind] = totals.get(kind, 0) + delta
+        return totals
+
+    def pending_digest(self) -> str:
+        """Short digest of deltas not yet written, "" when there are none
+
+        Lets validators for open journal responses change as soon as a
+        reaction is counted rather than when it is flushed.
+        """
+        items = [(post_id, sorted(counts.items())) for post_id, counts in list(self._inflight.items())]
+        for shard in self._shards:
+            with shard.lock:
+                items.extend((post_id, sorted(counts.items())) for post_id, counts in shard.pending.items())
+        if not items:
+            return ""
+        return hashlib.sha1(repr(sorted(items)).encode("utf-8")).hexdigest()[:16]
+
+    def flush(self):
+        """Move pending deltas into storage with one table write"""
+        with self._flush_lock:
+            deltas: Dict[str, Dict[str, int]] = {}
+            keys: List[DedupeKey] = []
+            self._inflight = deltas
+            for shard in self._shards:
+                with shard.lock:
+                    pending, shard.pending = shard.pending, {}
+                    unsaved, shard.unsaved = shard.unsaved, []
+                deltas.update(pending)
+                keys.extend(unsaved)
+            if not deltas:
+                return
+            try:
+                self.duplicates_dropped += self.db.apply_reaction_counts(deltas, keys)
+            except Exception:
+                self._restore(deltas, keys)
+                raise
+            finally:
+                self._inflight = {}
+
+    def _restore(self, deltas: Dict[str, Dict[str, int]], keys: List[DedupeKey]):
+        """Put deltas and keys from a failed flush back into their shards for the next flush"""
+        for post_id, counts in deltas.items():
+            shard = self._shard(post_id)
+            with shard.lock:
+                pending = shard.pending.setdefault(post_id, {})
+                for kind, delta in counts.items():
+                    pending[kind] = pending.get(kind, 0) + delta
+        for key in keys:
+            shard = self._shard(key[0])
+            with shard.lock:
+                shard.unsaved.append(key)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing reaction counters: {e}")
+
+    def close(self):
+        """Stop the flusher and write out anything still pending"""
+        self._stop.set()
+        self.flush()
+
+
+# Global reaction counter instance
+reaction_counter = ReactionCounter(db)
@@ -0,0 +1,182 @@
+"""
+Circuit breaker and adaptive timeout for outbound AI calls
+While the provider is failing, callers are refused in microseconds so they
+reach their fallbacks immediately instead of each waiting out the timeout
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class Permit:
+    """Returned by CircuitBreaker.allow() and handed back with the call's outcome"""
+    __slots__ = ("probe",)
+
+    def __init__(self, probe: bool = False):
+        self.probe = probe
+
+
+class CircuitBreaker:
+    """Opens when the error rate over a sliding window crosses a threshold.
+
+    After a jittered, exponentially growing cool-down one probe call is let
+    through (half-open); its outcome closes the breaker or re-opens it.
+    Outcomes of calls that were already in flight when the breaker opened
+    are counted but don't change its state.
+    """
+
+    def __init__(self, failure_threshold: float = 0.5, min_calls: int = 5, window: float = 30.0,
+                 base_backoff: float = 2.0, max_backoff: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._state = CLOSED
+        self._open_until = 0.0
+        self._consecutive_opens = 0
+        self._probe: Optional[Permit] = None
+        self._rejected = 0
+        self._late_outcomes = 0
+        self._last_error: Optional[str] = None
+
+    def _trim(self, now: float):
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+    def _open(self, now: float):
+        self._consecutive_opens += 1
+        backoff = min(self.max_backoff, self.base_backoff * 2 ** (self._consecutive_opens - 1))
+        # Jitter spreads the probes of many processes so they don't hit a recovering service at once
+        self._open_until = now + random.uniform(backoff / 2, backoff)
+        self._state = OPEN
+        self._probe = None
+        self._outcomes.clear()
+
+    def allow(self) -> Optional[Permit]:
+        """A permit if a call may go out now, else None; in half-open state the permit is the probe"""
+        with self._lock:
+            if self._state == CLOSED:
+                return Permit()
+            if self._state == OPEN and time.monotonic() >= self._open_until:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and self._probe is None:
+                self._probe = Permit(probe=True)
+                return self._probe
+            self._rejected += 1
+            return None
+
+    def _is_late(self, permit: Optional[Permit]) -> bool:
+        """Whether an outcome comes from a call other than the current probe while not closed"""
+        if self._state == CLOSED:
+            return False
+        if permit is not None and permit is self._probe:
+            return False
+        self._late_outcomes += 1
+        return True
+
+    def release(self, permit: Optional[Permit] = None):
+        """Give back a permit without reporting an outcome, freeing the probe if it was one"""
+        with self._lock:
+            if permit is not None and permit is self._probe:
+                self._probe = None
+
+    def record_success(self, permit: Optional[Permit] = None):
+        with self._lock:
+            now = time.monotonic()
+            if self._is_late(permit):
+                return
+            if self._state != CLOSED:
+                self._state = CLOSED
+                self._consecutive_opens = 0
+                self._probe = None
+                self._outcomes.clear()
+                return
+            self._outcomes.append((now, True))
+            self._trim(now)
+
+    def record_failure(self, error: str = None, permit: Optional[Permit] = None):
+        with self._lock:
+            now = time.monotonic()
+            self._last_error = error
+            if self._is_late(permit):
+                return
+            if self._state != CLOSED:
+                self._open(now)
+                return
+            self._outcomes.append((now, False))
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_threshold:
+                self._open(now)
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                "state": self._state,
+                "window_calls": len(self._outcomes),
+                "window_error_rate": round(failures / len(self._outcomes), 3) if self._outcomes else 0.0,
+                "retry_in_s": round(max(self._open_until - now, 0.0), 2) if self._state == OPEN else 0.0,
+                "consecutive_opens": self._consecutive_opens,
+                "rejected_calls": self._rejected,
+                "late_outcomes": self._late_outcomes,
+                "last_error": self._last_error
+            }
+
+
+class AdaptiveTimeout:
+    """Timeout that tracks a multiple of the observed p95 latency, within bounds"""
+
+    def __init__(self, ceiling: float = 10.0, floor: float = 2.0, multiplier: float = 2.0,
+                 samples: int = 200, min_samples: int = 20):
+        self.ceiling = ceiling
+        self.floor = floor
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self._latencies: Deque[float] = deque(maxlen=samples)
+        self._lock = threading.Lock()
+        self._current = ceiling
+
+    def observe(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+            if len(self._latencies) >= self.min_samples:
+                self._current = min(self.ceiling, max(self.floor, self._p95() * self.multiplier))
+
+    def _p95(self) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[max(int(len(ordered) * 0.95) - 1, 0)]
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            return self._p95()
+
+    @property
+    def current(self) -> float:
+        return self._current
+
+    def snapshot(self) -> Dict:
+        p95 = self.p95()
+        return {
+            "timeout_s": round(self._current, 3),
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "samples": len(self._latencies)
+        }
@@ -7,8 +7,14 @@ import json
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
 
+from .gemini_client import gemini_client, is_service_error
+from .metrics import metrics
+
 class ScoringEngine:
-    def __init__(self):
+    def __init__(self, gemini=None):
+        # Client used for AI onboarding summaries (anything with generate(prompt, priority));
+        # without one the static fallback summaries are used
+        self.gemini = gemini
         # Response normalization mappings
         self.normalization_maps = {
             'sleep_quality': {
@@ -126,6 +132,7 @@ class ScoringEngine:
             }
         }
 
+    @metrics.timed("scoring.normalize")
     def normalize_responses(self, onboarding_data: Dict) -> Dict[str, float]:
         """Convert categorical responses to numeric scores (1-5 scale)"""
         normalized = {}
@@ -152,6 +159,7 @@ class ScoringEngine:
         
         return normalized
 
+    @metrics.timed("scoring.domains")
     def calculate_domain_scores(self, normalized: Dict[str, float]) -> Dict[str, float]:
         """Calculate domain scores from normalized field scores"""
         domain_scores = {}
@@ -188,6 +196,7 @@ class ScoringEngine:
         
         return domain_scores
 
+    @metrics.timed("scoring.index")
     def calculate_mental_health_index(self, domain_scores: Dict[str, float]) -> float:
         """Calculate composite mental health index"""
         weighted_sum = 0
@@ -197,6 +206,7 @@ class ScoringEngine:
         
         return round(weighted_sum, 1)
 
+    @metrics.timed("scoring.cluster")
     def determine_cluster(self, domain_scores: Dict[str, float], normalized: Dict[str, float]) -> Tuple[str, float]:
         """Determine primary emotional cluster and confidence"""
         clusters = {
@@ -263,6 +273,7 @@ class ScoringEngine:
         score = (protective_score / 100) * 0.5 + (social_score / 5) * 0.3 + (coping_score / 5) * 0.2
         return score
 
+    @metrics.timed("scoring.risk")
     def assess_risk_flags(self, domain_scores: Dict[str, float], normalized: Dict[str, float], onboarding_data: Dict) -> Dict[str, any]:
         """Assess risk flags and priority levels"""
         flags = {
@@ -296,14 +307,9 @@ class ScoringEngine:
         
         return flags
 
-    def generate_summary_text(self, cluster: str, domain_scores: Dict[str, float], risk_flags: Dict[str, any]) -> str:
-        """Generate personalized summary text based on cluster and scores"""
-        # Try to use AI-generated summary if available
-        try:
-            from simple_app import call_gemini
-            
-            # Create a prompt for AI summary generation with human-like tone
-            prompt = f"""You are a caring, wise friend who has been following someone's mental health journey. Respond naturally and empathetically.
+    def build_summary_prompt(self, cluster: str, domain_scores: Dict[str, float], risk_flags: Dict[str, any]) -> str:
+        """Create a prompt for AI summary generation with human-like tone"""
+        return f"""You are a caring, wise friend who has been following someone's mental health journey. Respond naturally and empathetically.
 
 Assessment Results:
 - Overall Pattern: {cluster}
@@ -323,14 +329,28 @@ Write a warm, human response that:
 - Feels like wisdom from someone who truly cares
 
 Keep it brief (2-3 sentences) and focus on being supportive and understanding."""
-            
-            ai_summary = call_gemini(prompt)
-            if ai_summary and ai_summary != "AI service not configured" and ai_summary != "AI service error":
-                return ai_summary
-        except Exception:
-            pass
+
+    @staticmethod
+    def is_usable_ai_summary(ai_summary: Optional[str]) -> bool:
+        return not is_service_error(ai_summary)
+
+    @metrics.timed("scoring.summary")
+    def generate_summary_text(self, cluster: str, domain_scores: Dict[str, float], risk_flags: Dict[str, any]) -> str:
+        """Generate personalized summary text based on cluster and scores"""
+        # Try to use AI-generated summary if available
+        if self.gemini is not None:
+            try:
+                prompt = self.build_summary_prompt(cluster, domain_scores, risk_flags)
+                ai_summary = self.gemini.generate(prompt, "onboarding")
+                if self.is_usable_ai_summary(ai_summary):
+                    return ai_summary
+            except Exception:
+                pass
         
-        # Fallback to static summaries if AI is not available
+        return self.fallback_summary_text(cluster, domain_scores)
+
+    def fallback_summary_text(self, cluster: str, domain_scores: Dict[str, float]) -> str:
+        """Static summary used when the AI service is not available"""
         summaries = {
             'cluster_affective_low': "You've been feeling low energy and emotionally fatigued. Journaling and short breaks may help balance your energy over the week.",
             'cluster_anxiety': "You might be feeling tense or worried lately. Breathing exercises and grounding techniques could help you feel more centered.",
@@ -358,53 +378,66 @@ Keep it brief (2-3 sentences) and focus on being supportive and understanding.""
         
         return base_summary
 
+    def score_onboarding_data(self, onboarding_data: Dict) -> Dict[str, any]:
+        """CPU-only scoring stages (everything except the summary text)"""
+        # Step 1: Normalize responses
+        normalized = self.normalize_responses(onboarding_data)
+        
+        # Step 2: Calculate domain scores
+        domain_scores = self.calculate_domain_scores(normalized)
+        
+        # Step 3: Calculate mental health index
+        mental_health_index = self.calculate_mental_health_index(domain_scores)
+        
+        # Step 4: Determine cluster
+        cluster_primary, cluster_confidence = self.determine_cluster(domain_scores, normalized)
+        
+        # Step 5: Assess risk flags
+        risk_flags = self.assess_risk_flags(domain_scores, normalized, onboarding_data)
+        
+        return {
+            'mental_health_index': mental_health_index,
+            'cluster_primary': cluster_primary,
+            'cluster_confidence': cluster_confidence,
+            'domain_scores': domain_scores,
+            'risk_flags': risk_flags
+        }
+
+    def compile_results(self, scores: Dict[str, any], summary_text: str) -> Dict[str, any]:
+        """Step 7: Compile scores and summary into the insights record"""
+        return {
+            **scores,
+            'summary_text': summary_text,
+            'emergency_mode': scores['risk_flags'].get('suicide_flag', False),
+            'processed_at': datetime.now().isoformat()
+        }
+
+    def failed_results(self) -> Dict[str, any]:
+        """Neutral insights returned when processing fails"""
+        return {
+            'error': 'Failed to process onboarding data',
+            'mental_health_index': 50,
+            'cluster_primary': 'cluster_resilient',
+            'cluster_confidence': 0.5,
+            'domain_scores': {},
+            'risk_flags': {'priority_level': 'stable'},
+            'summary_text': 'Thank you for completing the assessment.',
+            'emergency_mode': False
+        }
+
     def process_onboarding_data(self, onboarding_data: Dict) -> Dict[str, any]:
         """Main processing function - converts onboarding data to insights"""
         try:
-            # Step 1: Normalize responses
-            normalized = self.normalize_responses(onboarding_data)
-            
-            # Step 2: Calculate domain scores
-            domain_scores = self.calculate_domain_scores(normalized)
-            
-            # Step 3: Calculate mental health index
-            mental_health_index = self.calculate_mental_health_index(domain_scores)
-            
-            # Step 4: Determine cluster
-            cluster_primary, cluster_confidence = self.determine_cluster(domain_scores, normalized)
-            
-            # Step 5: Assess risk flags
-            risk_flags = self.assess_risk_flags(domain_scores, normalized, onboarding_data)
+            scores = self.score_onboarding_data(onboarding_data)
             
             # Step 6: Generate summary
-            summary_text = self.generate_summary_text(cluster_primary, domain_scores, risk_flags)
+            summary_text = self.generate_summary_text(scores['cluster_primary'], scores['domain_scores'], scores['risk_flags'])
             
-            # Step 7: Compile results
-            results = {
-                'mental_health_index': mental_health_index,
-                'cluster_primary': cluster_primary,
-                'cluster_confidence': cluster_confidence,
-                'domain_scores': domain_scores,
-                'risk_flags': risk_flags,
-                'summary_text': summary_text,
-                'emergency_mode': risk_flags.get('suicide_flag', False),
-                'processed_at': datetime.now().isoformat()
-            }
-            
-            return results
+            return self.compile_results(scores, summary_text)
             
         except Exception as e:
             print(f"Error processing onboarding data: {e}")
-            return {
-                'error': 'Failed to process onboarding data',
-                'mental_health_index': 50,
-                'cluster_primary': 'cluster_resilient',
-                'cluster_confidence': 0.5,
-                'domain_scores': {},
-                'risk_flags': {'priority_level': 'stable'},
-                'summary_text': 'Thank you for completing the assessment.',
-                'emergency_mode': False
-            }
+            return self.failed_results()
 
 # Global scoring engine instance
-scoring_engine = ScoringEngine()
+scoring_engine = ScoringEngine(gemini_client)
@@ -0,0 +1,192 @@
+"""
+Single-flight coalescing for identical outbound calls
+Concurrent calls with the same key (a hash of the model and prompt) share
+one call: the first caller makes it and everyone who asks for the same key
+while it is in flight gets its result. Threads and asyncio callers wait on
+the same flight, so a blocking caller can share an async caller's call and
+the other way round.
+
+With a shared directory configured, leaders in different worker processes
+also coordinate through an flock on <dir>/<key>.lock: a worker that finds
+the lock held waits for it and takes the result the holder left in
+<dir>/<key>.json, and only makes its own call if that result is missing
+(the holder failed). Results are only shared that way when share_result
+says so, so service errors are never handed to other processes.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing stays within the process
+    fcntl = None
+
+
+def flight_key(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self, shared_dir: Optional[str] = None, share_result: Callable[[object], bool] = None,
+                 ttl_seconds: float = 60):
+        self.shared_dir = shared_dir if fcntl is not None else None
+        self.share_result = share_result or (lambda result: True)
+        self.ttl_seconds = ttl_seconds
+        self._flights: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._last_expired = 0.0
+        self.leaders = 0
+        self.coalesced = 0
+        self.coalesced_across_processes = 0
+
+    def reset(self):
+        """Forget flights after fork; their leaders don't exist in the child"""
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def _join(self, key: str):
+        """(flight, is_leader) for key"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = Future()
+            self.leaders += 1
+            return flight, True
+
+    def _land(self, key: str, flight: Future, result=None, error: BaseException = None):
+        with self._lock:
+            self._flights.pop(key, None)
+        if error is not None:
+            flight.set_exception(error)
+        else:
+            flight.set_result(result)
+
+    def do(self, key: str, fn: Callable, *args):
+        """fn(*args), shared with concurrent callers of the same key"""
+        flight, leader = self._join(key)
+        if not leader:
+            return flight.result()
+        try:
+            result = self._process_flight(key, fn, args)
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result)
+        return result
+
+    async def ado(self, key: str, fn: Callable, *args):
+        """await fn(*args), shared with concurrent callers of the same key
+
+        The call runs as its own task, so a leader that is cancelled (its
+        client went away) doesn't cancel it for the callers sharing it.
+        """
+        flight, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(flight)
+
+        def land(task: asyncio.Task):
+            if task.cancelled():
+                self._land(key, flight, error=asyncio.CancelledError())
+            else:
+                self._land(key, flight, task.result() if task.exception() is None else None, task.exception())
+
+        task = asyncio.ensure_future(self._aprocess_flight(key, fn, args))
+        task.add_done_callback(land)
+        return await asyncio.shield(task)
+
+    # Cross-process coordination
+
+    def _paths(self, key: str):
+        return os.path.join(self.shared_dir, f"{key}.lock"), os.path.join(self.shared_dir, f"{key}.json")
+
+    def _open_lock(self, key: str):
+        os.makedirs(self.shared_dir, exist_ok=True)
+        return open(self._paths(key)[0], "a")
+
+    def _shared_result(self, key: str, since: float):
+        """The result another process finished after `since`, or None"""
+        try:
+            with open(self._paths(key)[1]) as f:
+                record = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if record.get("finished", 0) < since:
+            return None
+        with self._lock:
+            self.coalesced_across_processes += 1
+        return record["result"]
+
+    def _publish(self, key: str, result):
+        if not self.share_result(result):
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.shared_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"finished": time.time(), "result": result}, f)
+        os.replace(tmp_path, self._paths(key)[1])
+        self._expire()
+
+    def _expire(self):
+        """Drop results and lock files nobody has used for ttl_seconds
+
+        Removing a lock file another process is about to lock can let two
+        processes lead the same key once; that only costs a duplicate call.
+        """
+        now = time.time()
+        if now - self._last_expired < self.ttl_seconds:
+            return
+        self._last_expired = now
+        for entry in os.scandir(self.shared_dir):
+            try:
+                if now - entry.stat().st_mtime > self.ttl_seconds:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def _process_flight(self, key: str, fn: Callable, args):
+        if self.shared_dir is None:
+            return fn(*args)
+        started = time.time()
+        with self._open_lock(key) as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another worker is making this call: wait for it and take its result
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                shared = self._shared_result(key, started)
+                if shared is not None:
+                    return shared
+            result = fn(*args)
+            self._publish(key, result)
+            return result
+
+    async def _aprocess_flight(self, key: str, fn: Callable, args):
+        if self.shared_dir is None:
+            return await fn(*args)
+        started = time.time()
+        with self._open_lock(key) as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                await asyncio.get_running_loop().run_in_executor(None, fcntl.flock, lock_file, fcntl.LOCK_EX)
+                shared = self._shared_result(key, started)
+                if shared is not None:
+                    return shared
+            result = await fn(*args)
+            self._publish(key, result)
+            return result
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"in_flight": len(self._flights), "leaders": self.leaders, "coalesced": self.coalesced,
+                    "coalesced_across_processes": self.coalesced_across_processes,
+                    "shared_dir": self.shared_dir}
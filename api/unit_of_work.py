@@ -0,0 +1,101 @@
+"""
+Request-scoped unit of work for user records
+Handlers often look the same user up several times per request (the route,
+then helpers it calls), and every lookup reads the whole user table. The unit
+of work kept on flask.g is an identity map: the first lookup of a user reads
+the table, later ones get the same record back. User updates are applied to
+that record at once, so the rest of the request sees them, and written
+together in a single table write when the request ends (factory.init_unit_of_work).
+
+Outside a request (background threads, the ASGI thread pool) current_unit()
+returns a unit that writes through immediately, so helpers can use it anywhere.
+"""
+
+from typing import Dict, Optional
+
+from flask import g, has_app_context
+
+from .json_db import db
+from .metrics import metrics
+
+MISSING = object()
+
+
+class UnitOfWork:
+    """Identity map over user and onboarding records plus pending user updates"""
+
+    def __init__(self, database=None, write_through: bool = False):
+        self.db = database or db
+        self.write_through = write_through
+        self._users: Dict[str, Optional[Dict]] = {}
+        self._emails: Dict[str, Optional[str]] = {}
+        self._onboarding: Dict[str, Optional[Dict]] = {}
+        self._pending: Dict[str, Dict] = {}
+
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        user = self._users.get(user_id, MISSING)
+        if user is MISSING:
+            user = self._users[user_id] = self.db.get_user_by_id(user_id)
+            if user is not None and user_id in self._pending:
+                user.update(self._pending[user_id])
+        return user
+
+    def get_user_by_email(self, email: str) -> Optional[Dict]:
+        user_id = self._emails.get(email, MISSING)
+        if user_id is MISSING:
+            # A mapped user may hold this email through an update not written yet
+            for user in self._users.values():
+                if user is not None and user.get("email") == email:
+                    return user
+            user = self.db.get_user_by_email(email)
+            user_id = self._emails[email] = user.get("id") if user else None
+            if user is not None:
+                self._users.setdefault(user_id, user)
+        return self.get_user(user_id) if user_id else None
+
+    def get_onboarding_record(self, user_id: str) -> Optional[Dict]:
+        record = self._onboarding.get(user_id, MISSING)
+        if record is MISSING:
+            record = self._onboarding[user_id] = self.db.get_user_onboarding_record(user_id)
+        return record
+
+    def update_user(self, user_id: str, updates: Dict) -> bool:
+        """Queue updates for the end of the request, applying them to the user if already mapped
+
+        A user that hasn't been looked up is not read just to be updated, so
+        False only means the user is already known not to exist.
+        """
+        user = self._users.get(user_id, MISSING)
+        if user is None:
+            return False
+        if user is not MISSING:
+            self._emails.pop(user.get("email"), None)
+            user.update(updates)
+        elif "email" in updates:
+            self._emails.clear()
+        self._pending.setdefault(user_id, {}).update(updates)
+        if self.write_through:
+            self.flush()
+        return True
+
+    def forget_onboarding_record(self, user_id: str):
+        """Drop a mapped onboarding record after writing a new one"""
+        self._onboarding.pop(user_id, None)
+
+    def flush(self):
+        """Write every pending user update in one table write"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        with metrics.span("db.unit_of_work_flush"):
+            self.db.update_users(pending)
+
+
+def current_unit() -> UnitOfWork:
+    """The current request's unit of work, or a write-through unit outside a request"""
+    if not has_app_context():
+        return UnitOfWork(write_through=True)
+    unit = g.get("unit_of_work")
+    if unit is None:
+        unit = g.unit_of_work = UnitOfWork()
+    return unit
@@ -0,0 +1,151 @@
+"""
+Serve a WSGI app from an ASGI server
+Each request runs on a worker from a dedicated thread pool, so slow or
+long-lived Flask responses (exports, Server-Sent Events) run side by side
+instead of queueing behind one thread. Body chunks are handed to the event
+loop through a small bounded queue, and a client disconnect stops the
+WSGI iterator at the next chunk.
+"""
+
+import asyncio
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+# Body chunks buffered between the worker thread and the event loop
+QUEUE_CHUNKS = 8
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def build_environ(scope: Dict, body: bytes) -> Dict:
+    """PEP 3333 environ for an ASGI HTTP scope"""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+            key = name
+        else:
+            key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class WsgiBridge:
+    def __init__(self, wsgi_app: Callable, max_workers: int = 64):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="soupie-wsgi")
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable):
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(QUEUE_CHUNKS)
+        disconnected = threading.Event()
+        response_start: List[Tuple[str, List]] = []
+
+        def start_response(status, headers, exc_info=None):
+            response_start[:] = [(status, headers)]
+
+        def put(item):
+            # Blocks the worker while the queue is full: backpressure from slow clients
+            if disconnected.is_set():
+                raise ClientDisconnected()
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def run():
+            started = False
+            try:
+                result = self.wsgi_app(build_environ(scope, body), start_response)
+                try:
+                    for chunk in result:
+                        if not started:
+                            put(("start", response_start[0]))
+                            started = True
+                        if chunk:
+                            put(("body", chunk))
+                    if not started:
+                        put(("start", response_start[0]))
+                finally:
+                    if hasattr(result, "close"):
+                        result.close()
+                put(("end", None))
+            except ClientDisconnected:
+                pass
+            except BaseException as e:
+                if not disconnected.is_set():
+                    asyncio.run_coroutine_threadsafe(queue.put(("error", e)), loop)
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+            # Unblock a worker waiting on a full queue
+            while not queue.empty():
+                queue.get_nowait()
+
+        worker = loop.run_in_executor(self.executor, run)
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({getter, watcher}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    # The client left before the response finished; the worker stops at its next chunk
+                    getter.cancel()
+                    break
+                kind, value = getter.result()
+                if kind == "start":
+                    status, headers = value
+                    await send({
+                        "type": "http.response.start",
+                        "status": int(status.split(" ", 1)[0]),
+                        "headers": [(name.lower().encode("latin-1"), val.encode("latin-1")) for name, val in headers]
+                    })
+                elif kind == "body":
+                    await send({"type": "http.response.body", "body": value, "more_body": True})
+                elif kind == "end":
+                    await send({"type": "http.response.body", "body": b""})
+                    break
+                else:
+                    raise value
+        finally:
+            watcher.cancel()
+            disconnected.set()
+            while not queue.empty():
+                queue.get_nowait()
+        await worker
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
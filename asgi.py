@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Async (ASGI) entry point for Soupie
+Serves the Gemini-bound routes (chat, streamed chat, journal summaries,
+onboarding) on asyncio so one process can hold hundreds of in-flight model
+calls, and the open journal live feed, whose idle readers would otherwise
+each hold a bridge thread. Storage and CPU-bound work runs in a thread pool; every other route is
+delegated to the Flask app through api.wsgi_bridge, which runs it on its own
+worker threads off the event loop.
+
+Run with: uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import contextvars
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+import jwt
+
+import simple_app
+from api.auth import JWT_SECRET
+from api.chat_sessions import chat_sessions
+from api.crisis import crisis_reply, is_crisis_message
+from api.gemini_client import gemini_client, GeminiStreamError
+from api.json_db import db
+from api.metrics import metrics, current_route
+from api.profiler import profiler
+from api.pubsub import open_journal_hub
+from api.prompts import build_journal_summary_prompt
+from api.scoring_engine import scoring_engine
+from api.wsgi_bridge import WsgiBridge
+
+# Thread pool for blocking storage reads/writes and CPU-bound scoring
+blocking_executor = ThreadPoolExecutor(max_workers=int(os.getenv("ASGI_BLOCKING_WORKERS", "16")),
+                                       thread_name_prefix="soupie-blocking")
+flask_app = WsgiBridge(simple_app.app, max_workers=int(os.getenv("ASGI_WSGI_WORKERS", "64")))
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call in the shared executor, keeping the route label for metric spans and profiles"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(blocking_executor, partial(context.run, tagged_call, func, *args, **kwargs))
+
+
+def tagged_call(func, *args, **kwargs):
+    profiler.tag_thread(current_route.get())
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.untag_thread()
+
+
+def authenticate(scope):
+    """Resolve the JWT from the Authorization header or cookie, like jwt_required"""
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+    token = None
+    auth_header = headers.get("authorization")
+    if auth_header:
+        parts = auth_header.split(" ")
+        if len(parts) < 2:
+            return None, (401, {"error": "Invalid authorization header format"})
+        token = parts[1]
+    if not token and headers.get("cookie"):
+        morsel = SimpleCookie(headers["cookie"]).get("jwt_token")
+        token = morsel.value if morsel else None
+    if not token:
+        return None, (401, {"error": "Token is missing"})
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        return None, (401, {"error": "Token has expired"})
+    except jwt.InvalidTokenError:
+        return None, (401, {"error": "Invalid token"})
+    return payload["user_id"], None
+
+
+async def read_json(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    return json.loads(body or b"{}")
+
+
+async def send_json(send, status, data):
+    body = json.dumps(data).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_event_stream(send, events):
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream; charset=utf-8"), (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no")]
+    })
+    async for event in events:
+        await send({"type": "http.response.body", "body": event.encode("utf-8"), "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def chat(user_id, data):
+    message = (data.get("message") or "").strip()
+    if not message:
+        return 400, {"error": "Message is required"}
+    if is_crisis_message(message):
+        # Skips the prompt and the model; resuming the session and saving the follow-up still touch files
+        return 200, await run_blocking(simple_app.start_crisis_reply, user_id, message, data.get("session_id"),
+                                       data.get("chat_history"))
+
+    turn = await run_blocking(simple_app.prepare_chat_turn, user_id, message, data.get("session_id"),
+                              data.get("chat_history"))
+    ai_response = await gemini_client.agenerate(turn["prompt"])
+    return 200, await run_blocking(simple_app.complete_chat_turn, turn, ai_response)
+
+
+async def chat_stream(user_id, data):
+    message = (data.get("message") or "").strip()
+    if not message:
+        return 400, {"error": "Message is required"}
+
+    started = time.perf_counter()
+    crisis_session = None
+    if is_crisis_message(message):
+        crisis_session = await run_blocking(chat_sessions.resume, user_id, data.get("session_id"),
+                                            data.get("chat_history"))
+        turn = None
+    else:
+        turn = await run_blocking(simple_app.prepare_chat_turn, user_id, message, data.get("session_id"),
+                                  data.get("chat_history"))
+
+    async def events():
+        nonlocal turn
+        if crisis_session is not None:
+            yield simple_app.sse_event("crisis", crisis_reply(crisis_session.id))
+            metrics.observe("soupie_crisis_response_seconds", time.perf_counter() - started)
+            turn = await run_blocking(simple_app.prepare_chat_turn, user_id, message, crisis_session.id)
+        chunks = []
+        first_token_at = None
+        try:
+            async for text in gemini_client.astream(turn["prompt"]):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                chunks.append(text)
+                yield simple_app.sse_event("token", {"text": text})
+        except GeminiStreamError as e:
+            print(f"Chat stream error: {e}")
+        result = await run_blocking(simple_app.finish_chat_stream, turn, chunks, started, first_token_at)
+        yield simple_app.sse_event("done", result)
+
+    return 200, events()
+
+
+async def summarize_private_journal(user_id, data, journal_id):
+    journal = await run_blocking(db.get_private_journal_by_id, journal_id)
+    if not journal or journal.get("user_id") != user_id:
+        return 404, {"error": "Journal entry not found"}
+
+    journal_content = journal.get("content")
+    summary = await gemini_client.agenerate(build_journal_summary_prompt(journal_content), priority="summary")
+    summary = await run_blocking(simple_app.save_journal_summary, journal, summary)
+    return 200, {"message": "Summary generated successfully", "summary": summary}
+
+
+async def submit_onboarding(user_id, data):
+    onboarding_data = data.get("onboarding_data", {})
+    onboarding_record = simple_app.build_onboarding_record(
+        user_id, onboarding_data, data.get("onboarding_level", "balanced"))
+
+    try:
+        scores = await run_blocking(scoring_engine.score_onboarding_data, onboarding_data)
+        prompt = scoring_engine.build_summary_prompt(
+            scores["cluster_primary"], scores["domain_scores"], scores["risk_flags"])
+        summary_text = await gemini_client.agenerate(prompt, priority="onboarding")
+        if not scoring_engine.is_usable_ai_summary(summary_text):
+            summary_text = scoring_engine.fallback_summary_text(scores["cluster_primary"], scores["domain_scores"])
+        insights = scoring_engine.compile_results(scores, summary_text)
+    except Exception as e:
+        print(f"Error processing onboarding data: {e}")
+        insights = scoring_engine.failed_results()
+
+    await run_blocking(simple_app.save_onboarding, user_id, onboarding_record, insights)
+    return 200, {"message": "Onboarding completed successfully", "insights": insights}
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def stream_open_journals(scope, receive):
+    """Server-Sent Events feed of new open journal posts, awaiting the hub on the loop"""
+    open_journal_hub.follow(lambda: db.get_index("open_journal"))
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    last_event_id = headers.get("last-event-id") or query.get("last_event_id", [None])[0]
+    missed, sequence, gap = open_journal_hub.replay(last_event_id)
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+
+    async def events():
+        current = sequence
+        try:
+            yield "retry: 3000\n\n"
+            if gap:
+                # Too far behind the ring buffer: the client should reload the feed
+                yield "event: reset\ndata: {}\n\n"
+            batch = missed
+            while True:
+                for event_id, data in batch:
+                    yield simple_app.sse_event("journal", data, event_id)
+                waiter = asyncio.ensure_future(open_journal_hub.await_events(current, timeout=15))
+                await asyncio.wait({waiter, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    waiter.cancel()
+                    return
+                batch, current = waiter.result()
+                if not batch:
+                    yield ": keep-alive\n\n"
+        finally:
+            disconnected.cancel()
+
+    return events()
+
+
+# Public routes served on the loop: (method, path, handler)
+STREAM_ROUTES = [
+    ("GET", "/api/journal/open/stream", stream_open_journals)
+]
+
+# (method, Flask-style rule used as the metrics route label, path pattern, handler)
+ASYNC_ROUTES = [
+    ("POST", "/api/chat", re.compile(r"^/api/chat$"), chat),
+    ("POST", "/api/chat/stream", re.compile(r"^/api/chat/stream$"), chat_stream),
+    ("POST", "/api/journal/private/<journal_id>/summarize",
+     re.compile(r"^/api/journal/private/(?P<journal_id>[^/]+)/summarize$"), summarize_private_journal),
+    ("POST", "/api/onboarding/submit", re.compile(r"^/api/onboarding/submit$"), submit_onboarding)
+]
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await gemini_client.aclose()
+            blocking_executor.shutdown(wait=False)
+            flask_app.shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+
+    if scope["type"] == "http":
+        for method, path, handler in STREAM_ROUTES:
+            if scope["path"] == path and scope["method"] == method:
+                started = time.perf_counter()
+                current_route.set(path)
+                await send_event_stream(send, await handler(scope, receive))
+                metrics.record_request(path, method, 200, time.perf_counter() - started)
+                return
+        for method, rule, pattern, handler in ASYNC_ROUTES:
+            match = pattern.match(scope["path"])
+            if match and scope["method"] == method:
+                started = time.perf_counter()
+                current_route.set(rule)
+                with metrics.span("auth.jwt"):
+                    user_id, error = authenticate(scope)
+                if error:
+                    status, body = error
+                else:
+                    try:
+                        status, body = await handler(user_id, await read_json(receive), **match.groupdict())
+                    except Exception as e:
+                        status, body = 500, {"error": str(e)}
+                if isinstance(body, dict):
+                    await send_json(send, status, body)
+                else:
+                    await send_event_stream(send, body)
+                metrics.record_request(rule, method, status, time.perf_counter() - started)
+                return
+
+    await flask_app(scope, receive, send)
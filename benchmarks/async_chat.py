@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Compare concurrent /api/chat throughput: Flask sync workers vs the ASGI app
+Both servers talk to a local fake Gemini endpoint with fixed latency, so the
+numbers reflect how many model round-trips each serving mode keeps in flight
+
+Usage: python benchmarks/async_chat.py [--concurrency 200] [--requests 600]
+       [--latency 0.5] [--flask-workers 4]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from fake_gemini import free_port, start_fake_gemini
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+FLASK_SERVER = """
+import sys
+from werkzeug.serving import run_simple
+from simple_app import app
+run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=False, processes=int(sys.argv[2]))
+"""
+
+
+def start_server(mode, port, env, flask_workers):
+    if mode == "flask":
+        command = [sys.executable, "-c", FLASK_SERVER, str(port), str(flask_workers)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(port),
+                   "--log-level", "warning", "--backlog", "4096"]
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+async def drive(port, token, concurrency, total):
+    """Send `total` chat requests with at most `concurrency` in flight"""
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120, limits=limits,
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/chat", json={"message": f"hello {i}", "chat_history": []})
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake Gemini latency in seconds")
+    parser.add_argument("--flask-workers", type=int, default=4)
+    args = parser.parse_args()
+
+    gemini_port = free_port()
+    fake = start_fake_gemini(gemini_port, first_token=args.latency)
+    env = dict(os.environ,
+               SOUPIE_DATA_DIR=tempfile.mkdtemp(prefix="soupie-bench-"),
+               JWT_SECRET=os.getenv("JWT_SECRET", "benchmark-secret"),
+               GEMINI_API_KEY="fake-key",
+               # Measure the serving modes, not the outbound limiter
+               GEMINI_MAX_IN_FLIGHT="10000", GEMINI_RPM="1000000",
+               GEMINI_API_BASE=f"http://127.0.0.1:{gemini_port}/v1beta")
+
+    sys.path.insert(0, str(PROJECT_ROOT))
+    os.environ["JWT_SECRET"] = env["JWT_SECRET"]
+    from api.auth import create_jwt_token
+    token = create_jwt_token("bench-user", "bench@example.com")
+
+    results = {"concurrency": args.concurrency, "gemini_latency_s": args.latency}
+    for mode in ("flask", "asgi"):
+        port = free_port()
+        process = start_server(mode, port, env, args.flask_workers)
+        try:
+            results[mode] = asyncio.run(drive(port, token, args.concurrency, args.requests))
+        finally:
+            process.terminate()
+            process.wait()
+
+    fake.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
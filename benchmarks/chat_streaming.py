@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Time-to-first-token for /api/chat versus /api/chat/stream
+The fake Gemini endpoint takes --first-token seconds before its first chunk
+and --chunk-delay between chunks, like a real model decoding a reply. For the
+buffered endpoint the first visible text arrives with the whole body; for the
+streamed one it arrives with the first `token` event.
+
+Usage: python benchmarks/chat_streaming.py [--server asgi|flask] [--requests 40]
+       [--concurrency 8] [--first-token 0.4] [--chunk-delay 0.05]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+from async_chat import PROJECT_ROOT, start_server
+from fake_gemini import free_port, start_fake_gemini
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 1),
+        "p95_ms": round(samples[max(int(len(samples) * 0.95) - 1, 0)] * 1000, 1)
+    }
+
+
+async def buffered_turn(client, i):
+    start = time.perf_counter()
+    response = await client.post("/api/chat", json={"message": f"hello {i}", "chat_history": []})
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+async def streamed_turn(client, i):
+    start = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", "/api/chat/stream",
+                             json={"message": f"hello {i}", "chat_history": []}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_token is None and line == "event: token":
+                first_token = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return first_token if first_token is not None else total, total
+
+
+async def drive(port, token, endpoint, concurrency, total):
+    turn = streamed_turn if endpoint == "stream" else buffered_turn
+    semaphore = asyncio.Semaphore(concurrency)
+    ttft, latency = [], []
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120,
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        async def one(i):
+            async with semaphore:
+                first, whole = await turn(client, i)
+                ttft.append(first)
+                latency.append(whole)
+
+        await asyncio.gather(*(one(i) for i in range(total)))
+
+    return {"time_to_first_token": summarize(ttft), "total_latency": summarize(latency)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--server", choices=("asgi", "flask"), default="asgi")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--first-token", type=float, default=0.4)
+    parser.add_argument("--chunk-delay", type=float, default=0.05)
+    parser.add_argument("--flask-workers", type=int, default=4)
+    args = parser.parse_args()
+
+    gemini_port = free_port()
+    fake = start_fake_gemini(gemini_port, first_token=args.first_token, chunk_delay=args.chunk_delay)
+    env = dict(os.environ,
+               SOUPIE_DATA_DIR=tempfile.mkdtemp(prefix="soupie-bench-"),
+               JWT_SECRET=os.getenv("JWT_SECRET", "benchmark-secret"),
+               GEMINI_API_KEY="fake-key",
+               GEMINI_API_BASE=f"http://127.0.0.1:{gemini_port}/v1beta")
+
+    sys.path.insert(0, str(PROJECT_ROOT))
+    os.environ["JWT_SECRET"] = env["JWT_SECRET"]
+    from api.auth import create_jwt_token
+    token = create_jwt_token("bench-user", "bench@example.com")
+
+    results = {"server": args.server, "first_token_s": args.first_token, "chunk_delay_s": args.chunk_delay}
+    port = free_port()
+    process = start_server(args.server, port, env, args.flask_workers)
+    try:
+        for endpoint in ("buffered", "stream"):
+            results[endpoint] = asyncio.run(drive(port, token, endpoint, args.concurrency, args.requests))
+    finally:
+        process.terminate()
+        process.wait()
+
+    fake.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Replay the dashboard.js fetch sequence with and without conditional requests
+Compares full responses against 304 revalidation using the Flask test client
+
+Usage: python benchmarks/conditional_requests.py [--iterations N] [--entries N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Point the app at scratch data before it is imported
+os.environ.setdefault("SOUPIE_DATA_DIR", tempfile.mkdtemp(prefix="soupie-bench-"))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from simple_app import app, db  # noqa: E402
+from api.auth import create_jwt_token  # noqa: E402
+
+# Requests issued by auth.js and dashboard.js when the dashboard loads
+DASHBOARD_SEQUENCE = [
+    "/api/dashboard",
+    "/api/dashboard",
+    "/api/profile/insights",
+    "/api/mood/history?days=1",
+]
+
+
+def seed(entries):
+    """Create one user with journals, moods and an onboarding record"""
+    user_id = db.create_user({"email": "bench@example.com", "first_name": "Bench", "last_name": "User"})
+    for i in range(entries):
+        db.create_private_journal(user_id, f"Private entry {i} about my day")
+        db.create_open_journal(user_id, f"Open entry {i}", "hopeful")
+    db._write_table("mood_records", [
+        {"id": str(i), "user_id": user_id, "mood": "good", "notes": "", "created_at": "2025-01-01T00:00:00"}
+        for i in range(entries)
+    ], user_id=user_id)
+    db.create_onboarding_record({"user_id": user_id, "insights": {"mental_health_index": 62.0}})
+    return user_id
+
+
+def replay(client, headers, iterations, conditional):
+    """Run the fetch sequence repeatedly, returning per-request latencies in ms"""
+    etags = {}
+    latencies = []
+    statuses = {}
+    for _ in range(iterations):
+        for path in DASHBOARD_SEQUENCE:
+            request_headers = dict(headers)
+            if conditional and path in etags:
+                request_headers["If-None-Match"] = etags[path]
+            start = time.perf_counter()
+            response = client.get(path, headers=request_headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.headers.get("ETag"):
+                etags[path] = response.headers["ETag"]
+    return latencies, statuses
+
+
+def summarize(latencies, statuses):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "mean_ms": round(statistics.mean(ordered), 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1], 3),
+        "statuses": statuses
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--entries", type=int, default=2000)
+    args = parser.parse_args()
+
+    user_id = seed(args.entries)
+    headers = {"Authorization": f"Bearer {create_jwt_token(user_id, 'bench@example.com')}"}
+    client = app.test_client()
+
+    results = {
+        "entries": args.entries,
+        "unconditional": summarize(*replay(client, headers, args.iterations, conditional=False)),
+        "conditional": summarize(*replay(client, headers, args.iterations, conditional=True))
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Crisis fast-path latency SLO for /api/chat and /api/chat/stream
+Against a deliberately slow fake Gemini, sends messages that match the crisis
+fast-path matcher and measures how long until the helpline resources arrive:
+the whole body for /api/chat, the `crisis` event for /api/chat/stream. Ordinary messages
+are sent alongside for comparison. Every buffered crisis response's follow-up
+model reply is then fetched from /api/chat/followup/<id>. Exits non-zero if
+the crisis p99 is over --slo-ms or a follow-up never arrives.
+
+--server prefork runs prefork.py, where a follow-up fetch usually lands on a
+different worker than the one generating the reply.
+
+Usage: python benchmarks/crisis_latency.py [--server asgi|prefork] [--requests 40]
+       [--concurrency 8] [--first-token 2.0] [--slo-ms 100] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from async_chat import PROJECT_ROOT, start_server
+from fake_gemini import free_port, start_fake_gemini
+
+CRISIS_MESSAGES = ["I don't want to be here anymore, I want to kill myself",
+                   "I've been feeling suicidal tonight",
+                   "Everyone would be better off dead without me",
+                   "I keep thinking about self-harm"]
+
+
+def start_prefork(port, env, workers):
+    process = subprocess.Popen([sys.executable, "prefork.py", "--workers", str(workers), "--host", "127.0.0.1",
+                                "--port", str(port)], cwd=PROJECT_ROOT, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    for line in process.stdout:
+        if line.startswith("Serving on"):
+            return process
+    raise RuntimeError("prefork.py did not start")
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 1),
+        "p99_ms": round(samples[max(int(len(samples) * 0.99) - 1, 0)] * 1000, 1),
+        "max_ms": round(samples[-1] * 1000, 1)
+    }
+
+
+async def buffered_turn(client, message):
+    start = time.perf_counter()
+    response = await client.post("/api/chat", json={"message": message})
+    response.raise_for_status()
+    return time.perf_counter() - start, response.json()
+
+
+async def streamed_turn(client, message):
+    """Time until the `crisis` event (or the first token for ordinary messages) and the whole stream"""
+    start = time.perf_counter()
+    first = None
+    async with client.stream("POST", "/api/chat/stream", json={"message": message}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first is None and line in ("event: crisis", "event: token"):
+                first = time.perf_counter() - start
+    return first if first is not None else time.perf_counter() - start, None
+
+
+async def drive(port, token, endpoint, crisis, concurrency, total):
+    turn = streamed_turn if endpoint == "stream" else buffered_turn
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, followup_ids = [], []
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120,
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        async def one(i):
+            message = CRISIS_MESSAGES[i % len(CRISIS_MESSAGES)] if crisis else f"hello {i}"
+            async with semaphore:
+                elapsed, body = await turn(client, message)
+            latencies.append(elapsed)
+            if body and body.get("followup_id"):
+                followup_ids.append(body["followup_id"])
+
+        await asyncio.gather(*(one(i) for i in range(total)))
+
+        # Every fast-path response must be followed by the model's reply
+        async def followup(followup_id):
+            response = await client.get(f"/api/chat/followup/{followup_id}", params={"wait": 25})
+            return response.status_code == 200 and bool(response.json().get("response"))
+
+        delivered = sum(await asyncio.gather(*(followup(f) for f in followup_ids)))
+
+    result = summarize(latencies)
+    if crisis and endpoint == "buffered":
+        result["followups"] = f"{delivered}/{total}"
+        result["followups_ok"] = delivered == total
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=("asgi", "prefork"), default="asgi")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--first-token", type=float, default=2.0, help="fake Gemini latency, seconds")
+    parser.add_argument("--slo-ms", type=float, default=100, help="p99 budget for the crisis response")
+    parser.add_argument("--workers", type=int, default=4, help="prefork.py workers")
+    args = parser.parse_args()
+
+    gemini_port = free_port()
+    fake = start_fake_gemini(gemini_port, first_token=args.first_token, chunk_delay=0.02)
+    env = dict(os.environ,
+               SOUPIE_DATA_DIR=tempfile.mkdtemp(prefix="soupie-bench-"),
+               JWT_SECRET=os.getenv("JWT_SECRET", "benchmark-secret"),
+               GEMINI_API_KEY="fake-key",
+               GEMINI_API_BASE=f"http://127.0.0.1:{gemini_port}/v1beta")
+
+    sys.path.insert(0, str(PROJECT_ROOT))
+    os.environ["JWT_SECRET"] = env["JWT_SECRET"]
+    from api.auth import create_jwt_token
+    token = create_jwt_token("bench-user", "bench@example.com")
+
+    results = {"server": args.server, "first_token_s": args.first_token, "slo_p99_ms": args.slo_ms}
+    port = free_port()
+    if args.server == "prefork":
+        process = start_prefork(port, env, args.workers)
+    else:
+        process = start_server("asgi", port, env, 0)
+    try:
+        for endpoint in ("buffered", "stream"):
+            results[endpoint] = {
+                kind: asyncio.run(drive(port, token, endpoint, kind == "crisis", args.concurrency, args.requests))
+                for kind in ("crisis", "ordinary")
+            }
+    finally:
+        process.terminate()
+        process.wait()
+        fake.shutdown()
+
+    passed = all(results[endpoint]["crisis"]["p99_ms"] <= args.slo_ms for endpoint in ("buffered", "stream"))
+    results["passed"] = passed and results["buffered"]["crisis"]["followups_ok"]
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if results["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Time the JSON data layer, the scoring engine and the hot read routes against
+synthetic corpora of increasing size, and emit the results as JSON
+
+For each size N the corpus has N mood records, N private and N open journal
+entries, and N/10 users each with an onboarding record, in the same shapes
+the app writes. Every user journals and logs a mood once a day, oldest first,
+so streaks and weekly reports have real work to do. Each size runs in its own
+process against its own data directory with Gemini unconfigured, so
+ScoringEngine timings exclude the network.
+
+Usage: python benchmarks/data_layer.py [--sizes 1000,100000,1000000] [--budget 2]
+       [--output results.json] [--compare previous.json] [--threshold 1.2]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+MOODS = ["excellent", "good", "okay", "poor", "terrible"]
+EMOTIONS = ["happy", "sad", "anxious", "grateful", "confused", "hopeful"]
+JOURNAL_LINES = [
+    "Work was heavy today and I felt behind on everything.",
+    "Went for a walk after lunch which helped me reset.",
+    "Talked to my sister and felt a bit more connected.",
+    "Could not sleep well, kept thinking about the deadline.",
+    "Made time to cook a proper dinner and felt proud of that.",
+]
+# bcrypt output for a fixed password; hashing per user would dominate generation
+PASSWORD_HASH = "$2b$12$xefHepZq7kGfK95uZ.HAyOFlOlgS8Mdgx.f0LXCVbK6Qyvznt1xp6"
+ROUTES = ["/api/dashboard", "/api/journal/open", "/api/journal/open?emotion_tag=anxious&emotion_tag=sad",
+          "/api/journal/open/facets", "/api/mood/weekly-report"]
+
+
+def write_table(data_dir, table_name, records):
+    """Stream records into a table file without holding the whole table in memory"""
+    path = os.path.join(data_dir, f"{table_name}.json")
+    with open(path, "w") as f:
+        f.write("[")
+        for i, record in enumerate(records):
+            f.write(",\n" if i else "\n")
+            f.write(json.dumps(record))
+        f.write("\n]")
+    return os.path.getsize(path)
+
+
+def onboarding_templates(rng, count):
+    """Onboarding records with insights, built by the app's own code from random answers"""
+    from simple_app import build_onboarding_record
+    from api.scoring_engine import scoring_engine
+
+    templates = []
+    for _ in range(count):
+        answers = {field: rng.choice(list(choices)) for field, choices in scoring_engine.normalization_maps.items()}
+        answers["coping_skills"] = rng.sample(["exercise", "journaling", "music", "talking", "meditation"], 2)
+        answers["suicidal_thoughts"] = "no"
+        record = build_onboarding_record(None, answers, "balanced")
+        record["insights"] = scoring_engine.process_onboarding_data(answers)
+        templates.append((answers, record))
+    return templates
+
+
+def generate_corpus(data_dir, rows, seed):
+    """Write every table for a corpus of `rows`; returns (user ids, raw onboarding answers, corpus stats)"""
+    rng = random.Random(seed)
+    users = max(rows // 10, 1)
+    days = -(-rows // users)
+    today = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    user_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(users)]
+    templates = onboarding_templates(rng, 32)
+
+    def stamp(i):
+        # Row i belongs to user i % users and is dated so each user has one row per day up to today
+        return (today - timedelta(days=days - 1 - i // users, seconds=rng.randrange(3600))).isoformat()
+
+    def user_rows():
+        for n, user_id in enumerate(user_ids):
+            yield {"email": f"user{n}@example.com", "phone": None, "first_name": "Bench", "last_name": f"User{n}",
+                   "password_hash": PASSWORD_HASH, "onboarding_done": True, "id": user_id,
+                   "created_at": (today - timedelta(days=days)).isoformat()}
+
+    def onboarding_rows():
+        for user_id in user_ids:
+            record = dict(rng.choice(templates)[1], user_id=user_id, id=str(uuid.uuid4()))
+            record["created_at"] = (today - timedelta(days=days)).isoformat()
+            yield record
+
+    def mood_rows():
+        for i in range(rows):
+            yield {"id": str(uuid.uuid4()), "user_id": user_ids[i % users], "mood": rng.choice(MOODS),
+                   "notes": "", "created_at": stamp(i)}
+
+    def private_rows():
+        for i in range(rows):
+            yield {"id": str(uuid.uuid4()), "user_id": user_ids[i % users],
+                   "content": " ".join(rng.sample(JOURNAL_LINES, 3)), "ai_summary": None, "created_at": stamp(i)}
+
+    def open_rows():
+        for i in range(rows):
+            yield {"id": str(uuid.uuid4()), "user_id": user_ids[i % users], "content": rng.choice(JOURNAL_LINES),
+                   "emotion_tag": rng.choice(EMOTIONS), "created_at": stamp(i)}
+
+    start = time.perf_counter()
+    sizes = {
+        "user_registration": write_table(data_dir, "user_registration", user_rows()),
+        "onboarding_records": write_table(data_dir, "onboarding_records", onboarding_rows()),
+        "mood_records": write_table(data_dir, "mood_records", mood_rows()),
+        "private_journal": write_table(data_dir, "private_journal", private_rows()),
+        "open_journal": write_table(data_dir, "open_journal", open_rows()),
+    }
+    stats = {
+        "rows": rows,
+        "users": users,
+        "generate_s": round(time.perf_counter() - start, 2),
+        "table_mb": {table: round(size / 1e6, 2) for table, size in sizes.items()}
+    }
+    return user_ids, [answers for answers, _ in templates], stats
+
+
+def measure(fn, budget, min_runs=3, max_runs=1000):
+    """Call fn repeatedly for about `budget` seconds and summarize the latencies"""
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < min_runs or (len(samples) < max_runs and time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    ordered = sorted(samples)
+    return {
+        "runs": len(samples),
+        "min_ms": round(ordered[0], 3),
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[max(int(len(ordered) * 0.95) - 1, 0)], 3),
+        "mean_ms": round(statistics.mean(ordered), 3)
+    }
+
+
+def run_size(rows, budget, seed):
+    """Generate one corpus and time everything against it (runs inside the child process)"""
+    from simple_app import app, calculate_journal_streak, db
+    from api.auth import create_jwt_token
+    from api.scoring_engine import scoring_engine
+
+    user_ids, answers, corpus = generate_corpus(db.data_dir, rows, seed)
+    hot = len(user_ids) // 2
+    hot_user = user_ids[hot]
+    journals = db.get_user_private_journals(hot_user) + db.get_user_open_journals(hot_user)
+    timings = {}
+
+    # Reads first so the write benchmarks don't change what they see
+    timings["db.get_user_by_id"] = measure(lambda: db.get_user_by_id(hot_user), budget)
+    timings["db.get_user_by_email"] = measure(lambda: db.get_user_by_email(f"user{hot}@example.com"), budget)
+    timings["db.get_user_private_journals"] = measure(lambda: db.get_user_private_journals(hot_user), budget)
+    timings["db.get_user_open_journals"] = measure(lambda: db.get_user_open_journals(hot_user), budget)
+    timings["db.get_user_onboarding_record"] = measure(lambda: db.get_user_onboarding_record(hot_user), budget)
+    timings["db.read_mood_records"] = measure(lambda: db._read_table("mood_records"), budget)
+    timings["db.get_open_journal_index"] = measure(db.get_open_journal_index, budget)
+    timings["scoring.process_onboarding_data"] = measure(
+        lambda: scoring_engine.process_onboarding_data(random.choice(answers)), budget)
+    timings["calculate_journal_streak"] = measure(lambda: calculate_journal_streak(journals), budget)
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {create_jwt_token(hot_user, 'bench@example.com')}"}
+    for path in ROUTES:
+        assert client.get(path, headers=headers).status_code == 200, path
+        timings[f"GET {path}"] = measure(lambda: client.get(path, headers=headers), budget)
+
+    timings["db.update_user"] = measure(lambda: db.update_user(hot_user, {"last_seen": time.time()}), budget)
+    timings["db.create_private_journal"] = measure(
+        lambda: db.create_private_journal(hot_user, "Benchmark entry"), budget)
+
+    corpus["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return {"corpus": corpus, "timings": timings}
+
+
+def run_child(rows, args):
+    """Run one size in a fresh interpreter pointed at a scratch data directory"""
+    data_dir = tempfile.mkdtemp(prefix=f"soupie-data-{rows}-")
+    result_file = os.path.join(data_dir, "result.json")
+    env = dict(os.environ, SOUPIE_DATA_DIR=data_dir, GEMINI_API_KEY="",
+               JWT_SECRET=os.getenv("JWT_SECRET", "benchmark-secret"))
+    try:
+        subprocess.run([sys.executable, __file__, "--child", str(rows), "--result-file", result_file,
+                        "--budget", str(args.budget), "--seed", str(args.seed)],
+                       env=env, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, check=True)
+        with open(result_file) as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def compare(results, previous, threshold):
+    """p50 ratios against an earlier run, listing the timings that got slower than `threshold`"""
+    ratios, regressions = {}, []
+    for size, current in results.items():
+        before = previous.get("results", {}).get(size, {}).get("timings", {})
+        for name, timing in current["timings"].items():
+            if name in before and before[name]["p50_ms"] > 0:
+                ratio = round(timing["p50_ms"] / before[name]["p50_ms"], 2)
+                ratios.setdefault(size, {})[name] = ratio
+                if ratio > threshold:
+                    regressions.append(f"{size}: {name} x{ratio}")
+    return {"baseline": previous.get("meta"), "p50_ratio": ratios, "regressions": regressions}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="comma-separated corpus sizes in rows")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds spent timing each operation")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--compare", help="earlier results file to compare p50 latencies against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="p50 ratio reported as a regression")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        sys.path.insert(0, str(PROJECT_ROOT))
+        with open(args.result_file, "w") as f:
+            json.dump(run_size(args.child, args.budget, args.seed), f)
+        return
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "budget_s": args.budget,
+            "seed": args.seed
+        },
+        "results": {}
+    }
+    for rows in (int(size) for size in args.sizes.split(",")):
+        print(f"Benchmarking {rows} rows...", file=sys.stderr)
+        report["results"][str(rows)] = run_child(rows, args)
+
+    if args.compare:
+        with open(args.compare) as f:
+            report["compare"] = compare(report["results"], json.load(f), args.threshold)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Check that /api/profile/export streams in constant memory
+Writes a large private journal history to scratch data, streams every export
+format through the Flask test client and fails if RSS grows past a ceiling
+
+Usage: python benchmarks/export_memory.py [--entries 100000] [--ceiling-mb 64]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("SOUPIE_DATA_DIR", tempfile.mkdtemp(prefix="soupie-bench-"))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from simple_app import app, db  # noqa: E402
+from api.auth import create_jwt_token  # noqa: E402
+
+
+def current_rss_mb():
+    """Resident set size of this process from /proc (Linux)"""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def write_history(user_id, entries):
+    """Write the journal table record by record so seeding does not inflate RSS"""
+    path = os.path.join(db.data_dir, "private_journal.json")
+    with open(path, "w") as f:
+        f.write("[")
+        for i in range(entries):
+            record = {
+                "id": f"entry-{i}",
+                "user_id": user_id,
+                "content": f"Journal entry {i}: " + "today I reflected on my week. " * 8,
+                "ai_summary": None,
+                "created_at": f"2024-01-01T00:00:{i % 60:02d}.{i:06d}"
+            }
+            f.write(("," if i else "") + json.dumps(record))
+        f.write("]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--ceiling-mb", type=float, default=64.0,
+                        help="maximum RSS growth allowed while streaming an export")
+    args = parser.parse_args()
+
+    user_id = db.create_user({"email": "bench@example.com", "first_name": "Bench", "last_name": "User"})
+    write_history(user_id, args.entries)
+    headers = {"Authorization": f"Bearer {create_jwt_token(user_id, 'bench@example.com')}"}
+    client = app.test_client()
+
+    results = {"entries": args.entries, "ceiling_mb": args.ceiling_mb, "formats": {}}
+    failed = False
+    for export_format, encoding in (("json", "identity"), ("json", "gzip"), ("ndjson", "identity"), ("zip", "identity")):
+        baseline = current_rss_mb()
+        peak = baseline
+        size = 0
+        start = time.perf_counter()
+        response = client.get(f"/api/profile/export?format={export_format}",
+                              headers={**headers, "Accept-Encoding": encoding}, buffered=False)
+        for i, chunk in enumerate(response.response):
+            size += len(chunk)
+            if i % 1000 == 0:
+                peak = max(peak, current_rss_mb())
+        response.close()
+        growth = peak - baseline
+        failed = failed or growth > args.ceiling_mb
+        results["formats"][f"{export_format}/{encoding}"] = {
+            "bytes": size,
+            "seconds": round(time.perf_counter() - start, 2),
+            "rss_growth_mb": round(growth, 1)
+        }
+
+    results["passed"] = not failed
+    print(json.dumps(results, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Local deterministic stand-in for the Gemini API used by the benchmarks
+Answers generateContent with one JSON body and streamGenerateContent?alt=sse
+with one SSE event per chunk. Latency is drawn from a configurable
+distribution, a fraction of calls fail with 500, and periodic windows answer
+503 to every call, all from a seeded generator so runs are repeatable.
+GET /stats reports how many calls got each outcome.
+
+Usage: python benchmarks/fake_gemini.py [--port 8765] [--latency lognormal:0.6:0.4]
+       [--chunk-delay 0.05] [--error-rate 0.02] [--burst-every 60 --burst-length 5] [--seed 1]
+Then point the app at it with GEMINI_API_BASE=http://127.0.0.1:8765/v1beta
+
+Latency specs (seconds): fixed:S, uniform:LOW:HIGH, normal:MEAN:STDDEV,
+lognormal:MEDIAN:SIGMA
+"""
+
+import argparse
+import json
+import math
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = ("I'm here with you. It sounds like today has been a lot to carry, "
+                 "and it makes sense to feel tired. What would help most right now?")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def reply_chunks(reply, words_per_chunk=3):
+    words = reply.split(" ")
+    return [" ".join(words[i:i + words_per_chunk]) + (" " if i + words_per_chunk < len(words) else "")
+            for i in range(0, len(words), words_per_chunk)]
+
+
+def candidate(text):
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+
+def api_error(code, status, message):
+    return {"error": {"code": code, "message": message, "status": status}}
+
+
+class LatencyModel:
+    """Time to first token, sampled from a named distribution"""
+
+    def __init__(self, kind="fixed", params=(0.5,)):
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.params = tuple(float(p) for p in params)
+
+    @classmethod
+    def parse(cls, spec):
+        kind, *params = spec.split(":")
+        return cls(kind, params)
+
+    def sample(self, rng):
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(*self.params))
+        median, sigma = self.params
+        return rng.lognormvariate(math.log(median), sigma)
+
+    def __str__(self):
+        return ":".join([self.kind] + [f"{p:g}" for p in self.params])
+
+
+class Behaviour:
+    """Seeded decisions shared by all handler threads"""
+
+    def __init__(self, latency, chunk_delay=0.0, error_rate=0.0, burst_every=0.0, burst_length=0.0,
+                 seed=0, reply=DEFAULT_REPLY):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.reply = reply
+        self.chunks = reply_chunks(reply)
+        self.started = time.monotonic()
+        self.outcomes = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def in_burst(self):
+        if not self.burst_every or not self.burst_length:
+            return False
+        return (time.monotonic() - self.started) % self.burst_every < self.burst_length
+
+    def next_call(self):
+        """(outcome, first-token delay) for the next request"""
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+            delay = self.latency.sample(self._rng)
+            outcome = "unavailable" if self.in_burst() else "error" if failed else "ok"
+            self.outcomes[outcome] += 1
+            return outcome, delay
+
+
+def make_handler(behaviour):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                self.send_json(200, dict(behaviour.outcomes))
+            else:
+                self.send_json(404, api_error(404, "NOT_FOUND", "Not found"))
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            outcome, delay = behaviour.next_call()
+            if outcome == "unavailable":
+                # Overloaded upstreams answer quickly with 503
+                self.send_json(503, api_error(503, "UNAVAILABLE", "The model is overloaded. Please try again later."))
+            elif outcome == "error":
+                time.sleep(delay)
+                self.send_json(500, api_error(500, "INTERNAL", "An internal error has occurred."))
+            elif ":streamGenerateContent" in self.path:
+                self.stream_reply(delay)
+            else:
+                # The whole reply is only available once the last chunk is generated
+                time.sleep(delay + behaviour.chunk_delay * (len(behaviour.chunks) - 1))
+                self.send_json(200, candidate(behaviour.reply))
+
+        def send_json(self, status, data):
+            body = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def stream_reply(self, delay):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(delay)
+            for i, text in enumerate(behaviour.chunks):
+                if i:
+                    time.sleep(behaviour.chunk_delay)
+                event = f"data: {json.dumps(candidate(text))}\r\n\r\n".encode()
+                self.wfile.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    request_queue_size = 1024
+    daemon_threads = True
+
+    def __init__(self, address, behaviour):
+        self.behaviour = behaviour
+        super().__init__(address, make_handler(behaviour))
+
+    def handle_error(self, request, client_address):
+        # Clients that time out and hang up are expected when simulating outages
+        pass
+
+
+def start_fake_gemini(port, first_token=0.5, chunk_delay=0.0, reply=DEFAULT_REPLY, latency=None,
+                      error_rate=0.0, burst_every=0.0, burst_length=0.0, seed=0):
+    """Serve in a background thread; returns the server (call shutdown() when done)
+
+    `latency` (a LatencyModel) overrides the fixed `first_token` delay.
+    """
+    behaviour = Behaviour(latency or LatencyModel("fixed", (first_token,)), chunk_delay, error_rate,
+                          burst_every, burst_length, seed, reply)
+    server = FakeGeminiServer(("127.0.0.1", port), behaviour)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_arguments(parser):
+    """Fake Gemini options, shared with the load driver"""
+    parser.add_argument("--latency", type=LatencyModel.parse, default=LatencyModel("fixed", (0.5,)),
+                        help="time-to-first-token distribution, e.g. lognormal:0.6:0.4")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 500")
+    parser.add_argument("--burst-every", type=float, default=0.0, help="seconds between 503 bursts (0 = none)")
+    parser.add_argument("--burst-length", type=float, default=0.0, help="seconds each 503 burst lasts")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    behaviour = Behaviour(args.latency, args.chunk_delay, args.error_rate, args.burst_every, args.burst_length,
+                          args.seed)
+    server = FakeGeminiServer(("127.0.0.1", args.port), behaviour)
+    print(f"Fake Gemini listening on http://127.0.0.1:{args.port}/v1beta (latency {args.latency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
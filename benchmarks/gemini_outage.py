@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Per-call latency of GeminiClient.generate while Gemini hangs
+The fake endpoint never answers within the timeout, so the first calls wait it
+out until the circuit breaker opens; every call after that should fail fast
+to the fallback path
+
+Usage: python benchmarks/gemini_outage.py [--calls 40] [--timeout 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from fake_gemini import free_port, start_fake_gemini
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--timeout", type=float, default=10.0, help="client timeout ceiling in seconds")
+    args = parser.parse_args()
+
+    port = free_port()
+    fake = start_fake_gemini(port, first_token=args.timeout * 3)
+    os.environ.update(GEMINI_API_KEY="fake-key", GEMINI_API_BASE=f"http://127.0.0.1:{port}/v1beta",
+                      GEMINI_TIMEOUT=str(args.timeout))
+    from api.gemini_client import GeminiClient, is_service_error
+    client = GeminiClient()
+
+    before_open, after_open = [], []
+    for i in range(args.calls):
+        was_open = client.breaker.state != "closed"
+        start = time.perf_counter()
+        result = client.generate(f"hello {i}")
+        elapsed = time.perf_counter() - start
+        assert is_service_error(result), result
+        (after_open if was_open else before_open).append(elapsed)
+
+    fake.shutdown()
+    print(json.dumps({
+        "calls": args.calls,
+        "timeout_s": args.timeout,
+        "calls_until_open": len(before_open),
+        "before_open_p50_ms": round(statistics.median(before_open) * 1000, 1) if before_open else None,
+        "after_open_p50_ms": round(statistics.median(after_open) * 1000, 3) if after_open else None,
+        "after_open_max_ms": round(max(after_open) * 1000, 3) if after_open else None,
+        "health": client.health()
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
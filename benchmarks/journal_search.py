@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Time private journal search on one user with a large journal, and emit the
+results as JSON
+
+Builds a UserSearchIndex over N synthetic entries (words drawn from a
+Zipf-like vocabulary, so common words have long postings lists like real
+text), then times single-term, multi-term, rare-term and phrase queries and
+snippet generation. No database or server is involved.
+
+Usage: python benchmarks/journal_search.py [--entries 100000] [--budget 2] [--seed 1]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api.journal_search import UserSearchIndex, snippet  # noqa: E402
+from data_layer import measure  # noqa: E402
+
+COMMON_WORDS = ["i", "the", "and", "to", "a", "my", "was", "felt", "today", "it", "of", "in", "work",
+                "tired", "calm", "anxious", "sleep", "walk", "friend", "family", "better", "again"]
+QUERIES = {
+    "common_term": "today",
+    "two_terms": "anxious sleep",
+    "rare_term": "word4999",
+    "phrase": '"felt calm"',
+    "phrase_and_term": '"could not sleep" work'
+}
+
+
+def generate_entries(count, vocabulary, seed):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    entries = []
+    for i in range(count):
+        words = rng.choices(vocabulary, weights=weights, k=rng.randint(20, 120))
+        if i % 50 == 0:
+            words[rng.randrange(len(words)):0] = ["could", "not", "sleep"]
+        entries.append({"id": f"entry-{i}", "user_id": "bench-user", "content": " ".join(words),
+                        "created_at": f"2024-01-01T00:00:{i:06d}"})
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds spent timing each query")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    vocabulary = COMMON_WORDS + ["could", "not"] + [f"word{i}" for i in range(args.vocabulary)]
+    entries = generate_entries(args.entries, vocabulary, args.seed)
+
+    index = UserSearchIndex()
+    started = time.perf_counter()
+    index.build(entries)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    results = {"entries": args.entries, "tokens": index.total_length, "distinct_terms": len(index.postings),
+               "build_ms": round(build_ms, 1), "queries": {}}
+    for name, query in QUERIES.items():
+        total, exact, _ = index.search(query)
+        timing = measure(lambda: index.search(query, limit=20), args.budget)
+        results["queries"][name] = dict(query=query, matches=total, exact=exact, **timing)
+
+    _, _, page = index.search("anxious sleep", limit=20)
+    results["snippets_page"] = measure(lambda: [snippet(r["content"], "anxious sleep") for _, r in page],
+                                       args.budget)
+    update = dict(entries[0], content="a fresh rewrite of the first entry")
+    results["update_entry"] = measure(lambda: index.add(update), args.budget)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Replay realistic user sessions against Soupie with Gemini replaced by the
+local fake, and report throughput plus p50/p95/p99 latency per endpoint
+
+Each session registers, completes onboarding, writes and summarizes a private
+journal entry, shares an open journal post, chats for a few turns and then
+loads the dashboard the way dashboard.js does.
+
+Usage: python benchmarks/load_test.py [--server asgi|flask] [--users 20] [--sessions 100]
+       [--chats 3] [--think 0] [--latency lognormal:0.6:0.4] [--error-rate 0.02]
+       [--burst-every 30 --burst-length 3]
+       python benchmarks/load_test.py --target http://127.0.0.1:5000   (already running app;
+       point its GEMINI_API_BASE at benchmarks/fake_gemini.py yourself)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+from async_chat import PROJECT_ROOT, start_server
+from fake_gemini import add_arguments, free_port, start_fake_gemini
+
+JOURNAL_LINES = [
+    "Work was heavy today and I felt behind on everything.",
+    "Went for a walk after lunch which helped me reset.",
+    "Talked to my sister and felt a bit more connected.",
+    "Could not sleep well, kept thinking about the deadline.",
+    "Made time to cook a proper dinner and felt proud of that.",
+]
+CHAT_MESSAGES = [
+    "Hi, I've had a long day",
+    "I keep worrying about work even when I'm home",
+    "Maybe I should write about it",
+    "Thanks, that helps",
+]
+EMOTIONS = ["happy", "sad", "anxious", "grateful", "confused", "hopeful"]
+
+
+def percentile(ordered, fraction):
+    return ordered[max(int(round(len(ordered) * fraction)) - 1, 0)]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client, label, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.latencies[label].append(time.perf_counter() - start)
+        if not ok:
+            self.errors[label] += 1
+        return response if ok else None
+
+    def report(self):
+        endpoints = {}
+        for label, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            endpoints[label] = {
+                "requests": len(samples),
+                "errors": self.errors[label],
+                "p50_ms": round(statistics.median(ordered) * 1000, 1),
+                "p95_ms": round(percentile(ordered, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 1)
+            }
+        return endpoints
+
+
+def onboarding_answers(rng):
+    """One answer per scored question, drawn from the scoring engine's own vocabularies"""
+    sys.path.insert(0, str(PROJECT_ROOT))
+    from api.scoring_engine import scoring_engine
+    answers = {field: rng.choice(list(choices)) for field, choices in scoring_engine.normalization_maps.items()}
+    answers["coping_skills"] = rng.sample(["exercise", "journaling", "music", "talking", "meditation"], 2)
+    answers["suicidal_thoughts"] = "no"
+    return answers
+
+
+async def session(client, recorder, n, args, run_id):
+    rng = random.Random(args.seed * 100003 + n)
+
+    async def think():
+        if args.think:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think))
+
+    response = await recorder.call(client, "POST /api/register", "POST", "/api/register", json={
+        "email": f"load-{run_id}-{n}@example.com", "first_name": "Load", "last_name": f"User{n}",
+        "password": "load-test-password"
+    })
+    if response is None:
+        return
+    headers = {"Authorization": f"Bearer {response.cookies.get('jwt_token')}"}
+    await think()
+
+    await recorder.call(client, "POST /api/onboarding/submit", "POST", "/api/onboarding/submit", headers=headers,
+                        json={"onboarding_data": onboarding_answers(rng), "onboarding_level": "balanced"})
+    await think()
+
+    content = " ".join(rng.sample(JOURNAL_LINES, 3))
+    response = await recorder.call(client, "POST /api/journal/private", "POST", "/api/journal/private",
+                                   headers=headers, json={"content": content})
+    if response is not None:
+        entry_id = response.json()["entry_id"]
+        await think()
+        await recorder.call(client, "POST /api/journal/private/{id}/summarize", "POST",
+                            f"/api/journal/private/{entry_id}/summarize", headers=headers)
+    await think()
+
+    await recorder.call(client, "POST /api/journal/open", "POST", "/api/journal/open", headers=headers,
+                        json={"content": rng.choice(JOURNAL_LINES), "emotion_tag": rng.choice(EMOTIONS)})
+    await think()
+
+    session_id = None
+    for message in CHAT_MESSAGES[:args.chats]:
+        response = await recorder.call(client, "POST /api/chat", "POST", "/api/chat", headers=headers,
+                                       json={"message": message, "session_id": session_id})
+        if response is not None:
+            session_id = response.json().get("session_id", session_id)
+        await think()
+
+    # dashboard.js on load
+    await recorder.call(client, "GET /api/dashboard", "GET", "/api/dashboard", headers=headers)
+    await recorder.call(client, "GET /api/profile/insights", "GET", "/api/profile/insights", headers=headers)
+    await recorder.call(client, "GET /api/mood/history", "GET", "/api/mood/history?days=1", headers=headers)
+    await recorder.call(client, "GET /api/journal/open", "GET", "/api/journal/open", headers=headers)
+
+
+async def drive(base_url, args):
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.users)
+    run_id = int(time.time())
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def one(n):
+            async with semaphore:
+                await session(client, recorder, n, args, run_id)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(args.sessions)))
+        elapsed = time.perf_counter() - start
+
+    endpoints = recorder.report()
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "seconds": round(elapsed, 2),
+        "sessions_per_second": round(args.sessions / elapsed, 2),
+        "requests": total,
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "throughput_rps": round(total / elapsed, 1),
+        "endpoints": endpoints
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=("asgi", "flask"), default="asgi")
+    parser.add_argument("--target", help="base URL of an already running app (skips starting servers)")
+    parser.add_argument("--users", type=int, default=20, help="concurrent sessions")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--chats", type=int, default=3, help=f"chat turns per session (max {len(CHAT_MESSAGES)})")
+    parser.add_argument("--think", type=float, default=0.0, help="mean seconds of think time between steps")
+    parser.add_argument("--flask-workers", type=int, default=4)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    config = {k: str(v) if k == "latency" else v for k, v in vars(args).items()}
+    if args.target:
+        print(json.dumps({"config": config, **asyncio.run(drive(args.target, args))}, indent=2))
+        return
+
+    gemini_port = free_port()
+    fake = start_fake_gemini(gemini_port, latency=args.latency, chunk_delay=args.chunk_delay,
+                             error_rate=args.error_rate, burst_every=args.burst_every,
+                             burst_length=args.burst_length, seed=args.seed)
+    env = dict(os.environ,
+               SOUPIE_DATA_DIR=tempfile.mkdtemp(prefix="soupie-load-"),
+               JWT_SECRET=os.getenv("JWT_SECRET", "benchmark-secret"),
+               GEMINI_API_KEY="fake-key",
+               GEMINI_API_BASE=f"http://127.0.0.1:{gemini_port}/v1beta")
+
+    port = free_port()
+    process = start_server(args.server, port, env, args.flask_workers)
+    try:
+        results = asyncio.run(drive(f"http://127.0.0.1:{port}", args))
+    finally:
+        process.terminate()
+        process.wait()
+    fake.shutdown()
+
+    results["gemini_calls"] = dict(fake.behaviour.outcomes)
+    print(json.dumps({"config": config, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+A burst of journal summaries and onboarding enrichment arriving during live chat
+With a small in-flight cap, chat turns should keep short queue times while the
+lower classes absorb the wait and are shed once their deadline passes
+
+Usage: python benchmarks/outbound_priority.py [--max-in-flight 4] [--latency 0.5]
+       [--summaries 60] [--onboarding 20] [--chats 20]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from fake_gemini import free_port, start_fake_gemini
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+async def run(client, args):
+    from api.gemini_client import is_service_error
+    latencies = {"chat": [], "summary": [], "onboarding": []}
+    failed = {klass: 0 for klass in latencies}
+
+    async def call(klass, i):
+        start = time.perf_counter()
+        result = await client.agenerate(f"{klass} {i}", priority=klass)
+        latencies[klass].append(time.perf_counter() - start)
+        if is_service_error(result):
+            failed[klass] += 1
+
+    async def chats():
+        # Users keep chatting while the burst is queued
+        for i in range(args.chats):
+            await call("chat", i)
+            await asyncio.sleep(0.1)
+
+    burst = [call("summary", i) for i in range(args.summaries)] + \
+            [call("onboarding", i) for i in range(args.onboarding)]
+    await asyncio.gather(chats(), *burst)
+    await client.aclose()
+
+    return {
+        klass: {
+            "requests": len(samples),
+            "fell_back": failed[klass],
+            "p50_ms": round(statistics.median(samples) * 1000, 1),
+            "max_ms": round(max(samples) * 1000, 1)
+        } for klass, samples in latencies.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=6000)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--summaries", type=int, default=60)
+    parser.add_argument("--onboarding", type=int, default=20)
+    parser.add_argument("--chats", type=int, default=20)
+    args = parser.parse_args()
+
+    port = free_port()
+    fake = start_fake_gemini(port, first_token=args.latency)
+    os.environ.update(GEMINI_API_KEY="fake-key", GEMINI_API_BASE=f"http://127.0.0.1:{port}/v1beta",
+                      GEMINI_MAX_IN_FLIGHT=str(args.max_in_flight), GEMINI_RPM=str(args.rpm))
+    from api.gemini_client import GeminiClient
+    client = GeminiClient()
+
+    results = asyncio.run(run(client, args))
+    fake.shutdown()
+    results["scheduler"] = client.scheduler.snapshot()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Compare prefork.py with and without preloading: startup, first-request
+latency and per-worker memory
+
+Generates a synthetic corpus (see data_layer.py), then for each mode starts
+`prefork.py --workers N` on it, sends every worker's first requests to the
+index-backed feed routes and, once all workers have served traffic, reads
+each process's unique (USS) and proportional (PSS) memory from /proc. With
+preloading the workers' USS should stay small because the indexes built by
+the master are shared copy-on-write; without it every worker builds its own.
+Linux only.
+
+Usage: python benchmarks/prefork_memory.py [--rows 20000] [--workers 4] [--requests 40]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from async_chat import PROJECT_ROOT
+from data_layer import generate_corpus
+from fake_gemini import free_port
+
+FEED_ROUTES = ["/api/journal/open", "/api/journal/open?emotion_tag=anxious&emotion_tag=sad",
+               "/api/journal/open/facets", "/api/journal/private"]
+
+
+def children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def get(port, path, token):
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", headers={"Authorization": f"Bearer {token}"})
+    started = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        response.read()
+    return (time.perf_counter() - started) * 1000
+
+
+def run_mode(preload, data_dir, workers, requests, token, env):
+    from api.process_memory import memory_usage
+
+    port = free_port()
+    command = [sys.executable, "prefork.py", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)]
+    if not preload:
+        command.append("--no-preload")
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=dict(env, SOUPIE_DATA_DIR=data_dir),
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        for line in process.stdout:
+            if line.startswith("Serving on"):
+                break
+        else:
+            raise RuntimeError("prefork.py did not start")
+        ready_s = time.perf_counter() - started
+
+        # Sequential requests land on whichever worker accepts first, so send enough for every worker
+        latencies = [get(port, FEED_ROUTES[i % len(FEED_ROUTES)], token) for i in range(requests)]
+        worker_pids = children(process.pid)
+        worker_memory = [memory_usage(pid) for pid in worker_pids]
+        master_memory = memory_usage(process.pid)
+        return {
+            "ready_s": round(ready_s, 2),
+            "first_request_ms": round(latencies[0], 1),
+            "slowest_request_ms": round(max(latencies), 1),
+            "median_request_ms": round(statistics.median(latencies), 1),
+            "master_uss_mb": round(master_memory["uss"] / 1048576, 1),
+            "worker_uss_mb": [round(m["uss"] / 1048576, 1) for m in worker_memory],
+            "worker_rss_mb": [round(m["rss"] / 1048576, 1) for m in worker_memory],
+            "total_pss_mb": round((master_memory["pss"] + sum(m["pss"] for m in worker_memory)) / 1048576, 1)
+        }
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="rows per journal table")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=40, help="feed requests sent before measuring memory")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    env = dict(os.environ, GEMINI_API_KEY="", JWT_SECRET=os.getenv("JWT_SECRET", "benchmark-secret"))
+    os.environ.update(env)
+    sys.path.insert(0, str(PROJECT_ROOT))
+    data_dir = tempfile.mkdtemp(prefix="soupie-prefork-")
+    try:
+        user_ids, _, stats = generate_corpus(data_dir, args.rows, args.seed)
+        from api.auth import create_jwt_token
+        token = create_jwt_token(user_ids[0], "user0@example.com")
+
+        report = {"corpus": stats, "workers": args.workers, "requests": args.requests}
+        for name, preload in (("lazy", False), ("preload", True)):
+            report[name] = run_mode(preload, data_dir, args.workers, args.requests, token, env)
+        print(json.dumps(report, indent=2))
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
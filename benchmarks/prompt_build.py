@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Prompt assembly time and estimated input tokens for chat and journal summaries
+Covers a short turn, a turn with long history and an oversized journal entry,
+which the token budget should cap
+
+Usage: python benchmarks/prompt_build.py [--iterations 20000]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api.prompts import (CHAT_PROMPT_TOKEN_BUDGET, SUMMARY_PROMPT_TOKEN_BUDGET,  # noqa: E402
+                         build_chat_prompt, build_journal_summary_prompt, estimate_tokens)
+
+CONTEXT = {"is_new_user": False, "recent_mood": "sad", "total_entries": 12}
+STATE = {"mood": "low", "energy_level": "low", "stress_level": "low", "support_level": "medium"}
+LONG_TURN = "I keep going over the same conversation from work in my head. " * 40
+
+CASES = {
+    "chat_short": lambda: build_chat_prompt("I had a rough day", CONTEXT, [], STATE, False),
+    "chat_long_history": lambda: build_chat_prompt(
+        "and it keeps happening", CONTEXT,
+        [{"isUser": i % 2 == 0, "content": LONG_TURN} for i in range(10)], STATE, False),
+    "summary_normal": lambda: build_journal_summary_prompt("Went for a walk, finished my notes, felt calmer. " * 10),
+    "summary_oversized": lambda: build_journal_summary_prompt("Everything happened today. " * 5000),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = {"chat_budget_tokens": CHAT_PROMPT_TOKEN_BUDGET, "summary_budget_tokens": SUMMARY_PROMPT_TOKEN_BUDGET}
+    for name, build in CASES.items():
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            prompt = build()
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "build_us": round(elapsed / args.iterations * 1e6, 2),
+            "estimated_tokens": estimate_tokens(prompt)
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
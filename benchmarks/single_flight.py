@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Upstream Gemini calls made for a burst of identical concurrent requests
+Fires --callers identical prompts at once (a double-clicked summarize
+button, a retrying client, matching onboarding profiles) and counts how many
+reached the fake Gemini endpoint, with single-flight coalescing off and on:
+from threads (generate), from one event loop (agenerate) and from
+--processes forked workers sharing a GEMINI_SINGLE_FLIGHT_DIR.
+
+Usage: python benchmarks/single_flight.py [--callers 20] [--processes 4] [--latency 0.5]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from fake_gemini import free_port, start_fake_gemini
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PROMPT = "Summarize this journal entry: I went for a long walk and felt calmer afterwards."
+
+
+def upstream_calls(fake):
+    return sum(fake.behaviour.outcomes.values())
+
+
+def thread_burst(client, callers):
+    barrier = threading.Barrier(callers)
+    results = []
+
+    def call():
+        barrier.wait()
+        results.append(client.generate(PROMPT, priority="summary"))
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+async def async_burst(client, callers):
+    try:
+        return await asyncio.gather(*(client.agenerate(PROMPT, priority="summary") for _ in range(callers)))
+    finally:
+        await client.aclose()
+
+
+def process_worker(callers, start_at):
+    from api.gemini_client import GeminiClient
+    client = GeminiClient()
+    time.sleep(max(start_at - time.time(), 0))
+    thread_burst(client, callers)
+    os._exit(0)
+
+
+def process_burst(processes, callers):
+    start_at = time.time() + 0.5
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=process_worker, args=(callers, start_at)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def measure(fake, run):
+    before = upstream_calls(fake)
+    started = time.perf_counter()
+    run()
+    return {"upstream_calls": upstream_calls(fake) - before, "wall_s": round(time.perf_counter() - started, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=20, help="identical calls per burst (per process)")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake Gemini latency, seconds")
+    args = parser.parse_args()
+
+    port = free_port()
+    fake = start_fake_gemini(port, first_token=args.latency)
+    shared_dir = tempfile.mkdtemp(prefix="soupie-single-flight-")
+    os.environ.update(GEMINI_API_KEY="fake-key", GEMINI_API_BASE=f"http://127.0.0.1:{port}/v1beta")
+    from api.gemini_client import GeminiClient
+
+    report = {"callers": args.callers, "processes": args.processes, "latency_s": args.latency}
+    try:
+        for mode, setting in (("off", "0"), ("on", "1")):
+            os.environ["GEMINI_SINGLE_FLIGHT"] = setting
+            os.environ.pop("GEMINI_SINGLE_FLIGHT_DIR", None)
+            result = {
+                "threads": measure(fake, lambda: thread_burst(GeminiClient(), args.callers)),
+                "asyncio": measure(fake, lambda: asyncio.run(async_burst(GeminiClient(), args.callers)))
+            }
+            if setting == "1":
+                os.environ["GEMINI_SINGLE_FLIGHT_DIR"] = shared_dir
+            result["processes"] = measure(fake, lambda: process_burst(args.processes, args.callers))
+            report[mode] = result
+    finally:
+        fake.shutdown()
+        shutil.rmtree(shared_dir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Measure startup time and first-request latency, and check that the app is
+built only once per process
+
+Each run starts a fresh interpreter against a scratch data directory and
+either imports simple_app (as asgi.py, api/app.py and the benchmarks do) or
+runs it as a script like `python simple_app.py`, with Flask.run standing in
+for the measurement so no server is started. It then registers a user and
+submits onboarding twice: the onboarding summary is where ScoringEngine used
+to import simple_app, which re-executed the whole module when it was running
+as __main__. Reports time until the app is ready, both onboarding latencies,
+how many Flask apps exist afterwards and how many copies of simple_app ran.
+
+Usage: python benchmarks/startup.py [--runs 5] [--modes import,script]
+"""
+
+import argparse
+import gc
+import json
+import os
+import runpy
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+ONBOARDING = {
+    "onboarding_level": "balanced",
+    "onboarding_data": {
+        "sleep_quality": "not_great",
+        "energy_level": "low",
+        "coping_skills": ["journaling", "music"],
+        "suicidal_thoughts": "no"
+    }
+}
+
+
+def first_requests(app):
+    """Register a user and time two onboarding submits through the test client"""
+    client = app.test_client()
+    response = client.post("/api/register", json={"email": "startup@example.com", "first_name": "Start",
+                                                   "last_name": "Up", "password": "password123"})
+    token = response.headers["Set-Cookie"].split("jwt_token=")[1].split(";")[0]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    timings = {}
+    for name in ("first_onboarding_ms", "second_onboarding_ms"):
+        started = time.perf_counter()
+        response = client.post("/api/onboarding/submit", json=ONBOARDING, headers=headers)
+        timings[name] = (time.perf_counter() - started) * 1000
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return timings
+
+
+def run_child(mode, result_file):
+    started = time.perf_counter()
+    import flask
+
+    result = {}
+
+    def measure(app):
+        result["ready_ms"] = (time.perf_counter() - started) * 1000
+        result.update(first_requests(app))
+        # type() rather than isinstance(): weakref proxies to the app pass isinstance checks
+        result["flask_apps"] = sum(issubclass(type(obj), flask.Flask) for obj in gc.get_objects())
+        result["simple_app_executions"] = len({id(module) for module in list(sys.modules.values())
+                                               if hasattr(module, "submit_onboarding")})
+
+    if mode == "script":
+        # `python simple_app.py` ends in app.run(); measure there instead of serving
+        flask.Flask.run = lambda app, *args, **kwargs: measure(app)
+        sys.argv = [str(PROJECT_ROOT / "simple_app.py")]
+        runpy.run_path(str(PROJECT_ROOT / "simple_app.py"), run_name="__main__")
+    else:
+        sys.path.insert(0, str(PROJECT_ROOT))
+        import simple_app
+        measure(simple_app.app)
+
+    with open(result_file, "w") as f:
+        json.dump(result, f)
+
+
+def run_once(mode):
+    data_dir = tempfile.mkdtemp(prefix="soupie-startup-")
+    result_file = os.path.join(data_dir, "result.json")
+    env = dict(os.environ, SOUPIE_DATA_DIR=data_dir, GEMINI_API_KEY="",
+               JWT_SECRET=os.getenv("JWT_SECRET", "benchmark-secret"))
+    try:
+        subprocess.run([sys.executable, __file__, "--child", mode, "--result-file", result_file],
+                       env=env, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, check=True)
+        with open(result_file) as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", default="import,script", help="comma-separated: import, script")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.result_file)
+        return
+
+    report = {}
+    for mode in args.modes.split(","):
+        runs = [run_once(mode) for _ in range(args.runs)]
+        report[mode] = {name: round(statistics.median(run[name] for run in runs), 2) for name in runs[0]}
+    print(json.dumps({"runs": args.runs, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
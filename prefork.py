@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Preload-and-fork server for Soupie
+The master process builds the app once, preloads it (journal indexes, the
+onboarding scorer, compiled templates; see api.factory.preload_app), binds
+the listening socket and forks the workers. Workers share the preloaded
+memory copy-on-write and each serve requests on a threaded werkzeug server
+over the inherited socket. Writes made by one worker reach the others'
+indexes through the tables' change logs (api/change_log.py) rather than
+full rebuilds. The master restarts workers that exit, and on SIGUSR1 prints
+every process's unique (USS), proportional (PSS) and resident (RSS) memory.
+
+Run with: python prefork.py --workers 4 --port 5000
+          python prefork.py --workers 4 --no-preload   (each worker warms up lazily)
+Linux/macOS only (os.fork).
+"""
+
+import argparse
+import atexit
+import os
+import signal
+import socket
+import sys
+import time
+
+import simple_app
+from api.factory import preload_app
+from api.process_memory import format_usage, memory_usage
+
+# A worker that dies sooner than this after starting is restarted with a delay
+MIN_WORKER_LIFETIME = 1.0
+
+
+def serve_worker(app, sock: socket.socket, host: str, port: int):
+    """Worker process body: serve the inherited socket until told to stop"""
+    from werkzeug.serving import make_server
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the master stops workers with SIGTERM
+    signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, stop_worker)
+    make_server(host, port, app, threaded=True, fd=sock.fileno()).serve_forever()
+
+
+def stop_worker(signum, frame):
+    # werkzeug's serve_forever treats KeyboardInterrupt as a clean shutdown
+    raise KeyboardInterrupt
+
+
+class Master:
+    def __init__(self, app, sock: socket.socket, host: str, port: int, workers: int):
+        self.app = app
+        self.sock = sock
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.workers = {}  # pid -> start time
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                serve_worker(self.app, self.sock, self.host, self.port)
+            except BaseException as e:
+                print(f"Worker {os.getpid()} failed: {e}")
+                code = 1
+            finally:
+                # Flush buffered writers (reaction counts, insights) as a normal exit would
+                atexit._run_exitfuncs()
+                os._exit(code)
+        self.workers[pid] = time.monotonic()
+
+    def report_memory(self, *args):
+        print(f"master {os.getpid()}: {format_usage(memory_usage())}")
+        for pid in sorted(self.workers):
+            print(f"worker {pid}: {format_usage(memory_usage(pid))}")
+        sys.stdout.flush()
+
+    def stop(self, *args):
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGUSR1, self.report_memory)
+        for _ in range(self.worker_count):
+            self.spawn()
+        print(f"Serving on http://{self.host}:{self.port} with {self.worker_count} workers "
+              f"{sorted(self.workers)} (kill -USR1 {os.getpid()} reports memory)")
+        sys.stdout.flush()
+
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.workers.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            self.spawn()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--no-preload", action="store_true", help="fork straight away and let workers warm up lazily")
+    args = parser.parse_args()
+
+    if not args.no_preload:
+        preload_app(simple_app.app)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(128)
+    Master(simple_app.app, sock, args.host, args.port, args.workers).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,10 @@ source venv/bin/activate
 echo "📚 Installing dependencies..."
 pip install -r requirements.txt
 
+# Build fingerprinted, precompressed static assets
+echo "🗜️  Building static assets..."
+python -m api.assets
+
 # Check if .env exists
 if [ ! -f ".env" ]; then
     echo "⚙️  Creating .env file from template..."
@@ -17,13 +17,18 @@ os.chdir(project_root)
 # Set environment variables
 os.environ.setdefault('FLASK_ENV', 'development')
 
+# Run as a script this module is __main__; register it under its import name too
+# so anything importing simple_app reuses it instead of executing it a second time
+if __name__ == '__main__':
+    sys.modules.setdefault('simple_app', sys.modules[__name__])
+
 try:
-    from flask import Flask, request, jsonify, render_template, make_response, redirect, url_for
-    from flask_cors import CORS
+    from flask import Response, stream_with_context, request, jsonify, render_template, make_response, redirect, url_for
     import os
     from dotenv import load_dotenv
-    import requests
     import uuid
+    import json
+    import time
     from datetime import datetime
 
     # Load environment variables
@@ -31,48 +36,40 @@ try:
 
     # Import JSON database and auth
     from api.json_db import db, get_db
+    from api.feed_index import paginate
+    from api.http_cache import conditional
+    from api.pubsub import open_journal_hub
+    from api.reaction_counter import reaction_counter, REACTION_TYPES, FLAG
+    from api.data_export import EXPORT_FORMATS, iter_export, gzip_stream
     from api.auth import hash_password, verify_password, create_jwt_token, jwt_required, get_current_user_id
     from api.scoring_engine import scoring_engine
-
-    app = Flask(__name__, template_folder='templates', static_folder='static')
-    CORS(app)
-
-    # Initialize database tables
-    db.init_tables()
-    
-    # Add mood tracking table if it doesn't exist
-    try:
-        mood_records = db._read_table("mood_records")
-    except:
-        db._write_table("mood_records", [])
+    from api.gemini_client import gemini_client, GeminiStreamError, is_service_error
+    from api.prompts import build_chat_prompt, build_journal_summary_prompt, CHAT_HISTORY_TURNS
+    from api.chat_sessions import chat_sessions
+    from api.crisis import is_crisis_message, has_crisis_indicator, crisis_reply, crisis_followups, HELPLINE_RESOURCES
+    from api.metrics import metrics
+    from api.insights_store import insights_store, daily_trend
+    from api.factory import create_app
+    from api.unit_of_work import current_unit
+    from api.emotion_analysis import (emotion_trend, energy_level, reflective_depth, EMOTIONS, mask_emotions,
+                                      record_analysis)
+
+    app = create_app()
 
     # Gemini API helper
-    def call_gemini(prompt):
-        """Call Gemini API with the given prompt"""
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            return "AI service not configured. Please set GEMINI_API_KEY in your environment."
-        
-        try:
-            # Try Gemini 2.0 Flash model
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
-            headers = {"Content-Type": "application/json"}
-            payload = {"contents": [{"parts": [{"text": prompt}]}]}
-            
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
-            response.raise_for_status()
-            return response.json()["candidates"][0]["content"]["parts"][0]["text"]
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                return "AI service error: Invalid API key or model not available. Please check your GEMINI_API_KEY."
-            elif e.response.status_code == 403:
-                return "AI service error: API key does not have permission. Please check your GEMINI_API_KEY."
-            elif e.response.status_code == 503:
-                return "AI service error: HTTP 503 - Service temporarily overloaded. Please try again later."
-            else:
-                return f"AI service error: HTTP {e.response.status_code} - {e.response.text}"
-        except Exception as e:
-            return f"AI service error: {str(e)}"
+    def call_gemini(prompt, priority='chat'):
+        """Call Gemini API with the given prompt ("chat", "summary" or "onboarding" priority)"""
+        return gemini_client.generate(prompt, priority)
+
+    # Health check endpoint
+    @app.route('/api/health')
+    def health_check():
+        gemini = gemini_client.health()
+        return jsonify({
+            'status': 'degraded' if gemini['circuit']['state'] != 'closed' else 'healthy',
+            'message': 'Soupie API is running',
+            'gemini': gemini
+        })
 
     # Routes
     @app.route('/')
@@ -83,7 +80,7 @@ try:
     @jwt_required
     def test_auth():
         user_id = get_current_user_id()
-        user = db.get_user_by_id(user_id)
+        user = current_unit().get_user(user_id)
         return jsonify({
             'user_id': user_id,
             'onboarding_done': user.get('onboarding_done', False) if user else None,
@@ -103,14 +100,13 @@ try:
             # Validation
             if not first_name or not last_name or not password:
                 return jsonify({'error': 'Missing required fields'}), 400
-            image.png
             if not email and not phone:
                 return jsonify({'error': 'Either email or phone is required'}), 400
             
             # Check if user already exists
             existing_user = None
             if email:
-                existing_user = db.get_user_by_email(email)
+                existing_user = current_unit().get_user_by_email(email)
             elif phone:
                 users = db._read_table("user_registration")
                 for user in users:
@@ -161,7 +157,7 @@ try:
                 return jsonify({'error': 'Email and password are required'}), 400
             
             # Find user by email
-            user = db.get_user_by_email(email)
+            user = current_unit().get_user_by_email(email)
             
             if not user or not verify_password(password, user.get('password_hash')):
                 return jsonify({'error': 'Invalid credentials'}), 401
@@ -214,96 +210,12 @@ try:
             print(f"Processing onboarding for user: {user_id}")
             
             # Create comprehensive onboarding record
-            onboarding_record = {
-                'user_id': user_id,
-                'onboarding_level': onboarding_level,
-                'tier_1_demographics': {
-                    'employment_status': onboarding_data.get('employment_status'),
-                    'living_situation': onboarding_data.get('living_situation'),
-                    'therapy_history': {
-                        'previous_therapy': onboarding_data.get('therapy_history'),
-                        'therapy_type': onboarding_data.get('medication')
-                    }
-                },
-                'tier_2_emotional_state': {
-                    'primary_affect': onboarding_data.get('primary_affect'),
-                    'emotion_description': onboarding_data.get('primary_affect_custom'),
-                    'affect_confidence': onboarding_data.get('affect_duration'),
-                    'emotion_intensity': 'medium',  # Default
-                    'mood_trend_start': onboarding_data.get('morning_mood')
-                },
-                'tier_3_cognitive_themes': {
-                    'belief_safety_negative': {
-                        'present': onboarding_data.get('belief_safety') in ['sometimes', 'rarely'],
-                        'confidence': 'medium'
-                    },
-                    'belief_trust_negative': {
-                        'present': onboarding_data.get('belief_trust') in ['depends', 'not_really'],
-                        'confidence': 'medium'
-                    },
-                    'belief_control_low': {
-                        'present': onboarding_data.get('belief_control') in ['sometimes', 'not_much'],
-                        'confidence': 'medium'
-                    },
-                    'belief_self_low': {
-                        'present': onboarding_data.get('belief_self') in ['depends', 'very_critical'],
-                        'confidence': 'medium'
-                    },
-                    'belief_intimacy_low': {
-                        'present': onboarding_data.get('belief_intimacy') in ['a_bit_hard', 'very_difficult'],
-                        'confidence': 'medium'
-                    }
-                },
-                'tier_4_functional_impact': {
-                    'sleep_quality': onboarding_data.get('sleep_quality'),
-                    'energy_level': onboarding_data.get('energy_level'),
-                    'focus_level': onboarding_data.get('focus_level'),
-                    'social_withdrawal': onboarding_data.get('social_withdrawal'),
-                    'appetite_change': onboarding_data.get('appetite_change')
-                },
-                'tier_5_risk_and_protective_factors': {
-                    'protective_factors': {
-                        'social_support': onboarding_data.get('social_support'),
-                        'coping_skills': onboarding_data.get('coping_skills', []),
-                        'purposeful_activities': onboarding_data.get('purposeful_activities')
-                    },
-                    'risk_factors': {
-                        'recent_trauma': onboarding_data.get('recent_trauma') == 'yes',
-                        'suicidal_thoughts': onboarding_data.get('suicidal_thoughts') in ['yes_briefly', 'yes_often']
-                    }
-                },
-                'tier_7_ai_summary_card': {
-                    'personalization_goal': onboarding_data.get('personalization_goal')
-                },
-                'tier_8_temporal_tracking': {
-                    'mood_trend_start': onboarding_data.get('morning_mood')
-                },
-                'next_module': onboarding_data.get('start_preference', 'just_chat'),
-                'metadata': {
-                    'reviewed_by_clinician': False,
-                    'created_at': datetime.now().isoformat()
-                }
-            }
+            onboarding_record = build_onboarding_record(user_id, onboarding_data, onboarding_level)
             
             # Process onboarding data through scoring engine
             insights = scoring_engine.process_onboarding_data(onboarding_data)
             
-            # Add insights to onboarding record
-            onboarding_record['insights'] = insights
-            
-            # Save onboarding data
-            print("Creating onboarding record...")
-            record_id = db.create_onboarding_record(onboarding_record)
-            print(f"Onboarding record created with ID: {record_id}")
-            
-            # Mark onboarding as done
-            print("Updating user onboarding status...")
-            update_success = db.update_user(user_id, {'onboarding_done': True})
-            print(f"User update successful: {update_success}")
-            
-            # Verify the update
-            user = db.get_user_by_id(user_id)
-            print(f"User onboarding_done status: {user.get('onboarding_done')}")
+            save_onboarding(user_id, onboarding_record, insights)
             
             # Return insights along with success message
             return jsonify({
@@ -315,6 +227,95 @@ try:
             print(f"Onboarding submission error: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
+    def build_onboarding_record(user_id, onboarding_data, onboarding_level):
+        """Map raw onboarding answers onto the tiered onboarding record"""
+        return {
+            'user_id': user_id,
+            'onboarding_level': onboarding_level,
+            'tier_1_demographics': {
+                'employment_status': onboarding_data.get('employment_status'),
+                'living_situation': onboarding_data.get('living_situation'),
+                'therapy_history': {
+                    'previous_therapy': onboarding_data.get('therapy_history'),
+                    'therapy_type': onboarding_data.get('medication')
+                }
+            },
+            'tier_2_emotional_state': {
+                'primary_affect': onboarding_data.get('primary_affect'),
+                'emotion_description': onboarding_data.get('primary_affect_custom'),
+                'affect_confidence': onboarding_data.get('affect_duration'),
+                'emotion_intensity': 'medium',  # Default
+                'mood_trend_start': onboarding_data.get('morning_mood')
+            },
+            'tier_3_cognitive_themes': {
+                'belief_safety_negative': {
+                    'present': onboarding_data.get('belief_safety') in ['sometimes', 'rarely'],
+                    'confidence': 'medium'
+                },
+                'belief_trust_negative': {
+                    'present': onboarding_data.get('belief_trust') in ['depends', 'not_really'],
+                    'confidence': 'medium'
+                },
+                'belief_control_low': {
+                    'present': onboarding_data.get('belief_control') in ['sometimes', 'not_much'],
+                    'confidence': 'medium'
+                },
+                'belief_self_low': {
+                    'present': onboarding_data.get('belief_self') in ['depends', 'very_critical'],
+                    'confidence': 'medium'
+                },
+                'belief_intimacy_low': {
+                    'present': onboarding_data.get('belief_intimacy') in ['a_bit_hard', 'very_difficult'],
+                    'confidence': 'medium'
+                }
+            },
+            'tier_4_functional_impact': {
+                'sleep_quality': onboarding_data.get('sleep_quality'),
+                'energy_level': onboarding_data.get('energy_level'),
+                'focus_level': onboarding_data.get('focus_level'),
+                'social_withdrawal': onboarding_data.get('social_withdrawal'),
+                'appetite_change': onboarding_data.get('appetite_change')
+            },
+            'tier_5_risk_and_protective_factors': {
+                'protective_factors': {
+                    'social_support': onboarding_data.get('social_support'),
+                    'coping_skills': onboarding_data.get('coping_skills', []),
+                    'purposeful_activities': onboarding_data.get('purposeful_activities')
+                },
+                'risk_factors': {
+                    'recent_trauma': onboarding_data.get('recent_trauma') == 'yes',
+                    'suicidal_thoughts': onboarding_data.get('suicidal_thoughts') in ['yes_briefly', 'yes_often']
+                }
+            },
+            'tier_7_ai_summary_card': {
+                'personalization_goal': onboarding_data.get('personalization_goal')
+            },
+            'tier_8_temporal_tracking': {
+                'mood_trend_start': onboarding_data.get('morning_mood')
+            },
+            'next_module': onboarding_data.get('start_preference', 'just_chat'),
+            'metadata': {
+                'reviewed_by_clinician': False,
+                'created_at': datetime.now().isoformat()
+            }
+        }
+
+    def save_onboarding(user_id, onboarding_record, insights):
+        """Store the onboarding record with its insights and mark onboarding done"""
+        # Add insights to onboarding record
+        onboarding_record['insights'] = insights
+        
+        # Save onboarding data
+        print("Creating onboarding record...")
+        record_id = db.create_onboarding_record(onboarding_record)
+        print(f"Onboarding record created with ID: {record_id}")
+        
+        # Mark onboarding as done
+        print("Updating user onboarding status...")
+        update_success = current_unit().update_user(user_id, {'onboarding_done': True})
+        print(f"User update successful: {update_success}")
+        current_unit().forget_onboarding_record(user_id)
+
     @app.route('/api/journal/private', methods=['POST'])
     @jwt_required
     def create_private_journal():
@@ -348,15 +349,14 @@ try:
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 10, type=int)
             
-            all_journals = db.get_user_private_journals(user_id)
-            
-            # Sort by created_at descending
-            all_journals.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-            
-            # Simple pagination
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
-            journals_page = all_journals[start_idx:end_idx]
+            # Newest-first page from the ordered index (cursor or page number)
+            feed = paginate(
+                db.get_user_private_journal_index(user_id),
+                page=page,
+                per_page=per_page,
+                after=request.args.get('after'),
+                before=request.args.get('before')
+            )
             
             return jsonify({
                 'journals': [{
@@ -364,10 +364,41 @@ try:
                     'content': journal.get('content'),
                     'ai_summary': journal.get('ai_summary'),
                     'created_at': journal.get('created_at')
-                } for journal in journals_page],
-                'total': len(all_journals),
-                'pages': (len(all_journals) + per_page - 1) // per_page,
-                'current_page': page
+                } for journal in feed['records']],
+                'total': feed['total'],
+                'pages': (feed['total'] + per_page - 1) // per_page,
+                'current_page': page,
+                'next_cursor': feed['next_cursor'],
+                'prev_cursor': feed['prev_cursor']
+            })
+            
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/journal/private/search', methods=['GET'])
+    @jwt_required
+    def search_private_journals():
+        try:
+            user_id = get_current_user_id()
+            query = request.args.get('q', '').strip()
+            limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+            offset = max(request.args.get('offset', 0, type=int), 0)
+            if not query:
+                return jsonify({'error': 'Search query is required'}), 400
+            
+            # Ranked matches from the user's in-memory inverted index
+            with metrics.span('journal_search'):
+                found = db.journal_search.search(user_id, query, limit=limit, offset=offset)
+            
+            return jsonify({
+                'query': query,
+                'total': found['total'],
+                'total_exact': found['total_exact'],
+                'results': found['results'],
+                'limit': limit,
+                'offset': offset
             })
             
         except Exception as e:
@@ -386,49 +417,12 @@ try:
             
             # Generate "What Soupie thinks" - personal analysis with actionable steps
             journal_content = journal.get('content')
-            emotional_analysis = analyze_journal_emotions(journal_content)
-            
-            prompt = f"""You are Soupie, an emotionally intelligent AI companion. Analyze this journal entry and provide your personal thoughts in this exact format:
-
-Journal entry: "{journal_content}"
-
-Respond in this structure:
-
-**[Title: Create a descriptive, empathetic title that captures the essence of their day/experience]**
-
-[Paragraph 1: Describe their day/experience with empathy and understanding. Focus on what they accomplished, felt, or went through. Be specific about their activities, emotions, and experiences. Use "You" to address them directly.]
-
-[Paragraph 2: Offer interpretation and encouragement. Analyze their emotional state, patterns, or growth. Provide gentle insights about their behavior, feelings, or situation. Frame their experiences positively and offer supportive guidance.]
-
-**Key Insight:** [One clear, actionable principle or takeaway that they can apply to their life]
-
-Guidelines:
-- Be warm, empathetic, and supportive like a caring friend
-- Use "You" to address them directly
-- Focus on understanding and validating their experience
-- Be non-judgmental and encouraging
-- Make the title descriptive and emotionally resonant
-- Keep paragraphs substantial but readable
-- End with a clear, actionable insight they can use
-
-Example format:
-**Whirlwind of Productivity and Exploration**
-
-You had a day filled with a dynamic mix of productivity and digital exploration, seamlessly balancing your academic responsibilities with creative and technical pursuits. From diving into nursing notes to crafting event ideas and exploring AI tools, you managed to keep your curiosity alive while ticking off tasks and finding satisfaction in your achievements.
-
-Your ability to juggle various interests and tasks, from academic to creative, shows a strong adaptability and enthusiasm for learning. Embrace the productive chaos and continue to harness your digital tools and platforms to fuel your curiosity and creativity, as they seem to be valuable allies in your journey.
-
-**Key Insight:** Balancing diverse interests and tasks fuels both productivity and satisfaction."""
+            prompt = build_journal_summary_prompt(journal_content)
             
             # Try to get AI response with better error handling
-            summary = call_gemini(prompt)
-            
-            # If AI service fails, provide a fallback response
-            if not summary or "error" in summary.lower() or "503" in summary or "unavailable" in summary.lower():
-                summary = generate_fallback_soupie_response(journal_content, emotional_analysis)
+            summary = call_gemini(prompt, priority='summary')
             
-            # Update the journal entry with the summary
-            db.update_private_journal(journal_id, {'ai_summary': summary})
+            summary = save_journal_summary(journal, summary)
             
             return jsonify({
                 'message': 'Summary generated successfully',
@@ -438,6 +432,17 @@ Your ability to juggle various interests and tasks, from academic to creative, s
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+    def save_journal_summary(journal, summary):
+        """Store a journal summary, substituting the fallback if the AI call failed"""
+        # If AI service fails, provide a fallback response from the emotions stored at ingest
+        if is_service_error(summary) or "503" in summary or "unavailable" in summary.lower():
+            emotional_analysis = mask_emotions(record_analysis(journal)['emotion_mask'])
+            summary = generate_fallback_soupie_response(journal.get('content'), emotional_analysis)
+        
+        # Update the journal entry with the summary
+        db.update_private_journal(journal['id'], {'ai_summary': summary})
+        return summary
+
     @app.route('/api/journal/open', methods=['POST'])
     @jwt_required
     def create_open_journal():
@@ -448,6 +453,8 @@ Your ability to juggle various interests and tasks, from academic to creative, s
             
             if not content:
                 return jsonify({'error': 'Content is required'}), 400
+            if emotion_tag is not None and not isinstance(emotion_tag, str):
+                return jsonify({'error': 'emotion_tag must be a string'}), 400
             
             user_id = get_current_user_id()
             
@@ -457,6 +464,11 @@ Your ability to juggle various interests and tasks, from academic to creative, s
                 emotion_tag=emotion_tag
             )
             
+            # Push the new post to live feed readers
+            entry = db.get_open_journal_by_id(entry_id)
+            if entry:
+                open_journal_hub.publish(serialize_open_journal(entry))
+            
             return jsonify({
                 'message': 'Open journal entry created successfully',
                 'entry_id': entry_id
@@ -466,36 +478,190 @@ Your ability to juggle various interests and tasks, from academic to creative, s
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/journal/open', methods=['GET'])
+    @conditional('open_journal', per_user=False)
     def get_open_journals():
         try:
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 20, type=int)
+            emotion_tags = request.args.getlist('emotion_tag')
+            
+            # Newest-first page from the ordered index (cursor or page number),
+            # merged across the per-tag indexes when filtering by emotion
+            feed = paginate(
+                db.get_open_journal_tag_index(emotion_tags) if emotion_tags else db.get_open_journal_index(),
+                page=page,
+                per_page=per_page,
+                after=request.args.get('after'),
+                before=request.args.get('before')
+            )
             
-            all_journals = db.get_all_open_journals()
+            return jsonify({
+                'journals': [serialize_open_journal(journal) for journal in feed['records']],
+                'total': feed['total'],
+                'pages': (feed['total'] + per_page - 1) // per_page,
+                'current_page': page,
+                'next_cursor': feed['next_cursor'],
+                'prev_cursor': feed['prev_cursor']
+            })
             
-            # Sort by created_at descending
-            all_journals.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/journal/open/facets', methods=['GET'])
+    @conditional('open_journal', per_user=False)
+    def get_open_journal_facets():
+        try:
+            counts = db.get_open_journal_tag_counts()
+            return jsonify({
+                'emotion_tags': [{'emotion_tag': tag, 'count': count}
+                                 for tag, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))],
+                'total': len(db.get_open_journal_index())
+            })
             
-            # Simple pagination
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
-            journals_page = all_journals[start_idx:end_idx]
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/journal/emotions/trend', methods=['GET'])
+    @jwt_required
+    @conditional('private_journal', 'open_journal')
+    def get_journal_emotion_trend():
+        """Emotions across the user's journal entries (?from=&to=, default last 30 days; ?scope=all|private|open; ?bucket=day|week)"""
+        try:
+            user_id = get_current_user_id()
+            from datetime import date, timedelta
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+            start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=29)
+            scope = request.args.get('scope', 'all')
+            bucket = request.args.get('bucket', 'day')
+            if start > end:
+                return jsonify({'error': '"from" must not be after "to"'}), 400
+            if scope not in ('all', 'private', 'open') or bucket not in ('day', 'week'):
+                return jsonify({'error': 'scope must be all, private or open and bucket day or week'}), 400
+            
+            # Walk the user's feed indexes newest first, aggregating the masks stored at ingest
+            index = {
+                'all': db.get_user_journal_index,
+                'private': db.get_user_private_journal_index,
+                'open': db.get_user_open_journal_index
+            }[scope](user_id)
+            trend = emotion_trend((record for _, record in index.iter_older()), start, end, bucket)
+            
+            totals = {emotion: 0 for emotion in EMOTIONS}
+            for point in trend:
+                for emotion, count in point['emotions'].items():
+                    totals[emotion] += count
             
             return jsonify({
-                'journals': [{
-                    'id': journal.get('id'),
-                    'content': journal.get('content'),
-                    'emotion_tag': journal.get('emotion_tag'),
-                    'created_at': journal.get('created_at')
-                } for journal in journals_page],
-                'total': len(all_journals),
-                'pages': (len(all_journals) + per_page - 1) // per_page,
-                'current_page': page
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'scope': scope,
+                'bucket': bucket,
+                'trend': trend,
+                'totals': totals,
+                'entries': sum(point['entries'] for point in trend)
             })
             
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+    def serialize_open_journal(journal):
+        """Public fields of an open journal entry, as shown in the community feed"""
+        return {
+            'id': journal.get('id'),
+            'content': journal.get('content'),
+            'emotion_tag': journal.get('emotion_tag'),
+            'created_at': journal.get('created_at'),
+            'reactions': reaction_counter.counts(journal)
+        }
+
+    def publish_logged_open_journals(entries):
+        """Push posts created on other workers, replayed from the change log, to this worker's feed readers"""
+        for entry in entries:
+            if entry['op'] == 'insert':
+                open_journal_hub.publish(serialize_open_journal(entry['record']))
+
+    db.add_change_listener('open_journal', publish_logged_open_journals)
+
+    @app.route('/api/journal/open/<journal_id>/react', methods=['POST'])
+    @jwt_required
+    def react_to_open_journal(journal_id):
+        try:
+            data = request.get_json() or {}
+            reaction_type = data.get('reaction_type')
+            
+            if not reaction_type:
+                return jsonify({'error': 'Reaction type is required'}), 400
+            if reaction_type not in REACTION_TYPES:
+                return jsonify({'error': 'Invalid reaction type'}), 400
+            
+            journal = db.get_open_journal_by_id(journal_id)
+            if not journal:
+                return jsonify({'error': 'Journal entry not found'}), 404
+            
+            # Buffered, per-user idempotent increment
+            added = reaction_counter.add(journal_id, get_current_user_id(), reaction_type)
+            
+            return jsonify({
+                'message': 'Reaction added successfully' if added else 'Reaction already recorded',
+                'added': added,
+                'reactions': reaction_counter.counts(journal)
+            })
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/journal/open/<journal_id>/flag', methods=['POST'])
+    @jwt_required
+    def flag_open_journal(journal_id):
+        try:
+            if not db.get_open_journal_by_id(journal_id):
+                return jsonify({'error': 'Journal entry not found'}), 404
+            
+            reaction_counter.add(journal_id, get_current_user_id(), FLAG)
+            
+            return jsonify({'message': 'Post flagged for moderation'})
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/journal/open/stream', methods=['GET'])
+    def stream_open_journals():
+        """Server-Sent Events feed of new open journal posts.
+
+        Readers wait on the in-process hub rather than polling storage; each
+        open stream holds a server thread, so many idle readers need a
+        threaded or green-thread server (asgi.py serves this feed on its
+        event loop instead). One follower thread per process catches up on
+        the change log so posts from other workers arrive too.
+        """
+        open_journal_hub.follow(lambda: db.get_index('open_journal'))
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        missed, sequence, gap = open_journal_hub.replay(last_event_id)
+        
+        def event_stream():
+            current = sequence
+            yield "retry: 3000\n\n"
+            if gap:
+                # Too far behind the ring buffer: the client should reload the feed
+                yield "event: reset\ndata: {}\n\n"
+            events = missed
+            while True:
+                for event_id, data in events:
+                    yield sse_event('journal', data, event_id)
+                events, current = open_journal_hub.wait(current, timeout=15)
+                if not events:
+                    yield ": keep-alive\n\n"
+        
+        response = Response(event_stream(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    @metrics.timed('journal_streak')
     def calculate_journal_streak(journal_entries):
         """Calculate consecutive days of journaling streak"""
         if not journal_entries:
@@ -533,12 +699,13 @@ Your ability to juggle various interests and tasks, from academic to creative, s
     # Dashboard endpoint
     @app.route('/api/dashboard', methods=['GET'])
     @jwt_required
+    @conditional('user_registration', 'private_journal', 'open_journal', 'mood_records')
     def get_dashboard():
         try:
             user_id = get_current_user_id()
             
             # Get user info
-            user = db.get_user_by_id(user_id)
+            user = current_unit().get_user(user_id)
             if not user:
                 return jsonify({'error': 'User not found'}), 404
             
@@ -598,7 +765,7 @@ Your ability to juggle various interests and tasks, from academic to creative, s
     def get_profile():
         try:
             user_id = get_current_user_id()
-            user = db.get_user_by_id(user_id)
+            user = current_unit().get_user(user_id)
             
             if not user:
                 return jsonify({'error': 'User not found'}), 404
@@ -638,7 +805,7 @@ Your ability to juggle various interests and tasks, from academic to creative, s
             
             # Check if email is being changed and if it's already taken
             if data.get('email'):
-                existing_user = db.get_user_by_email(data['email'])
+                existing_user = current_unit().get_user_by_email(data['email'])
                 if existing_user and existing_user.get('id') != user_id:
                     return jsonify({'error': 'Email already in use'}), 409
             
@@ -650,7 +817,7 @@ Your ability to juggle various interests and tasks, from academic to creative, s
                 'phone': data.get('phone', '')
             }
             
-            db.update_user(user_id, update_data)
+            current_unit().update_user(user_id, update_data)
             
             return jsonify({'message': 'Profile updated successfully'})
             
@@ -673,7 +840,7 @@ Your ability to juggle various interests and tasks, from academic to creative, s
                 'email_notifications': data.get('email_notifications', True)
             }
             
-            db.update_user(user_id, preferences_data)
+            current_unit().update_user(user_id, preferences_data)
             
             return jsonify({'message': 'Preferences updated successfully'})
             
@@ -694,13 +861,13 @@ Your ability to juggle various interests and tasks, from academic to creative, s
                 return jsonify({'error': 'Current password and new password are required'}), 400
             
             # Get user and verify current password
-            user = db.get_user_by_id(user_id)
+            user = current_unit().get_user(user_id)
             if not user or not verify_password(current_password, user.get('password_hash')):
                 return jsonify({'error': 'Current password is incorrect'}), 401
             
             # Update password
             hashed_password = hash_password(new_password)
-            db.update_user(user_id, {'password_hash': hashed_password})
+            current_unit().update_user(user_id, {'password_hash': hashed_password})
             
             return jsonify({'message': 'Password changed successfully'})
             
@@ -712,30 +879,29 @@ Your ability to juggle various interests and tasks, from academic to creative, s
     def export_data():
         try:
             user_id = get_current_user_id()
+            export_format = request.args.get('format', 'json')
             
-            # Get all user data
-            user = db.get_user_by_id(user_id)
-            private_journals = db.get_user_private_journals(user_id)
-            open_journals = db.get_user_open_journals(user_id)
-            question_answers = db.get_user_question_answers(user_id)
-            
-            export_data = {
-                'export_date': datetime.now().isoformat(),
-                'user_info': {
-                    'first_name': user.get('first_name'),
-                    'last_name': user.get('last_name'),
-                    'email': user.get('email'),
-                    'created_at': user.get('created_at')
-                },
-                'private_journals': private_journals,
-                'open_journals': open_journals,
-                'question_answers': question_answers
-            }
+            if export_format not in EXPORT_FORMATS:
+                return jsonify({'error': 'Unsupported export format'}), 400
+            
+            user = current_unit().get_user(user_id)
+            if not user:
+                return jsonify({'error': 'User not found'}), 404
+            
+            # Stream the export table by table instead of building it in memory
+            content_type, filename = EXPORT_FORMATS[export_format]
+            chunks = iter_export(db, user_id, user, export_format)
+            
+            # ZIP output is already compressed; gzip the text formats when accepted
+            use_gzip = export_format != 'zip' and 'gzip' in request.accept_encodings
+            if use_gzip:
+                chunks = gzip_stream(chunks)
             
-            # Create JSON response
-            response = make_response(jsonify(export_data))
-            response.headers['Content-Disposition'] = 'attachment; filename=soupie-data-export.json'
-            response.headers['Content-Type'] = 'application/json'
+            response = Response(chunks, content_type=content_type)
+            response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+            response.headers['Vary'] = 'Accept-Encoding'
+            if use_gzip:
+                response.headers['Content-Encoding'] = 'gzip'
             
             return response
             
@@ -750,6 +916,9 @@ Your ability to juggle various interests and tasks, from academic to creative, s
             
             # Delete all user data
             db.delete_user(user_id)
+            insights_store.delete_user(user_id)
+            chat_sessions.delete_user(user_id)
+            crisis_followups.delete_user(user_id)
             
             # Clear JWT token
             response = make_response(jsonify({'message': 'Account deleted successfully'}))
@@ -763,12 +932,13 @@ Your ability to juggle various interests and tasks, from academic to creative, s
     # Profile insights endpoints
     @app.route('/api/profile/insights', methods=['GET'])
     @jwt_required
+    @conditional('onboarding_records')
     def get_profile_insights():
         try:
             user_id = get_current_user_id()
             
             # Get user's onboarding record
-            onboarding_record = db.get_user_onboarding_record(user_id)
+            onboarding_record = current_unit().get_onboarding_record(user_id)
             
             if not onboarding_record:
                 return jsonify({'error': 'No onboarding data found'}), 404
@@ -784,6 +954,31 @@ Your ability to juggle various interests and tasks, from academic to creative, s
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/insights/sessions', methods=['GET'])
+    @jwt_required
+    def get_session_insights():
+        """Chat session insights for a date range (?from=YYYY-MM-DD&to=YYYY-MM-DD, default last 30 days)"""
+        try:
+            user_id = get_current_user_id()
+            from datetime import date, timedelta
+            end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+            start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=29)
+            if start > end:
+                return jsonify({'error': '"from" must not be after "to"'}), 400
+            
+            sessions = insights_store.query(user_id, start, end)
+            return jsonify({
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'sessions': sessions,
+                'daily': daily_trend(sessions)
+            })
+            
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
     @app.route('/api/profile/score', methods=['POST'])
     @jwt_required
     def recalculate_profile_score():
@@ -791,7 +986,7 @@ Your ability to juggle various interests and tasks, from academic to creative, s
             user_id = get_current_user_id()
             
             # Get user's onboarding record
-            onboarding_record = db.get_user_onboarding_record(user_id)
+            onboarding_record = current_unit().get_onboarding_record(user_id)
             
             if not onboarding_record:
                 return jsonify({'error': 'No onboarding data found'}), 404
@@ -819,12 +1014,13 @@ Your ability to juggle various interests and tasks, from academic to creative, s
             onboarding_record['updated_at'] = datetime.now().isoformat()
             
             # Save updated record
-            records = db._read_table("onboarding_records")
-            for i, record in enumerate(records):
-                if record.get('user_id') == user_id:
-                    records[i] = onboarding_record
-                    break
-            db._write_table("onboarding_records", records)
+            with db.table_lock("onboarding_records"):
+                records = db._read_table("onboarding_records")
+                for i, record in enumerate(records):
+                    if record.get('user_id') == user_id:
+                        records[i] = onboarding_record
+                        break
+                db._write_table("onboarding_records", records, user_id=user_id)
             
             return jsonify({
                 'message': 'Profile score recalculated successfully',
@@ -856,12 +1052,7 @@ Your ability to juggle various interests and tasks, from academic to creative, s
             
             return jsonify({
                 'message': 'Emergency resources have been activated',
-                'resources': {
-                    'crisis_hotline': '988',
-                    'crisis_text': 'Text HOME to 741741',
-                    'emergency_services': '911',
-                    'immediate_support': 'You are not alone. Help is available 24/7.'
-                }
+                'resources': HELPLINE_RESOURCES
             })
             
         except Exception as e:
@@ -881,7 +1072,7 @@ Your ability to juggle various interests and tasks, from academic to creative, s
     def onboarding_page():
         try:
             user_id = get_current_user_id()
-            user = db.get_user_by_id(user_id)
+            user = current_unit().get_user(user_id)
             if not user:
                 return redirect('/login')
             
@@ -900,7 +1091,7 @@ Your ability to juggle various interests and tasks, from academic to creative, s
         try:
             user_id = get_current_user_id()
             print(f"Dashboard access - User ID: {user_id}")
-            user = db.get_user_by_id(user_id)
+            user = current_unit().get_user(user_id)
             if not user:
                 print("Dashboard - User not found, redirecting to login")
                 return redirect('/login')
@@ -917,7 +1108,7 @@ Your ability to juggle various interests and tasks, from academic to creative, s
     def private_journal_page():
         try:
             user_id = get_current_user_id()
-            user = db.get_user_by_id(user_id)
+            user = current_unit().get_user(user_id)
             return render_template('private-journal.html', user_first_name=user.get('first_name', 'User'))
         except Exception:
             return redirect('/login')
@@ -927,7 +1118,7 @@ Your ability to juggle various interests and tasks, from academic to creative, s
     def open_journal_page():
         try:
             user_id = get_current_user_id()
-            user = db.get_user_by_id(user_id)
+            user = current_unit().get_user(user_id)
             return render_template('open-journal.html', user_first_name=user.get('first_name', 'User'))
         except Exception:
             return redirect('/login')
@@ -937,7 +1128,7 @@ Your ability to juggle various interests and tasks, from academic to creative, s
     def profile_page():
         try:
             user_id = get_current_user_id()
-            user = db.get_user_by_id(user_id)
+            user = current_unit().get_user(user_id)
             return render_template('profile.html', user_first_name=user.get('first_name', 'User'))
         except Exception:
             return redirect('/login')
@@ -949,74 +1140,191 @@ Your ability to juggle various interests and tasks, from academic to creative, s
         try:
             data = request.get_json()
             message = data.get('message', '').strip()
-            chat_history = data.get('chat_history', [])
             
             if not message:
                 return jsonify({'error': 'Message is required'}), 400
             
-            # Get user context
-            user_id = get_current_user_id()
-            user_context = get_user_context(user_id)
-            
-            # Get user's emotional state and risk profile
-            user_emotional_state = get_user_emotional_state(user_context)
-            emergency_mode = detect_emergency_indicators(user_context, chat_history)
-            
-            # Create improved system prompt with context awareness
-            system_prompt = create_ai_system_prompt(user_context, chat_history)
+            # Helplines first: the model reply is generated afterwards, for GET /api/chat/followup/<id>
+            if is_crisis_message(message):
+                return jsonify(start_crisis_reply(get_current_user_id(), message, data.get('session_id'),
+                                                  data.get('chat_history')))
             
-            # Combine system prompt with user message and context
-            full_prompt = f"{system_prompt}\n\nUser message: {message}"
+            turn = prepare_chat_turn(get_current_user_id(), message, data.get('session_id'), data.get('chat_history'))
             
             # Get AI response with fallback
-            ai_response = call_gemini(full_prompt)
+            ai_response = call_gemini(turn['prompt'])
             
-            # Check if AI response is valid, otherwise use fallback
-            if not ai_response or ai_response in ["AI service not configured", "AI service error"]:
-                ai_response = get_fallback_response(message, user_context, user_emotional_state, emergency_mode)
+            return jsonify(complete_chat_turn(turn, ai_response))
             
-            # Analyze message for feature suggestions
-            suggested_features = analyze_message_for_features(message, user_context)
-            
-            # Generate session insights for logging
-            session_insights = generate_session_insights(message, ai_response, user_emotional_state, emergency_mode)
-            
-            # Log session insights (in production, this would go to a database)
-            log_session_insights(user_id, session_insights)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/chat/stream', methods=['POST'])
+    @jwt_required
+    def stream_chat_with_ai():
+        """Chat with the reply relayed as Server-Sent Events while Gemini generates it.
+
+        Emits `token` events with partial text, then one `done` event carrying
+        the same body as /api/chat plus time-to-first-token and total timings.
+        A message matching the crisis matcher first gets a `crisis` event with
+        helpline resources, sent before any storage or model work.
+        """
+        try:
+            data = request.get_json()
+            message = data.get('message', '').strip()
             
-            return jsonify({
-                'response': ai_response,
-                'suggested_features': suggested_features,
-                'session_insights': session_insights
-            })
+            if not message:
+                return jsonify({'error': 'Message is required'}), 400
             
+            started = time.perf_counter()
+            user_id = get_current_user_id()
+            crisis_session = None
+            if is_crisis_message(message):
+                crisis_session = chat_sessions.resume(user_id, data.get('session_id'), data.get('chat_history'))
+                turn = None
+            else:
+                turn = prepare_chat_turn(user_id, message, data.get('session_id'), data.get('chat_history'))
         except Exception as e:
             return jsonify({'error': str(e)}), 500
+        
+        def event_stream():
+            nonlocal turn
+            if crisis_session is not None:
+                yield sse_event('crisis', crisis_reply(crisis_session.id))
+                metrics.observe('soupie_crisis_response_seconds', time.perf_counter() - started)
+                turn = prepare_chat_turn(user_id, message, crisis_session.id)
+            chunks = []
+            first_token_at = None
+            try:
+                for text in gemini_client.stream(turn['prompt']):
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    chunks.append(text)
+                    yield sse_event('token', {'text': text})
+            except GeminiStreamError as e:
+                print(f"Chat stream error: {e}")
+            yield sse_event('done', finish_chat_stream(turn, chunks, started, first_token_at))
+        
+        response = Response(stream_with_context(event_stream()), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    def start_crisis_reply(user_id, message, session_id=None, chat_history=None):
+        """Immediate helpline response for a crisis message; the model reply is generated in the background"""
+        started = time.perf_counter()
+        session = chat_sessions.resume(user_id, session_id, chat_history)
+        followup_id = crisis_followups.start(user_id, crisis_followup, user_id, message, session.id)
+        metrics.observe('soupie_crisis_response_seconds', time.perf_counter() - started)
+        return crisis_reply(session.id, followup_id)
+
+    def crisis_followup(user_id, message, session_id):
+        """The full chat turn for a crisis message, run after its helpline response was sent"""
+        turn = prepare_chat_turn(user_id, message, session_id)
+        return complete_chat_turn(turn, call_gemini(turn['prompt']))
+
+    # Model reply for a crisis message answered by the fast path; ?wait=N (max 25) long-polls for it
+    @app.route('/api/chat/followup/<followup_id>', methods=['GET'])
+    @jwt_required
+    def get_crisis_followup(followup_id):
+        try:
+            wait = min(max(float(request.args.get('wait', 0)), 0), 25)
+        except ValueError:
+            return jsonify({'error': 'wait must be a number of seconds'}), 400
+        status, body = crisis_followups.result(followup_id, get_current_user_id(), wait)
+        if status == 'unknown':
+            return jsonify({'error': 'Follow-up not found'}), 404
+        if status == 'pending':
+            return jsonify({'status': 'pending'}), 202
+        return jsonify(body)
+
+    def sse_event(event, data, event_id=None):
+        prefix = f"id: {event_id}\n" if event_id else ""
+        return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def finish_chat_stream(turn, chunks, started, first_token_at):
+        """Run the post-reply chat steps once a stream ends and build the `done` payload"""
+        # Nothing streamed (or the service failed up front): complete_chat_turn falls back
+        result = complete_chat_turn(turn, ''.join(chunks) or None)
+        finished = time.perf_counter()
+        if first_token_at:
+            metrics.observe('soupie_chat_ttft_seconds', first_token_at - started)
+        result['timing'] = {
+            'ttft_ms': round((first_token_at - started) * 1000, 1) if first_token_at else None,
+            'total_ms': round((finished - started) * 1000, 1)
+        }
+        return result
+
+    def prepare_chat_turn(user_id, message, session_id=None, chat_history=None):
+        """Gather context and build the model prompt for one chat turn
+
+        Recent turns come from the server-side chat session; chat_history is
+        only used to seed a new session for clients that still send it.
+        """
+        session = chat_sessions.resume(user_id, session_id, chat_history)
+        chat_history = session.history()
+        
+        # Get user context
+        user_context = get_user_context(user_id)
+        
+        # Get user's emotional state and risk profile
+        user_emotional_state = get_user_emotional_state(user_context)
+        emergency_mode = detect_emergency_indicators(user_context, chat_history, message)
+        
+        # Assemble the prompt from the precompiled segments, reusing the state computed above
+        return {
+            'user_id': user_id,
+            'session': session,
+            'message': message,
+            'user_context': user_context,
+            'emotional_state': user_emotional_state,
+            'emergency_mode': emergency_mode,
+            'prompt': build_chat_prompt(message, user_context, chat_history, user_emotional_state, emergency_mode,
+                                        history_summary=session.summary(CHAT_HISTORY_TURNS))
+        }
+
+    def complete_chat_turn(turn, ai_response):
+        """Apply fallbacks to the model reply and build the chat response body"""
+        message = turn['message']
+        user_context = turn['user_context']
+        
+        # Check if AI response is valid, otherwise use fallback
+        if is_service_error(ai_response):
+            ai_response = get_fallback_response(message, user_context, turn['emotional_state'], turn['emergency_mode'])
+        
+        # Analyze message for feature suggestions
+        suggested_features = analyze_message_for_features(message, user_context)
+        
+        # Generate session insights for logging
+        session_insights = generate_session_insights(message, ai_response, turn['emotional_state'], turn['emergency_mode'])
+        
+        # Queue session insights for the background writer
+        insights_store.append(turn['user_id'], session_insights)
+        
+        chat_sessions.record_turn(turn['session'], message, ai_response)
+        
+        return {
+            'session_id': turn['session'].id,
+            'response': ai_response,
+            'suggested_features': suggested_features,
+            'session_insights': session_insights
+        }
 
     def get_user_context(user_id):
         """Get user context for better AI responses"""
         try:
             # Get user's journal entries count
-            private_journals = db._read_table("private_journals")
-            user_private_count = len([j for j in private_journals if j.get('user_id') == user_id])
-            
-            open_journals = db._read_table("open_journals")
-            user_open_count = len([j for j in open_journals if j.get('user_id') == user_id])
+            user_private_count = len(db.get_user_private_journal_index(user_id))
+            user_open_count = len(db.get_user_open_journal_index(user_id))
             
             # Get recent mood if available
             mood_records = db._read_table("mood_records")
             recent_moods = [m for m in mood_records if m.get('user_id') == user_id]
             recent_mood = recent_moods[-1]['mood'] if recent_moods else None
             
-            # Get user insights if available
-            user_insights = None
-            try:
-                insights_response = requests.get(f'http://localhost:5000/api/profile/insights', 
-                                               headers={'Authorization': f'Bearer {request.headers.get("Authorization")}'})
-                if insights_response.status_code == 200:
-                    user_insights = insights_response.json().get('insights')
-            except:
-                pass
+            # Get user insights if available (read directly rather than calling our own API)
+            onboarding_record = current_unit().get_onboarding_record(user_id)
+            user_insights = onboarding_record.get('insights') if onboarding_record else None
             
             return {
                 'private_journal_count': user_private_count,
@@ -1036,47 +1344,6 @@ Your ability to juggle various interests and tasks, from academic to creative, s
                 'is_new_user': True
             }
 
-    def create_ai_system_prompt(user_context, chat_history):
-        """Create a context-aware system prompt for the AI based on the Soupie blueprint"""
-        
-        # Get user's emotional state and risk profile
-        user_emotional_state = get_user_emotional_state(user_context)
-        emergency_mode = detect_emergency_indicators(user_context, chat_history)
-        
-        # Base system role
-        base_prompt = """You are Soupie, an emotionally intelligent AI companion designed to help users reflect on their thoughts, track their emotions, and build psychological resilience — without diagnosing or labeling.
-
-You are inspired by CBT (Cognitive Behavioral Therapy), CPT (Cognitive Processing Therapy), and empathic human conversation.
-
-You act as a guide, not a therapist. Your job is to help users feel understood, not fixed.
-
-CORE PRINCIPLES:
-- Empathy First: Always prioritize emotional validation before offering any reflection or suggestion
-- No Diagnosis: Never use clinical terms like "depression," "anxiety," or "disorder"
-- Emotion-Aware: Detect and respond to tone shifts in mood or intent
-- Human Safety: If user expresses self-harm or hopelessness, respond with empathy first, then provide helpline resources
-- CBT Micro-Coaching: Use short, thought-provoking questions that help users reframe thoughts
-- Progressive Reflection: Gradually deepen conversation based on user comfort level"""
-
-        # Add context-specific guidance based on user state
-        context_guidance = get_context_guidance(user_context, user_emotional_state, emergency_mode)
-        
-        # Add conversation memory context
-        if chat_history:
-            recent_context = "Recent conversation context:\n"
-            for msg in chat_history[-3:]:  # Last 3 messages
-                role = "User" if msg.get('isUser') else "You"
-                recent_context += f"{role}: {msg.get('content', '')}\n"
-            context_guidance += f"\n{recent_context}"
-
-        # Add response guidelines based on user's emotional state
-        response_guidelines = get_response_guidelines(user_emotional_state, emergency_mode)
-        
-        # Add conversation flow guidance
-        conversation_guidance = get_conversation_flow_guidance(chat_history)
-        
-        return f"{base_prompt}\n\n{context_guidance}\n\n{response_guidelines}\n\n{conversation_guidance}"
-
     def get_user_emotional_state(user_context):
         """Analyze user's emotional state based on context"""
         emotional_state = {
@@ -1105,115 +1372,18 @@ CORE PRINCIPLES:
         
         return emotional_state
 
-    def detect_emergency_indicators(user_context, chat_history):
+    def detect_emergency_indicators(user_context, chat_history, message=None):
         """Detect if user is in crisis or needs immediate support"""
-        emergency_indicators = [
-            'suicide', 'kill myself', 'end it all', 'not worth living',
-            'hopeless', 'no point', 'give up', 'can\'t go on',
-            'self harm', 'hurt myself', 'cut myself'
-        ]
+        if has_crisis_indicator(message):
+            return True
         
         # Check recent messages for emergency indicators
         if chat_history:
-            recent_messages = [msg.get('content', '').lower() for msg in chat_history[-5:] if msg.get('isUser')]
-            for message in recent_messages:
-                if any(indicator in message for indicator in emergency_indicators):
-                    return True
+            recent_messages = [msg.get('content', '') for msg in chat_history[-5:] if msg.get('isUser')]
+            return any(has_crisis_indicator(recent) for recent in recent_messages)
         
         return False
 
-    def get_context_guidance(user_context, emotional_state, emergency_mode):
-        """Get context-specific guidance based on user state"""
-        
-        if emergency_mode:
-            return """
-EMERGENCY MODE ACTIVATED:
-- Respond immediately with compassion and safety protocol
-- Use phrases like: "I hear how heavy this feels. You don't have to go through this alone."
-- Offer helpline resources: "Would you like me to share some free and confidential helplines?"
-- Never leave them feeling alone or unsupported
-- Focus on immediate safety and connection"""
-        
-        if user_context['is_new_user']:
-            return """
-NEW USER GUIDANCE:
-- Welcome them warmly and explain your role as a reflection companion
-- Use light, gentle tone initially
-- Explain how journaling can help with emotional processing
-- Suggest starting with simple reflection: "Would you like to explore what's on your mind today?"
-- Be encouraging about beginning their wellness journey"""
-        
-        elif emotional_state['mood'] == 'low':
-            return """
-LOW MOOD DETECTED:
-- Use extra empathy and validation
-- Focus on understanding rather than fixing
-- Ask gentle questions: "What's been weighing on you lately?"
-- Suggest light journaling: "Sometimes writing about difficult feelings can help process them"
-- Avoid pushing for positivity"""
-        
-        elif emotional_state['mood'] == 'anxious':
-            return """
-ANXIOUS STATE DETECTED:
-- Use calming, grounding language
-- Help them slow down and breathe
-- Ask grounding questions: "What's one thing you can see or hear right now?"
-- Suggest gentle reflection: "Would it help to write about what's making you feel anxious?"
-- Focus on present moment awareness"""
-        
-        else:
-            return """
-BALANCED STATE:
-- Use supportive, curious tone
-- Encourage deeper reflection
-- Ask thought-provoking questions
-- Suggest journaling for growth and insight
-- Help them explore patterns and connections"""
-
-    def get_response_guidelines(emotional_state, emergency_mode):
-        """Get response guidelines based on emotional state"""
-        
-        if emergency_mode:
-            return """
-EMERGENCY RESPONSE GUIDELINES:
-1. Lead with empathy: "I hear how heavy this feels"
-2. Provide immediate safety: "You don't have to go through this alone"
-3. Offer resources: "Would you like me to share some helplines?"
-4. Never minimize their feelings
-5. Focus on connection and safety
-6. End with: "I'm really glad you reached out. You're not alone in this." """
-        
-        elif emotional_state['mood'] == 'low':
-            return """
-LOW MOOD RESPONSE GUIDELINES:
-1. Validate their feelings: "That sounds really hard"
-2. Use gentle, understanding tone
-3. Ask open questions: "What's been on your mind lately?"
-4. Suggest gentle reflection: "Sometimes writing about difficult feelings can help"
-5. Avoid pushing for positivity
-6. Continue the conversation naturally - only end with reflection questions when the conversation is actually concluding"""
-        
-        elif emotional_state['mood'] == 'anxious':
-            return """
-ANXIOUS STATE RESPONSE GUIDELINES:
-1. Use calming, grounding language
-2. Help them slow down: "Let's take this one step at a time"
-3. Ask grounding questions: "What's one thing you can focus on right now?"
-4. Suggest gentle reflection: "Would it help to write about what's making you feel anxious?"
-5. Focus on present moment awareness
-6. Continue the conversation naturally - only end with reflection questions when the conversation is actually concluding"""
-        
-        else:
-            return """
-BALANCED STATE RESPONSE GUIDELINES:
-1. Use supportive, curious tone
-2. Ask thought-provoking questions: "What might you tell a friend feeling this way?"
-3. Encourage deeper reflection: "Has this feeling shown up before?"
-4. Only suggest journaling if user explicitly wants to process or reflect: "Would you like to explore this further in your journal?"
-5. Help identify patterns: "It seems this feeling often shows up after..."
-6. Focus on conversation and understanding, not pushing features
-7. Continue the conversation naturally - only end with reflection questions when the conversation is actually concluding"""
-
     def analyze_message_for_features(message, user_context):
         """Analyze user message to suggest appropriate features only when genuinely helpful"""
         message_lower = message.lower()
@@ -1270,41 +1440,6 @@ BALANCED STATE RESPONSE GUIDELINES:
         
         return suggested_features
 
-    def get_conversation_flow_guidance(chat_history):
-        """Provide guidance on conversation flow and when to use ending phrases"""
-        
-        # Check if this seems like a conversation ending
-        is_conversation_ending = False
-        
-        if chat_history:
-            # Look for ending indicators in recent messages
-            recent_messages = [msg.get('content', '').lower() for msg in chat_history[-2:] if msg.get('isUser')]
-            
-            ending_indicators = [
-                'thanks', 'thank you', 'bye', 'goodbye', 'see you', 'talk later',
-                'that\'s all', 'nothing else', 'i\'m done', 'that\'s it',
-                'gotta go', 'have to go', 'need to go', 'time to go'
-            ]
-            
-            if any(indicator in ' '.join(recent_messages) for indicator in ending_indicators):
-                is_conversation_ending = True
-        
-        if is_conversation_ending:
-            return """
-CONVERSATION ENDING DETECTED:
-- Use reflection questions like "Thanks for sharing that with me — how are you feeling now?"
-- Acknowledge the conversation and their openness
-- End on a supportive, warm note
-- Only use these ending phrases when the conversation is actually concluding"""
-        else:
-            return """
-CONVERSATION CONTINUING:
-- Keep responses natural and conversational
-- Ask follow-up questions to continue the dialogue
-- Avoid ending phrases like "Thanks for sharing that with me — how are you feeling now?"
-- Focus on understanding and exploring their thoughts further
-- Only use reflection questions when the conversation is actually ending"""
-
     def get_fallback_response(message, user_context, emotional_state, emergency_mode):
         """Provide sophisticated fallback responses when AI is not available"""
         message_lower = message.lower()
@@ -1393,31 +1528,11 @@ CONVERSATION CONTINUING:
 
     def calculate_energy_shift(message, emotional_state):
         """Calculate the energy shift in the user's message"""
-        message_lower = message.lower()
-        
-        high_energy_words = ['excited', 'energetic', 'motivated', 'pumped', 'thrilled']
-        low_energy_words = ['tired', 'exhausted', 'drained', 'lethargic', 'sluggish']
-        
-        if any(word in message_lower for word in high_energy_words):
-            return '+15%'
-        elif any(word in message_lower for word in low_energy_words):
-            return '-15%'
-        else:
-            return '0%'
+        return {1: '+15%', -1: '-15%'}.get(energy_level(message), '0%')
 
     def determine_reflective_depth(message):
         """Determine the reflective depth of the user's message"""
-        message_lower = message.lower()
-        
-        deep_reflection_words = ['understand', 'realize', 'aware', 'insight', 'pattern', 'meaning']
-        surface_words = ['fine', 'okay', 'good', 'bad', 'tired']
-        
-        if any(word in message_lower for word in deep_reflection_words):
-            return 'deep'
-        elif any(word in message_lower for word in surface_words):
-            return 'light'
-        else:
-            return 'balanced'
+        return reflective_depth(message)
 
     def generate_session_summary(message, ai_response, emotional_state):
         """Generate a summary of the session for logging"""
@@ -1430,37 +1545,6 @@ CONVERSATION CONTINUING:
         else:
             return f"User shared {dominant_emotion} experiences, showing openness to reflection. Provided supportive response and encouraged deeper exploration."
 
-    def log_session_insights(user_id, session_insights):
-        """Log session insights (in production, this would go to a database)"""
-        # For now, just print to console - in production this would be stored in a database
-        print(f"Session insights for user {user_id}: {session_insights}")
-        
-        # In production, you would store this in a database table like:
-        # INSERT INTO session_insights (user_id, timestamp, dominant_emotion, energy_shift, reflective_depth, risk_flag, summary_text)
-        # VALUES (user_id, session_insights['timestamp'], session_insights['dominant_emotion'], ...)
-
-    def analyze_journal_emotions(journal_entry):
-        """Analyze journal entry for emotional patterns and mood indicators"""
-        entry_lower = journal_entry.lower()
-        
-        # Emotional indicators
-        emotions = {
-            'sadness': ['sad', 'depressed', 'down', 'upset', 'hurt', 'crying', 'tears', 'empty', 'numb'],
-            'anxiety': ['anxious', 'worried', 'stressed', 'nervous', 'panic', 'overwhelmed', 'scared'],
-            'anger': ['angry', 'mad', 'frustrated', 'irritated', 'annoyed', 'rage'],
-            'joy': ['happy', 'excited', 'good', 'great', 'wonderful', 'amazing', 'grateful', 'blessed'],
-            'fear': ['scared', 'afraid', 'terrified', 'fearful', 'worried'],
-            'loneliness': ['lonely', 'alone', 'isolated', 'disconnected', 'empty'],
-            'confusion': ['confused', 'lost', 'unclear', 'unsure', 'mixed up']
-        }
-        
-        detected_emotions = []
-        for emotion, keywords in emotions.items():
-            if any(keyword in entry_lower for keyword in keywords):
-                detected_emotions.append(emotion)
-        
-        return detected_emotions
-
     def generate_fallback_soupie_response(journal_content, emotional_analysis):
         """Generate a fallback response when AI service is unavailable"""
         
@@ -1540,9 +1624,10 @@ CONVERSATION CONTINUING:
             }
             
             # Save to database
-            mood_records = db._read_table("mood_records")
-            mood_records.append(mood_record)
-            db._write_table("mood_records", mood_records)
+            with db.table_lock("mood_records"):
+                mood_records = db._read_table("mood_records")
+                mood_records.append(mood_record)
+                db._write_table("mood_records", mood_records, user_id=user_id)
             
             return jsonify({
                 'message': 'Mood tracked successfully',
@@ -1554,6 +1639,7 @@ CONVERSATION CONTINUING:
 
     @app.route('/api/mood/history', methods=['GET'])
     @jwt_required
+    @conditional('mood_records')
     def get_mood_history():
         try:
             user_id = get_current_user_id()
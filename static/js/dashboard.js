@@ -21,6 +21,7 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Chat state
     let chatHistory = [];
+    let chatSessionId = null;
     let moodPopupShown = false;
 
     function showAlert(message, type = 'error') {
@@ -382,6 +383,94 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    function parseServerSentEvent(frame) {
+        let event = 'message';
+        const dataLines = [];
+        frame.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        });
+        return { event, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : null };
+    }
+
+    function crisisMessage(data) {
+        // Helpline resources are shown the moment the server recognises a crisis message
+        const resources = data.resources || {};
+        return `${data.response}<br><br><strong>Call or text ${resources.crisis_hotline}</strong> · ` +
+            `${resources.crisis_text} · Emergency: ${resources.emergency_services}`;
+    }
+
+    async function streamChatReply(message) {
+        // Relay tokens into a live bubble as they arrive; resolves with the final `done` payload
+        const response = await fetch('/api/chat/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            // Recent turns are kept server-side; send only the new message and the session id
+            body: JSON.stringify({ 
+                message,
+                session_id: chatSessionId
+            })
+        });
+
+        if (!response.ok || !response.body) {
+            const data = await response.json().catch(() => ({}));
+            throw new Error(data.error || 'Chat error');
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let liveBubble = null;
+        let result = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const { event, data } = parseServerSentEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+
+                if (event === 'token') {
+                    if (!liveBubble) {
+                        removeTypingIndicator();
+                        const messageDiv = document.createElement('div');
+                        messageDiv.className = 'chat-message ai';
+                        liveBubble = document.createElement('div');
+                        liveBubble.className = 'message-bubble ai';
+                        messageDiv.appendChild(liveBubble);
+                        chatMessages.appendChild(messageDiv);
+                    }
+                    liveBubble.textContent += data.text;
+                    chatMessages.scrollTop = chatMessages.scrollHeight;
+                } else if (event === 'crisis') {
+                    removeTypingIndicator();
+                    chatSessionId = data.session_id || chatSessionId;
+                    addMessage(crisisMessage(data), false);
+                    showTypingIndicator();
+                } else if (event === 'done') {
+                    result = data;
+                }
+            }
+        }
+
+        // The final message (with CTAs and history entry) replaces the live bubble
+        if (liveBubble) {
+            liveBubble.parentElement.remove();
+        }
+        if (!result) {
+            throw new Error('Chat stream ended unexpectedly');
+        }
+        return result;
+    }
+
     async function sendMessage() {
         const message = chatInput.value.trim();
         if (!message) return;
@@ -395,34 +484,16 @@ document.addEventListener('DOMContentLoaded', function() {
         showTypingIndicator();
 
         try {
-            const response = await fetch('/api/chat', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ 
-                    message,
-                    chat_history: chatHistory
-                })
-            });
-
-            const data = await response.json();
+            const data = await streamChatReply(message);
+            removeTypingIndicator();
+            chatSessionId = data.session_id || chatSessionId;
             
-            if (response.ok) {
-                // Remove typing indicator
-                removeTypingIndicator();
-                
-                // Add AI response with suggested features
-                addMessage(data.response, false, data.suggested_features || []);
-            } else {
-                removeTypingIndicator();
-                addMessage('Sorry, I encountered an error. Please try again.');
-                showAlert(data.error || 'Chat error');
-            }
+            // Add AI response with suggested features
+            addMessage(data.response, false, data.suggested_features || []);
         } catch (error) {
             removeTypingIndicator();
             addMessage('Sorry, I\'m having trouble connecting. Please try again.');
-            showAlert('Network error. Please check your connection.');
+            showAlert(error.message === 'Failed to fetch' ? 'Network error. Please check your connection.' : (error.message || 'Chat error'));
         } finally {
             chatSendBtn.disabled = false;
         }
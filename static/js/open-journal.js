@@ -58,6 +58,21 @@ document.addEventListener('DOMContentLoaded', function() {
         return emotions[emotion] || '💭';
     }
 
+    function formatCount(reactions, reactionType) {
+        const count = reactions ? reactions[reactionType] : 0;
+        return count ? count : '';
+    }
+
+    function updateReactionCounts(postId, reactions) {
+        const postElement = communityPosts.querySelector(`[data-post-id="${postId}"]`);
+        if (!postElement) {
+            return;
+        }
+        postElement.querySelectorAll('.reaction-count').forEach(countElement => {
+            countElement.textContent = formatCount(reactions, countElement.dataset.reaction);
+        });
+    }
+
     function renderCommunityPost(post) {
         return `
             <div class="post-item" data-post-id="${post.id}">
@@ -72,10 +87,10 @@ document.addEventListener('DOMContentLoaded', function() {
                 </div>
                 <div class="post-actions">
                     <button class="post-action" onclick="addReaction('${post.id}', 'empathy')">
-                        💙 I feel this
+                        💙 I feel this <span class="reaction-count" data-reaction="empathy">${formatCount(post.reactions, 'empathy')}</span>
                     </button>
                     <button class="post-action" onclick="addReaction('${post.id}', 'support')">
-                        💪 Sending strength
+                        💪 Sending strength <span class="reaction-count" data-reaction="support">${formatCount(post.reactions, 'support')}</span>
                     </button>
                     <button class="post-action" onclick="flagPost('${post.id}')">
                         ⚠️ Flag
@@ -100,6 +115,32 @@ document.addEventListener('DOMContentLoaded', function() {
         communityPosts.innerHTML = html;
     }
 
+    function prependCommunityPost(post) {
+        if (communityPosts.querySelector(`[data-post-id="${post.id}"]`)) {
+            return;
+        }
+        const emptyFeed = communityPosts.querySelector('.empty-feed');
+        if (emptyFeed) {
+            communityPosts.innerHTML = '';
+        }
+        communityPosts.insertAdjacentHTML('afterbegin', renderCommunityPost(post));
+    }
+
+    // Live feed: new posts are pushed over Server-Sent Events instead of refetching
+    function subscribeToCommunityPosts() {
+        if (!window.EventSource) {
+            return;
+        }
+        const stream = new EventSource('/api/journal/open/stream');
+        stream.addEventListener('journal', function(event) {
+            prependCommunityPost(JSON.parse(event.data));
+        });
+        stream.addEventListener('reset', function() {
+            // Missed more posts than the server keeps for reconnects
+            loadCommunityPosts();
+        });
+    }
+
     async function loadCommunityPosts() {
         try {
             const response = await fetch('/api/journal/open');
@@ -182,7 +223,8 @@ document.addEventListener('DOMContentLoaded', function() {
             const data = await response.json();
             
             if (response.ok) {
-                showAlert('Reaction added!', 'success');
+                updateReactionCounts(postId, data.reactions);
+                showAlert(data.added === false ? 'You already reacted to this post' : 'Reaction added!', 'success');
             } else {
                 showAlert(data.error || 'Failed to add reaction');
             }
@@ -229,6 +271,7 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
-    // Load community posts on page load
+    // Load community posts on page load, then follow new posts live
     loadCommunityPosts();
+    subscribeToCommunityPosts();
 });